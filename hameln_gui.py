@@ -6,25 +6,111 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+import queue
 import threading
 import os
 import time
-from hameln_scraper.core.scraper import HamelnScraper
+import logging
+import logging.handlers
 from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.download_manager import DownloadManager, DownloadJob
+
+# ログ表示に残す最大行数（超えた分は古い行から削除）
+MAX_LOG_LINES = 1000
+# イベントキューを処理する間隔（ミリ秒）と1回あたりの最大件数
+EVENT_POLL_MS = 100
+MAX_EVENTS_PER_POLL = 2000
+# 実行中ジョブの速度表示を更新する間隔（ポーリング回数）
+JOB_REFRESH_TICKS = 10
+
+JOB_STATUS_LABELS = {
+    DownloadJob.QUEUED: "待機中",
+    DownloadJob.RUNNING: "実行中",
+    DownloadJob.PAUSED: "一時停止",
+    DownloadJob.COMPLETED: "完了",
+    DownloadJob.FAILED: "失敗",
+    DownloadJob.CANCELLED: "キャンセル",
+}
+
+
+class ProgressTracker:
+    """進捗（章数・バイト数・速度・残り時間）の集計"""
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.started = time.monotonic()
+        self.done = 0
+        self.total = 0
+        self.bytes = 0
+    
+    def rate(self):
+        """1秒あたりの章数"""
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+    
+    def eta(self):
+        """残り時間（秒、不明ならNone）"""
+        rate = self.rate()
+        if rate <= 0 or self.total <= self.done:
+            return None
+        return (self.total - self.done) / rate
+    
+    def format(self):
+        text = f"{self.done}/{self.total}話  {self.bytes / 1024 / 1024:.1f}MB  {self.rate() * 60:.1f}話/分"
+        eta = self.eta()
+        if eta is not None:
+            text += f"  残り約{int(eta) // 60}分{int(eta) % 60:02d}秒"
+        return text
+
+
+class GuiLogHandler(logging.Handler):
+    """スクレイパーのログをGUIのイベントキューに転送（整形はGUIスレッドで行う）"""
+    
+    def __init__(self, events, level=logging.INFO):
+        super().__init__(level)
+        self.events = events
+    
+    def emit(self, record):
+        self.events.put(('record', record))
+
 
 class HamelnGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("ハーメルン小説保存ツール")
-        self.root.geometry("600x500")
-        
-        # スクレイピング用のインスタンス
-        self.scraper = None
-        
-        # フラグ
-        self.is_scraping = False
+        self.root.geometry("720x680")
+        
+        # ダウンロードマネージャ（初回追加時に作成、保存先・並行数の変更時は作り直す）
+        self.manager = None
+        self.manager_settings = None
+        self.log_handler = None
+        self.reported_jobs = set()
+        self.batch_jobs = []  # 全体の進捗に数える今回のジョブ（前回までのジョブは含めない）
+        self.closing = False
+        self.tick = 0
+        
+        # ワーカースレッドからのイベント（GUIスレッドが after() で処理）
+        self.events = queue.Queue()
+        self.log_formatter = logging.Formatter('[%(levelname)s] %(message)s')
+        self.log_line_count = 0
+        self.progress_tracker = ProgressTracker()
+        
+        # 外部ログファイル（メッセージごとに開閉せず、サイズでローテーション）
+        self.file_logger = logging.getLogger("hameln_gui")
+        if not self.file_logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                "hameln_gui.log", maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8', delay=True
+            )
+            handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s', '%Y-%m-%d %H:%M:%S'))
+            self.file_logger.addHandler(handler)
+            self.file_logger.setLevel(logging.INFO)
+            self.file_logger.propagate = False
         
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(EVENT_POLL_MS, self.process_events)
         
     def create_widgets(self):
         # メインフレーム
@@ -73,33 +159,73 @@ class HamelnGUI:
         self.browse_button = ttk.Button(save_frame, text="参照", command=self.browse_folder)
         self.browse_button.grid(row=0, column=1, padx=(10, 0))
         
+        # テキストモード（目次と全話の本文を保存、オフなら目次ページのみ取得）
+        self.text_mode_var = tk.BooleanVar(value=True)
+        self.text_mode_check = ttk.Checkbutton(save_frame, text="全話の本文を保存",
+                                               variable=self.text_mode_var)
+        self.text_mode_check.grid(row=0, column=2, padx=(10, 0))
+        
         # ボタンフレーム
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=7, column=0, columnspan=2, pady=(0, 20))
         
-        self.download_button = ttk.Button(button_frame, text="ダウンロード開始", 
+        self.download_button = ttk.Button(button_frame, text="キューに追加", 
                                          command=self.start_download)
         self.download_button.grid(row=0, column=0, padx=(0, 10))
         
-        self.stop_button = ttk.Button(button_frame, text="停止", 
+        self.stop_button = ttk.Button(button_frame, text="全て停止", 
                                      command=self.stop_download, state=tk.DISABLED)
         self.stop_button.grid(row=0, column=1)
         
-        # プログレスバー
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
-        self.progress.grid(row=8, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
-        
-        # ステータスラベル
+        # 同時実行数（初回追加時に確定）
+        ttk.Label(button_frame, text="同時実行数:").grid(row=0, column=2, padx=(10, 2))
+        self.concurrency_var = tk.IntVar(value=2)
+        self.concurrency_spin = ttk.Spinbox(button_frame, from_=1, to=8, width=3,
+                                            textvariable=self.concurrency_var)
+        self.concurrency_spin.grid(row=0, column=3)
+        
+        # プロファイリング（保存先の profile/ にレポートを出力）
+        self.profile_var = tk.BooleanVar(value=False)
+        self.profile_check = ttk.Checkbutton(button_frame, text="プロファイル計測",
+                                             variable=self.profile_var)
+        self.profile_check.grid(row=0, column=4, padx=(10, 0))
+        
+        # ダウンロード一覧（ジョブごとの状態・進捗・速度）
+        jobs_frame = ttk.Frame(main_frame)
+        jobs_frame.grid(row=8, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        columns = ('id', 'title', 'status', 'progress', 'speed')
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=columns, show='headings', height=5)
+        for column, heading, width in zip(columns, ("#", "小説", "状態", "進捗", "速度"),
+                                          (40, 330, 80, 80, 90)):
+            self.jobs_tree.heading(column, text=heading)
+            self.jobs_tree.column(column, width=width, stretch=(column == 'title'))
+        self.jobs_tree.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        
+        job_buttons = ttk.Frame(jobs_frame)
+        job_buttons.grid(row=0, column=1, sticky=tk.N, padx=(10, 0))
+        ttk.Button(job_buttons, text="一時停止", command=self.pause_selected).grid(row=0, column=0, pady=(0, 5))
+        ttk.Button(job_buttons, text="再開", command=self.resume_selected).grid(row=1, column=0, pady=(0, 5))
+        ttk.Button(job_buttons, text="キャンセル", command=self.cancel_selected).grid(row=2, column=0)
+        jobs_frame.columnconfigure(0, weight=1)
+        
+        # プログレスバー（全ジョブの合計）
+        self.progress = ttk.Progressbar(main_frame, mode='determinate')
+        self.progress.grid(row=9, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        # ステータスラベル（進捗：章数・バイト数・速度・残り時間）
         self.status_label = ttk.Label(main_frame, text="待機中...")
-        self.status_label.grid(row=9, column=0, columnspan=2, pady=(0, 10))
+        self.status_label.grid(row=10, column=0, sticky=tk.W, pady=(0, 10))
+        self.progress_label = ttk.Label(main_frame, text="", foreground="#444")
+        self.progress_label.grid(row=10, column=1, sticky=tk.E, pady=(0, 10))
         
         # ログテキストエリア
         log_label = ttk.Label(main_frame, text="ログ:")
-        log_label.grid(row=10, column=0, sticky=tk.W, pady=(0, 5))
+        log_label.grid(row=11, column=0, sticky=tk.W, pady=(0, 5))
         
         # テキストエリアとスクロールバー
         text_frame = ttk.Frame(main_frame)
-        text_frame.grid(row=11, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+        text_frame.grid(row=12, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         self.log_text = tk.Text(text_frame, height=10, width=70)
         scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=self.log_text.yview)
@@ -112,7 +238,7 @@ class HamelnGUI:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
-        main_frame.rowconfigure(10, weight=1)
+        main_frame.rowconfigure(12, weight=1)
         save_frame.columnconfigure(0, weight=1)
         text_frame.columnconfigure(0, weight=1)
         text_frame.rowconfigure(0, weight=1)
@@ -160,114 +286,238 @@ class HamelnGUI:
             self.save_path_var.set(folder)
             
     def log(self, message):
-        """ログメッセージを追加（アプリ内表示＋外部ファイル出力）"""
-        self.log_text.insert(tk.END, message + '\n')
-        self.log_text.see(tk.END)
-        self.root.update()
+        """ログメッセージを追加（アプリ内表示＋外部ファイル出力、どのスレッドからでも可）"""
+        self.events.put(('log', message))
         
         # 外部ファイルにも出力
-        try:
-            from datetime import datetime
-            log_file = "hameln_gui.log"
-            with open(log_file, 'a', encoding='utf-8') as f:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                f.write(f"[{timestamp}] {message}\n")
-        except Exception as e:
-            print(f"ログファイル書き込みエラー: {e}")
+        self.file_logger.info(message)
         
     def update_status(self, message):
-        """ステータスを更新"""
-        self.status_label.config(text=message)
-        self.root.update()
+        """ステータスを更新（どのスレッドからでも可）"""
+        self.events.put(('status', message))
+    
+    def process_events(self):
+        """イベントキューをまとめて処理し、画面を1回だけ更新"""
+        lines = []
+        status = None
+        jobs = {}
+        try:
+            for _ in range(MAX_EVENTS_PER_POLL):
+                kind, payload = self.events.get_nowait()
+                if kind == 'log':
+                    lines.append(payload)
+                elif kind == 'record':
+                    lines.append(self.log_formatter.format(payload))
+                elif kind == 'status':
+                    status = payload
+                elif kind == 'job' and self.manager and payload in self.manager.jobs:
+                    # 作り直す前のマネージャのジョブは無視（ジョブ番号が重なるため）
+                    jobs[payload.job_id] = payload
+        except queue.Empty:
+            pass
+        
+        # 実行中ジョブの速度表示は一定間隔で更新
+        self.tick += 1
+        if self.manager and self.tick % JOB_REFRESH_TICKS == 0:
+            for job in self.manager.jobs:
+                if job.state == DownloadJob.RUNNING:
+                    jobs[job.job_id] = job
+        
+        for job in jobs.values():
+            self.refresh_job(job)
+        if jobs:
+            self.update_overall_progress()
+        if lines:
+            self.append_log_lines(lines)
+        if status is not None:
+            self.status_label.config(text=status)
+        
+        self.root.after(EVENT_POLL_MS, self.process_events)
+    
+    def append_log_lines(self, lines):
+        """ログ表示に追記（MAX_LOG_LINES を超えた古い行は削除）"""
+        lines = lines[-MAX_LOG_LINES:]
+        self.log_text.insert(tk.END, '\n'.join(lines) + '\n')
+        self.log_line_count += len(lines)
+        excess = self.log_line_count - MAX_LOG_LINES
+        if excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
+            self.log_line_count = MAX_LOG_LINES
+        self.log_text.see(tk.END)
         
+    def has_active_jobs(self):
+        return bool(self.manager) and any(
+            job.state in (DownloadJob.QUEUED, DownloadJob.RUNNING) for job in self.manager.jobs
+        )
+    
+    def get_manager(self):
+        """
+        ダウンロードマネージャを取得（初回に作成）
+        
+        保存先・並行数が前回の作成時から変わっていれば、実行中のジョブがない場合に作り直す
+        （実行中のジョブがある場合は、それらが終わった後の追加から新しい設定を使う）
+        """
+        settings = (self.save_path_var.get(), self.concurrency_var.get())
+        if self.manager is not None and settings != self.manager_settings:
+            if self.has_active_jobs():
+                self.log("実行中のジョブがあるため、保存先・並行数の変更は全ジョブの終了後に反映します")
+            else:
+                self.log("保存先・並行数の変更を反映するため、ダウンロードマネージャを作り直します")
+                self.close_manager_async(self.manager)
+                self.manager = None
+                # ジョブ番号は新しいマネージャで1から振り直すため一覧を空にする
+                self.jobs_tree.delete(*self.jobs_tree.get_children())
+                self.reported_jobs.clear()
+                self.batch_jobs = []
+        
+        if self.manager is None:
+            output_root, concurrency = settings
+            config = ScraperConfig()
+            config.enable_novel_info_saving = False
+            config.enable_comments_saving = True
+            config.output_root = output_root
+            self.manager = DownloadManager(
+                config, max_concurrent=concurrency,
+                on_update=lambda job: self.events.put(('job', job))
+            )
+            self.manager_settings = settings
+        
+        # プロファイル計測はジョブの開始時に参照されるため作り直さずに切り替える
+        profile_dir = os.path.join(self.manager.config.output_root, "profile") if self.profile_var.get() else None
+        if profile_dir != self.manager.profile_dir:
+            self.manager.profile_dir = profile_dir
+            if profile_dir:
+                self.log(f"プロファイル計測を有効化: {profile_dir}")
+        
+        if self.log_handler is None:
+            # スクレイパーのログをイベントキュー経由でGUIに転送
+            self.log_handler = GuiLogHandler(self.events)
+            logging.getLogger("hameln_scraper").addHandler(self.log_handler)
+        return self.manager
+    
     def start_download(self):
-        """ダウンロード開始"""
-        url = self.url_entry.get().strip()
-        if not url:
+        """URLをダウンロードキューに追加（空白・改行区切りで複数可）"""
+        urls = self.url_entry.get().split()
+        if not urls:
             messagebox.showerror("エラー", "URLを入力してください")
             return
             
-        if not url.startswith('http'):
+        if not all(url.startswith('http') for url in urls):
             messagebox.showerror("エラー", "有効なURLを入力してください")
             return
-            
-        # UI状態を更新
-        self.is_scraping = True
-        self.download_button.config(state=tk.DISABLED)
-        self.stop_button.config(state=tk.NORMAL)
-        self.progress.start()
-        self.log_text.delete(1.0, tk.END)
         
-        # 別スレッドでダウンロード実行
-        self.download_thread = threading.Thread(target=self.download_novel, args=(url,))
-        self.download_thread.daemon = True
-        self.download_thread.start()
+        manager = self.get_manager()
+        if not self.has_active_jobs():
+            # 前回までのジョブは全体の進捗に数えない
+            self.progress_tracker.reset()
+            self.batch_jobs = []
+        text_mode = self.text_mode_var.get()
+        for url in urls:
+            job = manager.add(url, text_mode=text_mode)
+            self.batch_jobs.append(job)
+            self.log(f"キューに追加: #{job.job_id} {url}")
+        self.url_entry.delete(0, tk.END)
+        self.stop_button.config(state=tk.NORMAL)
         
     def stop_download(self):
-        """ダウンロード停止"""
-        self.is_scraping = False
+        """全ジョブをキャンセル（実行中のジョブは次のリクエストの前で停止）"""
+        if self.manager:
+            self.manager.cancel_all()
         self.update_status("停止中...")
-        self.log("ダウンロードを停止しました")
-        self.reset_ui()
-        
-    def reset_ui(self):
-        """UI状態をリセット"""
-        self.download_button.config(state=tk.NORMAL)
-        self.stop_button.config(state=tk.DISABLED)
-        self.progress.stop()
-        if self.is_scraping:
-            self.update_status("完了")
+        self.log("全ジョブのキャンセルを要求しました")
+    
+    def selected_job_ids(self):
+        return [int(item) for item in self.jobs_tree.selection()]
+    
+    def pause_selected(self):
+        for job_id in self.selected_job_ids():
+            self.manager.pause(job_id)
+    
+    def resume_selected(self):
+        for job_id in self.selected_job_ids():
+            self.manager.resume(job_id)
+    
+    def cancel_selected(self):
+        for job_id in self.selected_job_ids():
+            self.manager.cancel(job_id)
+    
+    def refresh_job(self, job):
+        """一覧のジョブ行を更新（GUIスレッド）"""
+        status = job.status
+        values = (
+            job.job_id,
+            job.title or job.url,
+            JOB_STATUS_LABELS[status],
+            f"{job.done}/{job.total}" if job.total else "-",
+            f"{job.throughput() / 1024:.1f} KB/s" if job.started_at else "-",
+        )
+        item = str(job.job_id)
+        if self.jobs_tree.exists(item):
+            self.jobs_tree.item(item, values=values)
         else:
-            self.update_status("停止")
-        self.is_scraping = False
-        
-    def download_novel(self, url):
-        """小説をダウンロード（別スレッド）"""
-        try:
-            self.update_status("小説情報を取得中...")
-            self.log(f"開始: {url}")
-            
-            self.log("完全モード（CSS・画像・JavaScript含む完全保存）で実行します")
-            
-            # スクレイパーを初期化（GUIログ連携）
-            config = ScraperConfig()
-            config.enable_novel_info_saving = False
-            config.enable_comments_saving = True
-            self.scraper = HamelnScraper(config)
-            
-            # スクレイパーのデバッグログをGUIに転送
-            original_debug_log = self.scraper.debug_log
-            def gui_debug_log(message: str, level: str = "INFO"):
-                self.log(f"[{level}] {message}")
-                original_debug_log(message, level)
-            self.scraper.debug_log = gui_debug_log
-            
-            
-            # 統合された小説スクレイピングメソッドを使用（全話対応）
-            self.update_status("小説を取得中...")
-            self.log("小説取得を開始します...")
-            self.log(f"URL: {url}")
-            
-            # scrape_novelメソッドで全話取得を実行
-            result = self.scraper.scrape_novel(url)
-            
-            if result and self.is_scraping:
-                self.log(f"✓ 保存完了: {result}")
-                messagebox.showinfo("完了", f"小説の保存が完了しました\n{result}")
-            elif not self.is_scraping:
-                self.log("ダウンロードが停止されました")
+            self.jobs_tree.insert('', tk.END, iid=item, values=values)
+        
+        if status in (DownloadJob.COMPLETED, DownloadJob.FAILED, DownloadJob.CANCELLED) \
+                and job.job_id not in self.reported_jobs:
+            self.reported_jobs.add(job.job_id)
+            if status == DownloadJob.COMPLETED:
+                self.log(f"✓ 保存完了 #{job.job_id}: {job.title or job.url}")
+            elif status == DownloadJob.FAILED:
+                self.log(f"✗ 保存に失敗しました #{job.job_id}: {job.error}")
             else:
-                self.log("✗ 保存に失敗しました")
-                messagebox.showerror("エラー", "小説の保存に失敗しました")
-                
-        except Exception as e:
-            self.log(f"エラーが発生しました: {e}")
-            messagebox.showerror("エラー", f"エラーが発生しました:\n{e}")
-            
-        finally:
-            if self.scraper:
-                self.scraper.close()
-            self.reset_ui()
+                self.log(f"ダウンロードが停止されました #{job.job_id}")
+    
+    def update_overall_progress(self):
+        """今回のジョブ合計の進捗とステータスを更新"""
+        jobs = self.batch_jobs
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        
+        tracker = self.progress_tracker
+        tracker.done = sum(job.done for job in jobs)
+        tracker.total = sum(job.total for job in jobs)
+        tracker.bytes = sum(job.bytes for job in jobs)
+        self.progress.config(maximum=max(tracker.total, 1), value=tracker.done)
+        self.progress_label.config(text=tracker.format())
+        
+        active = counts.get(DownloadJob.QUEUED, 0) + counts.get(DownloadJob.RUNNING, 0) + \
+            counts.get(DownloadJob.PAUSED, 0)
+        self.status_label.config(text=" / ".join(
+            f"{JOB_STATUS_LABELS[state]} {count}" for state, count in counts.items()
+        ))
+        self.stop_button.config(state=tk.NORMAL if active else tk.DISABLED)
+    
+    def close_manager_async(self, manager):
+        """
+        マネージャを別スレッドで終了（実行中のリクエストの完了を待つため、GUIスレッドでは待たない）
+        
+        Returns:
+            threading.Thread: 終了処理のスレッド
+        """
+        manager.cancel_all()
+        thread = threading.Thread(target=manager.close, name="DownloadManagerClose", daemon=True)
+        thread.start()
+        return thread
+    
+    def on_close(self):
+        """ウィンドウを閉じる（実行中のジョブはキャンセルし、ワーカーと共有クライアントの終了後に閉じる）"""
+        if self.closing:
+            return
+        self.closing = True
+        closer = None
+        if self.manager:
+            self.update_status("終了中（実行中のリクエストの完了を待っています）...")
+            closer = self.close_manager_async(self.manager)
+        
+        def finish():
+            if closer and closer.is_alive():
+                self.root.after(EVENT_POLL_MS, finish)
+                return
+            if self.log_handler:
+                logging.getLogger("hameln_scraper").removeHandler(self.log_handler)
+            self.root.destroy()
+        finish()
 
 def main():
     root = tk.Tk()
@@ -5,6 +5,8 @@
 
 from .core.scraper import HamelnScraper
 from .core.config import ScraperConfig
+from .novel.chapter import ChapterRecord
+from .novel.metadata import NovelMetadata
 
 __version__ = "2.0.0"
-__all__ = ["HamelnScraper", "ScraperConfig"]
\ No newline at end of file
+__all__ = ["HamelnScraper", "ScraperConfig", "ChapterRecord", "NovelMetadata"]
\ No newline at end of file
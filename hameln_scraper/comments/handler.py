@@ -3,33 +3,38 @@
 複数ページの感想取得と統合処理
 """
 
-import time
 import copy
 import logging
 import os
-from urllib.parse import urlparse, parse_qs
 from bs4 import BeautifulSoup
 
+from ..core.metrics import get_metrics
+from ..core.events import EventHooks, COMMENTS_PAGE_SAVED
+from ..core.url_key import url_key
+from .stream import ReviewStreamParser, iter_reviews
+
 
 class CommentsHandler:
     """感想ページ処理クラス"""
     
-    def __init__(self, config, network_client, file_manager):
+    def __init__(self, config, network_client, file_manager, events=None):
         self.config = config
         self.network_client = network_client
         self.file_manager = file_manager
+        self.events = events or EventHooks(workers=0)
         self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
     
     def get_all_comments_pages(self, base_comments_url):
         """複数ページの感想を全て取得して統合"""
         try:
             self.logger.info("感想ページのページネーション検出を開始")
             
-            first_page_soup = self.network_client.get_page(base_comments_url)
-            if not first_page_soup:
+            first_page_html = self.network_client.get_page(base_comments_url)
+            if not first_page_html:
                 return None
             
-            first_page_soup = BeautifulSoup(first_page_soup, 'html.parser')
+            first_page_soup = BeautifulSoup(first_page_html, 'html.parser')
             
             page_links = self.detect_comments_pagination(first_page_soup, base_comments_url)
             
@@ -39,6 +44,17 @@ class CommentsHandler:
             
             self.logger.info(f"感想ページ数: {len(page_links)}ページ")
             
+            if self.config.stream_comments:
+                all_comments = [
+                    record.html for record in self.iter_reviews(base_comments_url, page_links, first_page_html)
+                ]
+                if not all_comments:
+                    self.logger.warning("感想コンテンツが見つかりませんでした")
+                    return first_page_soup
+                integrated_soup = self.create_integrated_comments_page(first_page_soup, all_comments, len(page_links))
+                self.logger.info(f"感想ページ統合完了: {len(all_comments)}件の感想を統合")
+                return integrated_soup
+            
             all_comments = []
             
             for page_num, page_url in enumerate(page_links, 1):
@@ -47,7 +63,7 @@ class CommentsHandler:
                 if page_num == 1:
                     page_soup = first_page_soup
                 else:
-                    time.sleep(2)
+                    self.metrics.sleep(2, 'comments_page')
                     page_html = self.network_client.get_page(page_url)
                     if not page_html:
                         self.logger.warning(f"感想ページ {page_num} の取得に失敗")
@@ -74,9 +90,6 @@ class CommentsHandler:
     def detect_comments_pagination(self, soup, base_url):
         """感想ページのページネーションを検出"""
         try:
-            page_links = []
-            base_page_num = self.extract_page_number(base_url)
-            
             pagination_selectors = [
                 'div.pagination a',
                 'div.pager a', 
@@ -88,37 +101,18 @@ class CommentsHandler:
             for selector in pagination_selectors:
                 pagination_links = soup.select(selector)
                 if pagination_links:
-                    self.logger.debug(f"ページネーション発見: {selector} ({len(pagination_links)}個のリンク)")
+                    self.logger.debug("ページネーション発見: %s (%s個のリンク)", selector, len(pagination_links))
                     
-                    for link in pagination_links:
-                        href = link.get('href')
-                        if href and 'page=' in href:
-                            if href.startswith('?'):
-                                full_url = base_url.split('?')[0] + href
-                            elif href.startswith('./'):
-                                full_url = base_url.split('?')[0] + href[2:]
-                            elif href.startswith('//'):
-                                full_url = f"https:{href}"
-                            elif href.startswith('/'):
-                                full_url = 'https://syosetu.org' + href
-                            elif href.startswith('http'):
-                                full_url = href
-                            else:
-                                continue
-                            
-                            page_num = self.extract_page_number(full_url)
-                            if not any(self.extract_page_number(existing_url) == page_num for existing_url in page_links):
-                                page_links.append(full_url)
+                    hrefs = [link.get('href') for link in pagination_links]
                     break
+            else:
+                hrefs = []
             
-            if not any(self.extract_page_number(url) == base_page_num for url in page_links):
-                page_links.append(base_url)
-            
-            page_links.sort(key=lambda url: self.extract_page_number(url))
+            page_links = self._page_links(base_url, hrefs)
             
-            self.logger.debug(f"検出されたページ: {len(page_links)}ページ")
+            self.logger.debug("検出されたページ: %sページ", len(page_links))
             for i, url in enumerate(page_links, 1):
-                self.logger.debug(f"  ページ{i}: {url}")
+                self.logger.debug("  ページ%s: %s", i, url)
             
             return page_links
             
@@ -126,6 +120,55 @@ class CommentsHandler:
             self.logger.error(f"ページネーション検出エラー: {e}")
             return [base_url]
     
+    def _page_links(self, base_url, hrefs):
+        """ページネーションのリンクから、ページ番号順・重複なしのページURL一覧を作成"""
+        base_key = url_key(base_url)
+        pages = {}  # ページ番号 -> 正規化URL
+        for href in hrefs:
+            if href and 'page=' in href:
+                key = url_key(href, base_key or self.config.base_url)
+                pages.setdefault(key.page or 1, key)
+        pages.setdefault(base_key.page or 1, base_key)
+        return [pages[page] for page in sorted(pages)]
+    
+    def iter_reviews(self, base_comments_url, page_links=None, first_page_html=None):
+        """
+        全ページの感想を逐次取り出す（ページ全体のツリーは作らない）
+        
+        Args:
+            base_comments_url: 感想の1ページ目のURL
+            page_links: ページURL一覧（省略時は1ページ目のリンクから検出）
+            first_page_html: 取得済みの1ページ目のHTML（あれば取得し直さない）
+            
+        Yields:
+            ReviewRecord: 閉じタグが届いた順の感想（page はページ番号）
+        """
+        detect = page_links is None
+        page_links = list(page_links or [base_comments_url])
+        page_num = 0
+        while page_num < len(page_links):
+            page_url = page_links[page_num]
+            page_num += 1
+            if page_num == 1 and first_page_html:
+                page_html = first_page_html
+            else:
+                if page_num > 1:
+                    self.metrics.sleep(2, 'comments_page')
+                page_html = self.network_client.get_page(page_url)
+            if not page_html:
+                self.logger.warning(f"感想ページ {page_num} の取得に失敗")
+                continue
+            parser = ReviewStreamParser(page=self.extract_page_number(page_url))
+            yield from iter_reviews(page_html, parser=parser)
+            self.logger.debug("感想ページ %s: %s件", page_num, parser.review_count)
+            if detect:
+                # 1ページ目のページネーションに従って残りのページを取得
+                detect = False
+                current = url_key(page_url)
+                page_links = [page_url] + [
+                    url for url in self._page_links(page_url, parser.pagination_hrefs) if url != current
+                ]
+    
     def extract_comments_content(self, soup):
         """感想コンテンツを抽出"""
         try:
@@ -145,7 +188,7 @@ class CommentsHandler:
             for selector in comment_selectors:
                 comment_elements = soup.select(selector)
                 if comment_elements:
-                    self.logger.debug(f"感想要素発見: {selector} ({len(comment_elements)}件)")
+                    self.logger.debug("感想要素発見: %s (%s件)", selector, len(comment_elements))
                     comments.extend(comment_elements)
                     break
             
@@ -156,7 +199,7 @@ class CommentsHandler:
                     if len(text) > 20 and any(keyword in text for keyword in ['面白', '良い', '素晴らしい', '感動', '続き']):
                         comments.append(row)
             
-            self.logger.debug(f"抽出された感想: {len(comments)}件")
+            self.logger.debug("抽出された感想: %s件", len(comments))
             return comments
             
         except Exception as e:
@@ -177,7 +220,10 @@ class CommentsHandler:
             
             if content_area and all_comments:
                 for comment in all_comments:
-                    if comment:
+                    if isinstance(comment, str):
+                        # 逐次抽出した感想は元のマークアップの断片
+                        content_area.extend(list(BeautifulSoup(comment, 'html.parser').contents))
+                    elif comment:
                         content_area.append(copy.deepcopy(comment))
             
             self.logger.debug("感想ページ統合完了")
@@ -190,19 +236,8 @@ class CommentsHandler:
             return base_soup
     
     def extract_page_number(self, url):
-        """URLからページ番号を抽出"""
-        try:
-            parsed = urlparse(url)
-            params = parse_qs(parsed.query)
-            
-            if 'page' in params:
-                return int(params['page'][0])
-            else:
-                return 1
-                
-        except Exception as e:
-            self.logger.debug(f"ページ番号抽出エラー: {e}")
-            return 1
+        """URLからページ番号を抽出（ページ番号のないURLは1）"""
+        return url_key(url).page or 1
     
     def save_comments_page(self, comments_url, output_dir, novel_title, index_file_name=None):
         """感想ページを保存"""
@@ -220,12 +255,12 @@ class CommentsHandler:
             
             if len(page_links) <= 1:
                 self.logger.info("感想は1ページのみです")
-                integrated_soup = first_page_soup
                 safe_title = self.file_manager._sanitize_filename(novel_title)
                 comments_filename = f"{safe_title} - 感想"
                 
+                # 取得したHTMLは変更しないため、ツリーを再シリアライズせず位置指定で保存
                 comments_file_path = self.file_manager.save_complete_page(
-                    integrated_soup,
+                    first_page_html,
                     comments_url,
                     comments_filename,
                     output_dir,
@@ -234,6 +269,10 @@ class CommentsHandler:
                 
                 if comments_file_path:
                     self.logger.info(f"感想ページ保存完了: {comments_file_path}")
+                    self.events.emit(
+                        COMMENTS_PAGE_SAVED, url=comments_url, path=comments_file_path,
+                        page=1, total=1, html=first_page_html
+                    )
                     return comments_file_path
                 else:
                     self.logger.error("感想ページの保存に失敗しました")
@@ -245,23 +284,23 @@ class CommentsHandler:
             os.makedirs(comments_dir, exist_ok=True)
             
             saved_files = []
+            saved_pages = []
             
             for page_num, page_url in enumerate(page_links, 1):
                 self.logger.info(f"感想ページ {page_num}/{len(page_links)} を保存中")
                 
                 if page_num == 1:
-                    page_soup = first_page_soup
+                    page_html = first_page_html
                 else:
-                    time.sleep(2)
+                    self.metrics.sleep(2, 'comments_page')
                     page_html = self.network_client.get_page(page_url)
                     if not page_html:
                         self.logger.warning(f"感想ページ {page_num} の取得に失敗")
                         continue
-                    page_soup = BeautifulSoup(page_html, 'html.parser')
                 
                 page_filename = f"感想 - ページ{page_num}"
                 page_file_path = self.file_manager.save_complete_page(
-                    page_soup,
+                    page_html,
                     page_url,
                     page_filename,
                     comments_dir,
@@ -270,10 +309,17 @@ class CommentsHandler:
                 
                 if page_file_path:
                     saved_files.append(page_file_path)
+                    saved_pages.append((page_num, page_url, page_file_path, page_html))
                     self.logger.info(f"感想ページ{page_num}保存完了: {os.path.basename(page_file_path)}")
             
             if saved_files:
                 self.fix_comments_page_links(saved_files, page_links, index_file_name)
+                # ページ間のリンクを修正し終えたファイルについて通知
+                for page_num, page_url, page_file_path, page_html in saved_pages:
+                    self.events.emit(
+                        COMMENTS_PAGE_SAVED, url=page_url, path=page_file_path,
+                        page=page_num, total=len(page_links), html=page_html
+                    )
                 self.logger.info(f"感想ページ保存完了: {len(saved_files)}ページ保存")
                 return saved_files[0]
             else:
@@ -288,83 +334,37 @@ class CommentsHandler:
         """感想ページ間のリンクを修正"""
         try:
             page_mapping = {}
-            for i, (file_path, url) in enumerate(zip(saved_files, page_urls), 1):
-                page_mapping[url] = os.path.basename(file_path)
+            for file_path, url in zip(saved_files, page_urls):
+                page_mapping[url_key(url).page_key()] = os.path.basename(file_path)
+            base_url = page_urls[0] if page_urls else self.config.base_url
+            
+            def resolve(href, link_text):
+                key = url_key(href, base_url)
+                if key.mode == 'review':
+                    return page_mapping.get(key.page_key())
+                if ('/novel/' in href and href.endswith('/')) or '目次' in link_text:
+                    return f'../{index_file_name}' if index_file_name else '../目次.html'
+                if 'mode=ss_detail' in href or '小説情報' in link_text:
+                    return '../小説情報.html'
+                return None
             
-            for i, file_path in enumerate(saved_files):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                for link in soup.find_all('a', href=True):
-                    href = link.get('href')
-                    if not href:
-                        continue
-                    
-                    if 'mode=review' in href:
-                        matched_file = self.find_matching_comments_page(href, page_mapping)
-                        if matched_file:
-                            link['href'] = matched_file
-                            self.logger.debug(f"感想ページリンク修正: {href} -> {matched_file}")
-                    
-                    elif ('/novel/' in href and href.endswith('/')) or '目次' in link.get_text():
-                        if index_file_name:
-                            link['href'] = f'../{index_file_name}'
-                            self.logger.debug(f"目次リンク修正: {href} -> ../{index_file_name}")
-                        else:
-                            link['href'] = '../目次.html'
-                            self.logger.debug(f"目次リンク修正: {href} -> ../目次.html")
-                    
-                    elif 'mode=ss_detail' in href or '小説情報' in link.get_text():
-                        link['href'] = '../小説情報.html'
-                        self.logger.debug(f"小説情報リンク修正: {href} -> ../小説情報.html")
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(str(soup))
+            # 保存時と同じエンコーディングで読み込み、href の値だけを原子的に書き戻す
+            for file_path in saved_files:
+                self.file_manager.patch_links(file_path, resolve)
                 
         except Exception as e:
             self.logger.error(f"感想ページリンク修正エラー: {e}")
     
     def find_matching_comments_page(self, href, page_mapping):
-        """感想ページのURLから正確なローカルファイルを探す"""
-        try:
-            target_page_num = self.extract_page_number(href)
-            target_base_url = self.extract_base_comments_url(href)
-            
-            for original_url, local_file in page_mapping.items():
-                original_page_num = self.extract_page_number(original_url)
-                original_base_url = self.extract_base_comments_url(original_url)
-                
-                if (target_base_url == original_base_url and 
-                    target_page_num == original_page_num):
-                    return local_file
-            
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"感想ページマッチングエラー: {e}")
+        """感想ページのURLから正確なローカルファイルを探す（作品・mode・ページ番号が一致するもの）"""
+        target = url_key(href).page_key()
+        if target is None:
             return None
+        for original_url, local_file in page_mapping.items():
+            if url_key(original_url).page_key() == target:
+                return local_file
+        return None
     
     def extract_base_comments_url(self, url):
-        """URLから基本URL（nid部分）を抽出"""
-        try:
-            parsed = urlparse(url)
-            params = parse_qs(parsed.query)
-            
-            base_params = {}
-            if 'mode' in params:
-                base_params['mode'] = params['mode'][0]
-            if 'nid' in params:
-                base_params['nid'] = params['nid'][0]
-            
-            base_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-            if base_params:
-                param_str = '&'.join([f"{k}={v}" for k, v in base_params.items()])
-                base_url += f"?{param_str}"
-            
-            return base_url
-            
-        except Exception as e:
-            self.logger.error(f"基本URL抽出エラー: {e}")
-            return url
+        """URLから基本URL（ページ番号を除いた正規化URL）を抽出"""
+        return url_key(url).with_page(1)
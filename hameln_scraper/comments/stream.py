@@ -0,0 +1,189 @@
+"""
+感想ページの逐次抽出
+生のHTMLを字句解析器に少しずつ流し込み、感想要素の閉じタグが届いた時点で記録を出力する
+ページ全体のツリーは作らず、保持するのは開いている感想要素1件分のトークンだけ
+"""
+
+import re
+import html
+from collections import namedtuple
+from html.parser import HTMLParser
+
+
+# 感想の1件（html は元のマークアップ、page はページ番号）
+ReviewRecord = namedtuple('ReviewRecord', 'review_id html text page')
+
+CHUNK_SIZE = 16384
+# 感想要素とみなすクラス（完全一致）と、クラス・IDに含まれる語
+REVIEW_CLASSES = {'review-item', 'comment-item', 'impression'}
+REVIEW_WORDS = ('review', 'comment')
+# 感想要素が見つからないページでは、これらの語を含む表の行を感想とみなす
+FALLBACK_KEYWORDS = ('面白', '良い', '素晴らしい', '感動', '続き')
+FALLBACK_MIN_LENGTH = 20
+PAGINATION_CLASSES = {'pagination', 'pager', 'page-nav'}
+_WHITESPACE = re.compile(r'\s+')
+
+
+def is_review_element(tag, attrs):
+    """開始タグが感想要素かどうか（extract_comments_content のセレクターに対応）"""
+    if tag not in ('div', 'tr'):
+        return False
+    element_id = (attrs.get('id') or '').lower()
+    if 'review' in element_id:
+        return True
+    if tag != 'div':
+        return False
+    classes = (attrs.get('class') or '').split()
+    if REVIEW_CLASSES.intersection(classes):
+        return True
+    class_text = ' '.join(classes).lower()
+    return any(word in class_text for word in REVIEW_WORDS)
+
+
+class _OpenElement:
+    __slots__ = ('tag', 'level', 'start', 'review_id', 'fallback', 'has_child')
+
+    def __init__(self, tag, level, start, review_id, fallback):
+        self.tag = tag
+        self.level = level  # 同名タグの入れ子の深さ（閉じタグの対応付け用）
+        self.start = start  # トークン列での開始位置
+        self.review_id = review_id
+        self.fallback = fallback  # 表の行の代替候補
+        self.has_child = False
+
+
+class ReviewStreamParser(HTMLParser):
+    """
+    感想の逐次抽出器
+
+    parser = ReviewStreamParser(page=2)
+    for chunk in chunks:
+        parser.feed(chunk)
+        for record in parser.pop_records(): ...
+    parser.close()
+
+    感想要素が入れ子の場合は最も内側の要素を1件とする
+    ページネーションのリンク（href に page= を含むもの）は pagination_hrefs に集める
+    """
+
+    def __init__(self, page=1):
+        super().__init__(convert_charrefs=False)
+        self.page = page
+        self.pagination_hrefs = []
+        self.review_count = 0
+        self._records = []
+        self._fallbacks = []
+        self._stack = []
+        self._levels = {}
+        self._tokens = []  # (元のマークアップ, テキスト)
+        self._pagination_depth = 0
+
+    def pop_records(self):
+        """前回の呼び出し以降に閉じた感想の記録を取り出す"""
+        records, self._records = self._records, []
+        return records
+
+    def close(self):
+        super().close()
+        # 感想要素が1件もなかったページだけ、表の行の代替候補を感想とする
+        if not self.review_count:
+            self._records.extend(self._fallbacks)
+        self._fallbacks = []
+
+    def _append(self, raw, text=''):
+        if self._stack:
+            self._tokens.append((raw, text))
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        self._append(self.get_starttag_text())
+        if tag == 'div' and PAGINATION_CLASSES.intersection((attributes.get('class') or '').split()):
+            self._pagination_depth = self._levels.get('div', 0) + 1
+        elif tag == 'a':
+            href = attributes.get('href') or ''
+            if 'page=' in href and (self._pagination_depth or 'mode=review' in href or '&page=' in href):
+                self.pagination_hrefs.append(href)
+        if tag not in ('div', 'tr'):
+            return
+        level = self._levels[tag] = self._levels.get(tag, 0) + 1
+        review = is_review_element(tag, attributes)
+        if review or tag == 'tr':
+            if not self._stack:
+                self._tokens.append((self.get_starttag_text(), ''))
+            self._stack.append(_OpenElement(
+                tag, level, len(self._tokens) - 1, attributes.get('id'), not review
+            ))
+
+    def handle_startendtag(self, tag, attrs):
+        self._append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        self._append(f'</{tag}>')
+        if tag not in ('div', 'tr'):
+            return
+        level = self._levels.get(tag, 0)
+        if tag == 'div' and level == self._pagination_depth:
+            self._pagination_depth = 0
+        self._levels[tag] = max(0, level - 1)
+        if not self._stack or self._stack[-1].tag != tag or self._stack[-1].level != level:
+            return
+        element = self._stack.pop()
+        self._emit(element)
+        if not self._stack:
+            self._tokens = []
+
+    def _emit(self, element):
+        if element.has_child:
+            # 内側の要素を感想として出力済み
+            if self._stack:
+                self._stack[-1].has_child = True
+            return
+        tokens = self._tokens[element.start:]
+        text = _WHITESPACE.sub(' ', ''.join(text for raw, text in tokens)).strip()
+        record = ReviewRecord(element.review_id, ''.join(raw for raw, text in tokens), text, self.page)
+        if not element.fallback:
+            self.review_count += 1
+            self._records.append(record)
+        elif len(text) > FALLBACK_MIN_LENGTH and any(keyword in text for keyword in FALLBACK_KEYWORDS):
+            self._fallbacks.append(record)
+        else:
+            return
+        for parent in self._stack:
+            parent.has_child = True
+
+    def handle_data(self, data):
+        self._append(data, data)
+
+    def handle_entityref(self, name):
+        raw = f'&{name};'
+        self._append(raw, html.unescape(raw))
+
+    def handle_charref(self, name):
+        raw = f'&#{name};'
+        self._append(raw, html.unescape(raw))
+
+    def handle_comment(self, data):
+        self._append(f'<!--{data}-->')
+
+
+def iter_reviews(source, page=1, chunk_size=CHUNK_SIZE, parser=None):
+    """
+    生のHTML（文字列、または文字列のチャンクの反復）から感想を逐次取り出す
+
+    Args:
+        source: HTML文字列、またはチャンクの反復
+        page: 記録に付けるページ番号
+        parser: 使用する ReviewStreamParser（ページネーションのリンクを参照する場合に渡す）
+
+    Yields:
+        ReviewRecord: 閉じタグが届いた順の感想
+    """
+    parser = parser or ReviewStreamParser(page)
+    chunks = source
+    if isinstance(source, str):
+        chunks = (source[i:i + chunk_size] for i in range(0, len(source), chunk_size))
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_records()
+    parser.close()
+    yield from parser.pop_records()
@@ -6,6 +6,8 @@ import logging
 from dataclasses import dataclass
 from typing import List
 
+from .logging_setup import configure_logging
+
 
 @dataclass
 class ScraperConfig:
@@ -13,16 +15,52 @@ class ScraperConfig:
     
     # 基本設定
     base_url: str = "https://syosetu.org"
-    debug_mode: bool = True
+    debug_mode: bool = False  # True でDEBUGログ（log_level）を出力
     
     # 機能制御フラグ
     enable_novel_info_saving: bool = True
     enable_comments_saving: bool = True
+    stream_comments: bool = True  # 複数ページの感想はツリーを作らず感想要素だけを逐次抽出
+    enable_revision_tracking: bool = True  # 章本文の変更履歴を保持し、未変更の章は書き込まない
+    
+    # 出力設定
+    output_root: str = "saved_novels"
+    text_format: str = "markdown"  # テキストモードの形式（markdown / plain）
+    enable_search_index: bool = False  # 保存時に全文検索インデックスを更新
+    search_index_file: str = "search_index.db"  # output_root からの相対パス
+    enable_resource_library: bool = True  # 共通のCSS・画像等を共有ライブラリに1つだけ保存し、各小説にはハードリンクで配置
+    resource_library_dir: str = ".resource_library"  # output_root からの相対パス
+    resource_library_ttl: float = 86400.0  # ライブラリのリソースを確認せずに使う期間（秒、期限切れ後は条件付きリクエストで確認、0で毎回）
+    resource_workers: int = 4  # ページ内のリソースを並行してダウンロードする数
+    event_workers: int = 2  # background=True で登録したイベントハンドラを実行するスレッド数（0でその場で実行）
+    event_queue_size: int = 64  # 実行待ちのハンドラの上限（超えるとイベントの発行側が待機）
+    enable_background_writes: bool = True  # 保存HTMLを専用スレッドで書き込む
+    writer_queue_size: int = 64  # 書き込み待ちの上限（超えると保存側が待機）
+    fsync_batch_size: int = 0  # N件ごとにまとめてfsyncしてから置き換え（0で無効）
+    metrics_file: str = None  # 実行ごとの計測値の出力先（.json ならJSON、それ以外はPrometheusテキスト）
     
     # ネットワーク設定
     retry_count: int = 3
     request_delay: float = 3.0
     max_delay: float = 30.0
+    min_request_interval: float = 1.0  # 並行ダウンロード時のサイト全体での最小リクエスト間隔（秒）
+    job_timeout: float = None  # 1回の取得処理の期限（秒、Noneで無制限）
+    circuit_failure_threshold: int = 5  # ホストごとの連続失敗がこの回数に達すると取得を一時停止
+    circuit_cooldown: float = 60.0  # 一時停止の時間（秒）
+    circuit_max_wait: float = 120.0  # 一時停止中に待機する上限（超える場合は即座に失敗、0で常に即座に失敗）
+    page_memo_size: int = 64  # 実行中にメモ化するページ数（同じURLの再取得を省略、0で無効）
+    resource_memo_size: int = 256  # 実行中にメモ化するリソース数
+    
+    # 更新監視設定
+    watch_state_file: str = "watch_state.json"  # フォローリストと監視状態（output_root からの相対パス）
+    watch_initial_interval: float = 6 * 3600  # 更新間隔が未推定の小説の確認間隔（秒）
+    watch_min_interval: float = 15 * 60  # 確認間隔の下限（秒）
+    watch_max_interval: float = 7 * 24 * 3600  # 確認間隔の上限（秒、休止中の小説もこの間隔では確認）
+    watch_cadence_fraction: float = 0.5  # 推定した更新間隔に対する確認間隔の割合
+    watch_backoff: float = 1.5  # 更新がなかった場合に確認間隔を延ばす倍率
+    metadata_cache_file: str = "metadata_cache.json"  # 小説情報の確認結果のキャッシュ（output_root からの相対パス）
+    metadata_cache_ttl: float = 3600.0  # キャッシュの有効期間（秒、期限切れ後は条件付きリクエストで確認）
+    metadata_workers: int = 4  # 一括確認の並行数（リクエスト間隔は min_request_interval で保つ）
     
     # User-Agent設定
     user_agents: List[str] = None
@@ -30,7 +68,13 @@ class ScraperConfig:
     # ログ設定
     log_file: str = "hameln_scraper.log"
     debug_log_file: str = "hameln_debug.log"
-    log_level: int = logging.DEBUG
+    log_level: int = logging.DEBUG  # debug_mode=True の場合のレベル（通常はINFO）
+    log_format: str = "text"  # ファイル出力の形式（text / json）
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 3
+    diagnostics_sample_rate: float = 0.0  # 取得成功時にも生データを保存する割合（0〜1）
+    debug_capture_dir: str = "debug_captures"  # 検証失敗時に生データを保存するフォルダ（Noneで保存しない）
+    debug_capture_max_files: int = 50  # 保存する件数の上限（超えたら古いものから削除）
     
     def __post_init__(self):
         """初期化後の処理"""
@@ -45,12 +89,5 @@ class ScraperConfig:
     
     def setup_logging(self):
         """ログ設定を初期化"""
-        logging.basicConfig(
-            level=self.log_level if self.debug_mode else logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging(self)
         return logging.getLogger(__name__)
\ No newline at end of file
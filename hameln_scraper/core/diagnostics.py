@@ -0,0 +1,147 @@
+"""
+ページ診断モジュール
+取得のたびには生のレスポンスから安価な指標（タイトル・長さ・チャレンジ検出）だけを求め、
+詳細な構造解析と生データの保存は検証失敗時と、設定した割合のサンプルに限って行う
+"""
+
+import os
+import re
+import time
+import random
+import logging
+import threading
+from collections import Counter
+
+from .metrics import get_metrics
+from ..parsing.keyword_scanner import PageVerdict, scan_page
+
+_TITLE_PATTERN = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+_SLUG_PATTERN = re.compile(r'[^0-9A-Za-z]+')
+HEAD_SCAN_BYTES = 65536
+# 構造解析で数える要素とクラス
+STRUCTURE_TAGS = ('h1', 'div', 'a', 'p')
+STRUCTURE_CLASSES = ('ss', 'novel_body', 'novel_view', 'novel_subtitle')
+
+
+def _head_text(content):
+    head = content[:HEAD_SCAN_BYTES]
+    if isinstance(head, bytes):
+        return head.decode('utf-8', errors='replace')
+    return head
+
+
+def quick_signals(content):
+    """
+    生のレスポンスから安価な指標を求める（解析済みツリーは使わない）
+
+    Returns:
+        dict: length（バイト数・文字数）, title, verdict（PageVerdict の種類）, challenge, error_title
+    """
+    content = content or b''
+    head = _head_text(content)
+    match = _TITLE_PATTERN.search(head)
+    title = re.sub(r'\s+', ' ', match.group(1)).strip() if match else None
+    verdict = scan_page(content)
+    return {
+        'length': len(content),
+        'title': title,
+        'verdict': verdict.kind,
+        'challenge': verdict.kind == PageVerdict.CHALLENGE,
+        'error_title': verdict.kind in (PageVerdict.NOT_FOUND, PageVerdict.MAINTENANCE, PageVerdict.ERROR),
+    }
+
+
+def analyze_structure(soup):
+    """解析済みツリーを1回走査して構造の概要を求める（失敗時・サンプル時のみ）"""
+    tags = Counter()
+    classes = Counter()
+    for element in soup.find_all(True):
+        if element.name in STRUCTURE_TAGS:
+            tags[element.name] += 1
+        for cls in element.get('class') or ():
+            if cls in STRUCTURE_CLASSES:
+                classes[cls] += 1
+    honbun = soup.find(id='honbun')
+    return {
+        'tags': dict(tags),
+        'classes': dict(classes),
+        'honbun': honbun is not None,
+        'text_length': len(soup.get_text()),
+    }
+
+
+class PageDiagnostics:
+    """
+    ページ診断クラス（スレッドセーフ）
+
+    observe() は取得成功のたびに、report_failure() は検証失敗時に呼ぶ
+    生データは capture_dir に保存し、max_captures 件を超えたら古いものから削除する
+    """
+
+    def __init__(self, config):
+        self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
+        self.sample_rate = config.diagnostics_sample_rate
+        self.capture_dir = config.debug_capture_dir
+        self.max_captures = config.debug_capture_max_files
+        self._lock = threading.Lock()
+        self._sequence = 0
+
+    def observe(self, url, content, status=200):
+        """取得成功時の安価な記録（サンプル対象なら詳細解析と保存も行う）"""
+        signals = quick_signals(content)
+        self.logger.debug("ページ取得: %s status=%s length=%s title=%s", url, status, signals['length'], signals['title'])
+        if signals['challenge'] or signals['error_title']:
+            self.metrics.inc('page_diagnostics_total', result='suspicious')
+            self.logger.warning(f"異常の疑いがあるページ: {url} (タイトル: {signals['title']})")
+        if self.sample_rate and random.random() < self.sample_rate:
+            self.metrics.inc('page_diagnostics_total', result='sampled')
+            self.capture(url, content, 'sample')
+        return signals
+
+    def report_failure(self, url, content, reason, soup=None):
+        """
+        検証失敗時の診断（詳細な構造解析と生データの保存）
+
+        Args:
+            url: ページURL
+            content: 生のレスポンス（bytes または str）
+            reason: 失敗理由（保存ファイル名にも使う）
+            soup: 解析済みツリー（あれば構造解析を行う）
+        """
+        signals = quick_signals(content)
+        self.metrics.inc('page_diagnostics_total', result=reason)
+        self.logger.warning(
+            f"ページ診断 ({reason}): {url} length={signals['length']} title={signals['title']} "
+            f"challenge={signals['challenge']}"
+        )
+        if soup is not None:
+            self.logger.info(f"ページ構造 ({reason}): {analyze_structure(soup)}")
+        return self.capture(url, content, reason)
+
+    def capture(self, url, content, reason):
+        """生データを保存（保存先が未設定なら何もしない）"""
+        if not self.capture_dir or content is None:
+            return None
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        slug = _SLUG_PATTERN.sub('_', url.split('://', 1)[-1]).strip('_')[:80]
+        try:
+            with self._lock:
+                self._sequence += 1
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}_{self._sequence:04d}_{reason}_{slug}.html"
+                path = os.path.join(self.capture_dir, name)
+                os.makedirs(self.capture_dir, exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(content)
+                self._rotate()
+        except OSError as e:
+            self.logger.error(f"診断データの保存エラー: {e}")
+            return None
+        self.logger.info(f"診断データを保存: {path}")
+        return path
+
+    def _rotate(self):
+        names = sorted(name for name in os.listdir(self.capture_dir) if name.endswith('.html'))
+        for name in names[:max(0, len(names) - self.max_captures)]:
+            os.remove(os.path.join(self.capture_dir, name))
@@ -0,0 +1,220 @@
+"""
+ダウンロード管理モジュール
+複数の小説をキューに積み、共有ネットワーククライアントで並行取得する
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+
+from .config import ScraperConfig
+from .scraper import HamelnScraper
+from .job_control import JobControl, JobCancelled, DeadlineExceeded
+from ..network.client import NetworkClient
+from ..network.rate_limiter import RateLimiter
+
+
+class DownloadJob:
+    """ダウンロードジョブ（状態と進捗）"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    PAUSED = 'paused'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, job_id, url, text_mode=False):
+        self.job_id = job_id
+        self.url = url
+        self.text_mode = text_mode
+        self.control = JobControl()
+        self.state = self.QUEUED
+        self.title = None
+        self.done = 0
+        self.total = 0
+        self.bytes = 0
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def status(self):
+        if self.state in (self.QUEUED, self.RUNNING) and self.control.paused:
+            return self.PAUSED
+        return self.state
+
+    def update_progress(self, event):
+        self.done = event['done']
+        self.total = event['total']
+        self.bytes += event.get('bytes', 0)
+        if event.get('title'):
+            self.title = event['title']
+
+    def throughput(self):
+        """取得速度（バイト/秒）"""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+
+class DownloadManager:
+    """
+    ダウンロード管理クラス
+
+    ジョブをキューに積み、max_concurrent 個のワーカースレッドで並行実行する
+    全ジョブで NetworkClient と RateLimiter を共有し、サイト全体へのリクエスト間隔を保つ
+    開始前に一時停止したジョブはワーカーを占有せず、再開時にキューへ戻す
+    """
+
+    def __init__(self, config=None, max_concurrent=2, on_update=None):
+        self.config = config or ScraperConfig()
+        self.logger = logging.getLogger(__name__)
+        self.on_update = on_update
+        self.profile_dir = None  # 設定時はジョブごとに <profile_dir>/job<ID>/ へプロファイルを出力
+        self.network_client = NetworkClient(self.config)
+        self.network_client.rate_limiter = RateLimiter(self.config.min_request_interval)
+
+        self.jobs = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._parked = {}  # 開始前に一時停止したジョブ（job_id -> ジョブ）
+        self._workers = []
+        for index in range(max_concurrent):
+            worker = threading.Thread(target=self._worker, name=f"DownloadWorker-{index + 1}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def add(self, url, text_mode=False):
+        """ジョブを追加"""
+        with self._lock:
+            job = DownloadJob(self._next_id, url, text_mode)
+            self._next_id += 1
+            self.jobs.append(job)
+        self._queue.put(job)
+        self.logger.info(f"ジョブ追加 #{job.job_id}: {url}")
+        self._notify(job)
+        return job
+
+    def get(self, job_id):
+        for job in self.jobs:
+            if job.job_id == job_id:
+                return job
+        return None
+
+    def pause(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.control.pause()
+            self._notify(job)
+
+    def resume(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.control.resume()
+            with self._lock:
+                parked = self._parked.pop(job_id, None)
+            if parked:
+                self._queue.put(parked)
+            self._notify(job)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.control.cancel()
+            with self._lock:
+                self._parked.pop(job_id, None)
+            if job.state == DownloadJob.QUEUED:
+                job.state = DownloadJob.CANCELLED
+            self._notify(job)
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            if job.state in (DownloadJob.QUEUED, DownloadJob.RUNNING):
+                self.cancel(job.job_id)
+
+    def wait(self):
+        """キュー内の全ジョブの終了を待機（開始前に一時停止したジョブは再開されるまで待たない）"""
+        self._queue.join()
+
+    def close(self):
+        """全ジョブをキャンセルし、ワーカーと共有クライアントを終了"""
+        self.cancel_all()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self.network_client.close()
+
+    def _notify(self, job):
+        if self.on_update:
+            self.on_update(job)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if job.state == DownloadJob.QUEUED and not self._park_if_paused(job):
+                    self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _park_if_paused(self, job):
+        """一時停止中のジョブはワーカーで待機せず再開まで預ける（resume() でキューに戻す）"""
+        with self._lock:
+            if not job.control.paused:
+                return False
+            self._parked[job.job_id] = job
+        self.logger.info(f"ジョブ一時停止中のため保留 #{job.job_id}: {job.url}")
+        return True
+
+    def _run(self, job):
+        scraper = None
+        try:
+            job.control.checkpoint()
+            job.control.set_timeout(self.config.job_timeout)  # 期限は実行開始から数える
+            job.state = DownloadJob.RUNNING
+            job.started_at = time.monotonic()
+            self._notify(job)
+
+            scraper = HamelnScraper(self.config, network_client=self.network_client)
+            scraper.job_control = job.control
+            if self.profile_dir:
+                scraper.enable_profiling(os.path.join(self.profile_dir, f"job{job.job_id}"))
+
+            def on_progress(event):
+                job.update_progress(event)
+                self._notify(job)
+            scraper.progress_callback = on_progress
+
+            if job.text_mode:
+                job.result = scraper.scrape_novel_text(job.url)
+            else:
+                job.result = scraper.scrape_novel(job.url)
+            success = bool(job.result) and job.result.get('success', True)
+            job.state = DownloadJob.COMPLETED if success else DownloadJob.FAILED
+            if not success:
+                job.error = job.result.get('error')
+        except DeadlineExceeded:
+            job.state = DownloadJob.FAILED
+            job.error = "期限切れ"
+            self.logger.warning(f"ジョブ期限切れ #{job.job_id}: {job.url}")
+        except JobCancelled:
+            job.state = DownloadJob.CANCELLED
+            self.logger.info(f"ジョブキャンセル #{job.job_id}: {job.url}")
+        except Exception as e:
+            job.state = DownloadJob.FAILED
+            job.error = str(e)
+            self.logger.error(f"ジョブ失敗 #{job.job_id}: {e}")
+        finally:
+            job.finished_at = time.monotonic()
+            if scraper:
+                scraper.close()
+            self._notify(job)
@@ -0,0 +1,125 @@
+"""
+パイプラインイベント
+取得・保存の各段階で解析済みのデータを登録されたハンドラに渡し、
+変換・索引付け・通知などの後処理を保存済みファイルの再走査なしにその場で行う
+"""
+
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .metrics import get_metrics
+
+# イベント名と渡されるデータ（Event.data のキー）
+CHAPTER_FETCHED = 'chapter_fetched'  # record: ChapterRecord
+CHAPTER_SAVED = 'chapter_saved'  # record: ChapterRecord（record.path に保存先）
+RESOURCE_SAVED = 'resource_saved'  # url, path, kind（binary / css）
+COMMENTS_PAGE_SAVED = 'comments_page_saved'  # url, path, page, total, html
+NOVEL_COMPLETED = 'novel_completed'  # url, title, novel_info, output_dir, manifest, chapters
+EVENTS = (CHAPTER_FETCHED, CHAPTER_SAVED, RESOURCE_SAVED, COMMENTS_PAGE_SAVED, NOVEL_COMPLETED)
+
+# ハンドラに渡すイベント（data は上記のキーを持つ辞書）
+Event = namedtuple('Event', 'name data')
+
+
+class EventHooks:
+    """
+    イベントハンドラの登録と呼び出し
+
+    hooks.on('chapter_saved', handler)                   # 取得処理のスレッドでその場で実行
+    hooks.on('chapter_saved', handler, background=True)  # ワーカースレッドで実行
+    hooks.emit('chapter_saved', record=record)
+
+    ハンドラの例外はログに記録して握りつぶし、取得処理は止めない
+    ワーカーで実行待ちのハンドラが queue_size 件に達すると、emit() は空きが出るまで待機する
+    """
+
+    def __init__(self, workers=2, queue_size=64):
+        self.workers = workers
+        self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
+        self._handlers = {name: () for name in EVENTS}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = set()
+        self._slots = threading.BoundedSemaphore(max(1, queue_size))
+
+    def on(self, event, handler=None, background=False):
+        """
+        ハンドラを登録（handler を省略した場合はデコレータとして使う）
+
+        Args:
+            event: イベント名（EVENTS のいずれか）
+            handler: handler(Event) の形で呼ばれる関数
+            background: True ならワーカースレッドで実行（workers=0 の場合はその場で実行）
+        """
+        if event not in self._handlers:
+            raise ValueError(f"不明なイベント: {event}")
+        if handler is None:
+            return lambda func: self.on(event, func, background)
+        with self._lock:
+            # 呼び出し側はロックなしで参照するため、登録時に新しいタプルに置き換える
+            self._handlers[event] = self._handlers[event] + ((handler, background),)
+        return handler
+
+    def off(self, event, handler):
+        """ハンドラの登録を解除"""
+        with self._lock:
+            self._handlers[event] = tuple(
+                entry for entry in self._handlers.get(event, ()) if entry[0] is not handler
+            )
+
+    def has_handlers(self, event):
+        return bool(self._handlers.get(event))
+
+    def emit(self, event, **data):
+        """登録されたハンドラを登録順に呼び出す（ハンドラがなければ何もしない）"""
+        handlers = self._handlers[event]
+        if not handlers:
+            return
+        payload = Event(event, data)
+        for handler, background in handlers:
+            if background and self.workers > 0:
+                self._submit(handler, payload)
+            else:
+                self._call(handler, payload)
+
+    def _call(self, handler, event):
+        try:
+            handler(event)
+        except Exception as e:
+            self.metrics.inc('event_handler_errors_total', event=event.name)
+            self.logger.error(f"イベントハンドラエラー ({event.name}): {e}")
+
+    def _submit(self, handler, event):
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='event-hook')
+                future = self._pool.submit(self._call, handler, event)
+                self._pending.add(future)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    def flush(self, timeout=None):
+        """ワーカーで実行中・実行待ちのハンドラの完了を待つ"""
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            wait(pending, timeout)
+
+    def close(self):
+        """実行待ちのハンドラを完了させてワーカーを停止（以降の emit では再作成される）"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
@@ -0,0 +1,152 @@
+"""
+ジョブ制御モジュール
+キャンセル・期限（デッドライン）・一時停止と、中断可能な待機
+"""
+
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+class JobCancelled(BaseException):
+    """
+    ジョブがキャンセルされた
+
+    KeyboardInterrupt と同様に BaseException を継承し、
+    各処理の except Exception で握りつぶされずに呼び出し元まで伝わるようにしている
+    """
+
+
+class DeadlineExceeded(JobCancelled):
+    """ジョブの期限を過ぎた"""
+
+
+class CancellationToken:
+    """
+    キャンセルトークン
+
+    cancel() または期限切れで以降の check() / wait() が JobCancelled を送出する
+    wait() は time.sleep の代わりに使い、キャンセルされると即座に戻る
+    """
+
+    def __init__(self, timeout=None):
+        self._cancelled = threading.Event()
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def set_timeout(self, timeout):
+        """期限を現在から timeout 秒後に設定（Noneで期限なし）"""
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def remaining(self):
+        """期限までの残り秒数（期限なしはNone）"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def limit(self, seconds):
+        """待機・タイムアウト秒数を期限までに制限"""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        return min(seconds, remaining)
+
+    def check(self):
+        """キャンセル済み・期限切れなら例外を送出"""
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DeadlineExceeded()
+
+    def wait(self, seconds):
+        """最大 seconds 秒待機（キャンセル・期限切れで即座に例外）"""
+        self.check()
+        self._cancelled.wait(self.limit(seconds))
+        self.check()
+
+
+class JobControl(CancellationToken):
+    """
+    ジョブの一時停止・再開・キャンセル
+
+    スクレイパーはリクエストの合間に checkpoint() を呼び、
+    一時停止中はそこで待機し、キャンセル時は JobCancelled を送出する
+    """
+
+    def __init__(self, timeout=None):
+        super().__init__(timeout)
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        super().cancel()
+        self._running.set()
+
+    def checkpoint(self):
+        """一時停止中は再開まで待機し、キャンセル済みなら JobCancelled を送出"""
+        while not self._running.wait(self.limit(1.0)):
+            self.check()
+        self.check()
+
+
+# 実行中スレッドのキャンセルトークン（NetworkClient・各プロセッサ・FileManagerが参照）
+_current_token = contextvars.ContextVar('hameln_cancellation_token', default=None)
+
+
+@contextmanager
+def cancellation_scope(token):
+    """with ブロック内の処理に token を適用（Noneなら何もしない）"""
+    if token is None:
+        yield
+        return
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token():
+    """現在のキャンセルトークン（なければNone）"""
+    return _current_token.get()
+
+
+def check_cancelled():
+    """現在のトークンがキャンセル済み・期限切れなら例外を送出"""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def interruptible_sleep(seconds):
+    """キャンセルで中断できる time.sleep"""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.wait(seconds)
+
+
+def limit_timeout(seconds):
+    """タイムアウト秒数を現在のトークンの期限までに制限（最低0.1秒）"""
+    token = _current_token.get()
+    if token is None:
+        return seconds
+    return max(0.1, token.limit(seconds))
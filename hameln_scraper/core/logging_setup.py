@@ -0,0 +1,88 @@
+"""
+ログ設定モジュール
+キュー経由の非ブロッキング出力、ローテーション付きファイル、JSON形式に対応
+"""
+
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime
+
+
+# LogRecord の標準属性（これ以外は extra= で渡された構造化フィールドとして出力）
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコード1行のJSON形式（extra= のフィールドも出力）"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(config):
+    """
+    ルートロガーを設定
+
+    - ログ出力元はキューに積むだけで、整形・書き込みは QueueListener のスレッドで行う
+    - ファイルは RotatingFileHandler（log_max_bytes ごとに log_backup_count 世代）
+    - log_format='json' でファイル出力をJSON Lines形式にする
+    - 既に他のハンドラが設定済みの場合は変更しない（logging.basicConfig と同じ扱い）
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    level = config.log_level if config.debug_mode else logging.INFO
+
+    if _listener is not None or root.handlers:
+        if _listener is not None:
+            root.setLevel(level)
+        return
+
+    text_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler = logging.handlers.RotatingFileHandler(
+        config.log_file, maxBytes=config.log_max_bytes,
+        backupCount=config.log_backup_count, encoding='utf-8', delay=True
+    )
+    file_handler.setFormatter(JsonFormatter() if config.log_format == 'json' else text_formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(text_formatter)
+
+    log_queue = queue.Queue(-1)
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """キューに残ったログを書き出してリスナーを停止"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
@@ -0,0 +1,206 @@
+"""
+計測モジュール
+カウンタ・ヒストグラム・タイマーで処理段階ごとの時間と量を集計する
+"""
+
+import json
+import time
+import bisect
+import threading
+import functools
+from contextlib import contextmanager
+
+from .job_control import current_token
+
+
+METRIC_PREFIX = 'hameln_'
+
+# ヒストグラムのバケット境界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """ヒストグラム（件数・合計・最小・最大・バケット別件数）"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.bucket_counts)),
+        }
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key):
+    return ','.join(f'{k}="{v}"' for k, v in key)
+
+
+class MetricsRegistry:
+    """
+    計測値の登録クラス（スレッドセーフ）
+
+    メトリクス名とラベルの組ごとにカウンタ・ヒストグラムを保持する
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+
+    def reset(self):
+        """全ての計測値を破棄（実行ごとの集計開始時に呼ぶ）"""
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.started_at = time.time()
+
+    def inc(self, name, value=1, **labels):
+        """カウンタを加算"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """ヒストグラムに値を記録"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """with ブロックの経過時間（秒）をヒストグラムに記録"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def sleep(self, seconds, reason):
+        """待機し、待機時間を理由別に記録（キャンセルトークンがあれば中断可能）"""
+        self.inc('sleep_seconds_total', seconds, reason=reason)
+        self.observe('sleep_seconds', seconds, reason=reason)
+        token = current_token()
+        if token is None:
+            time.sleep(seconds)
+        else:
+            token.wait(seconds)
+
+    def snapshot(self):
+        """計測値を辞書として取得"""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(key), 'value': value}
+                for (name, key), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                dict({'name': name, 'labels': dict(key)}, **histogram.to_dict())
+                for (name, key), histogram in sorted(self.histograms.items())
+            ]
+        return {
+            'started_at': self.started_at,
+            'elapsed': time.time() - self.started_at,
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def summary(self):
+        """実行サマリーの表（ログ出力用）"""
+        data = self.snapshot()
+        lines = [f"計測サマリー（経過 {data['elapsed']:.1f}秒）"]
+        if data['histograms']:
+            lines.append(f"{'計測項目':<48} {'件数':>6} {'合計(秒)':>10} {'平均':>8} {'最大':>8}")
+            for h in data['histograms']:
+                label = _format_labels(_label_key(h['labels']))
+                name = f"{h['name']}{{{label}}}" if label else h['name']
+                lines.append(
+                    f"{name:<48} {h['count']:>6} {h['sum']:>10.3f} "
+                    f"{h['sum'] / h['count']:>8.3f} {h['max']:>8.3f}"
+                )
+        for c in data['counters']:
+            label = _format_labels(_label_key(c['labels']))
+            name = f"{c['name']}{{{label}}}" if label else c['name']
+            value = c['value']
+            lines.append(f"{name:<48} {value:>6.3f}" if isinstance(value, float) else f"{name:<48} {value:>6}")
+        return '\n'.join(lines)
+
+    def to_prometheus(self):
+        """Prometheusテキスト形式で出力"""
+        data = self.snapshot()
+        lines = []
+        typed = set()
+        for c in data['counters']:
+            name = METRIC_PREFIX + c['name']
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            label = _format_labels(_label_key(c['labels']))
+            lines.append(f"{name}{{{label}}} {c['value']}" if label else f"{name} {c['value']}")
+        for h in data['histograms']:
+            name = METRIC_PREFIX + h['name']
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            key = _label_key(h['labels'])
+            cumulative = 0
+            for bound, count in h['buckets'].items():
+                cumulative += count
+                le = _format_labels(key + (('le', bound),))
+                lines.append(f"{name}_bucket{{{le}}} {cumulative}")
+            label = _format_labels(key)
+            suffix = f"{{{label}}}" if label else ''
+            lines.append(f"{name}_sum{suffix} {h['sum']}")
+            lines.append(f"{name}_count{suffix} {h['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """ファイルに出力（拡張子 .json ならJSON、それ以外はPrometheusテキスト）"""
+        if path.endswith('.json'):
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        else:
+            content = self.to_prometheus()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics():
+    """プロセス共通の計測レジストリを取得"""
+    return _registry
+
+
+def timed(name, **labels):
+    """関数の実行時間を記録するデコレータ"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,186 @@
+"""
+プロファイリングモジュール
+処理段階（取得・解析・保存）ごとのcProfile、フレームグラフ用のcollapsed stack、
+tracemallocによるメモリ確保量の上位を出力する
+"""
+
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+
+# メモリ確保量を計測する段階
+MEMORY_STAGES = ('parse', 'save')
+
+
+class StageProfiler:
+    """
+    段階別プロファイラ
+
+    with profiler.stage('parse'): の区間を段階ごとに集計する
+    - cProfile: 段階ごとの関数別統計（<stage>.prof / <stage>.txt）
+    - サンプリング: 段階名を根とするcollapsed stack（profile.collapsed）
+    - tracemalloc: MEMORY_STAGES の確保量上位（memory_<stage>.txt）
+    """
+
+    def __init__(self, output_dir, memory_stages=MEMORY_STAGES, top_n=20, sample_interval=0.005):
+        self.output_dir = output_dir
+        self.memory_stages = memory_stages
+        self.top_n = top_n
+        self.sample_interval = sample_interval
+        self.logger = logging.getLogger(__name__)
+
+        self.profiles = {}
+        self.elapsed = Counter()
+        self.memory = {}
+        self.samples = Counter()
+
+        # スレッドごとの実行中の段階（入れ子の段階は外側に計上）
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name="StageProfiler", daemon=True)
+        self._sampler.start()
+
+    @contextmanager
+    def stage(self, name):
+        """段階を計測"""
+        thread_id = threading.get_ident()
+        if thread_id in self._active:
+            yield
+            return
+
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        trace_memory = name in self.memory_stages
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+            before = tracemalloc.take_snapshot()
+
+        with self._lock:
+            self._active[thread_id] = name
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.elapsed[name] += time.perf_counter() - start
+            with self._lock:
+                del self._active[thread_id]
+            if trace_memory and tracemalloc.is_tracing():
+                self._add_memory(name, tracemalloc.take_snapshot().compare_to(before, 'traceback'))
+
+    def _add_memory(self, name, stats):
+        totals = self.memory.setdefault(name, {})
+        for stat in stats:
+            if stat.size_diff <= 0:
+                continue
+            key = tuple(str(frame) for frame in stat.traceback)
+            size, count = totals.get(key, (0, 0))
+            totals[key] = (size + stat.size_diff, count + stat.count_diff)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, name in active.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(name)
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write_reports(self):
+        """レポートを出力し、出力したファイルのパス一覧を返す"""
+        self._stop.set()
+        self._sampler.join()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+
+        for name, profile in self.profiles.items():
+            prof_path = os.path.join(self.output_dir, f"{name}.prof")
+            profile.dump_stats(prof_path)
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(self.top_n)
+            text_path = os.path.join(self.output_dir, f"{name}.txt")
+            with open(text_path, 'w', encoding='utf-8') as f:
+                f.write(f"段階: {name} 合計 {self.elapsed[name]:.3f}秒\n")
+                f.write(stream.getvalue())
+            paths.extend([prof_path, text_path])
+
+        collapsed_path = os.path.join(self.output_dir, "profile.collapsed")
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        paths.append(collapsed_path)
+
+        for name, totals in self.memory.items():
+            memory_path = os.path.join(self.output_dir, f"memory_{name}.txt")
+            top = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:self.top_n]
+            with open(memory_path, 'w', encoding='utf-8') as f:
+                f.write(f"段階: {name} メモリ確保量 上位{self.top_n}件\n")
+                for rank, (frames, (size, count)) in enumerate(top, 1):
+                    f.write(f"\n#{rank}: {size / 1024:.1f} KiB ({count}ブロック)\n")
+                    for frame in frames:
+                        f.write(f"    {frame}\n")
+            paths.append(memory_path)
+
+        summary = ', '.join(f"{name} {seconds:.2f}秒" for name, seconds in self.elapsed.most_common())
+        self.logger.info(f"プロファイル出力: {self.output_dir} ({summary})")
+        return paths
+
+
+def profile_archive(scraper, novel_dir, output_dir):
+    """
+    保存済みアーカイブを再処理してプロファイルを取得（ネットワーク不要）
+
+    各章のHTMLを読み込み、解析（本文抽出）と保存（作業ディレクトリへの再保存）を
+    scraper の現在の設定で実行する
+
+    Args:
+        scraper: HamelnScraper（enable_profiling済み）
+        novel_dir: saved_novels/<タイトル>/ のパス
+        output_dir: 再保存先ディレクトリ
+
+    Returns:
+        int: 処理した章数
+    """
+    from bs4 import BeautifulSoup
+    from ..output.archive_reader import NovelArchive
+
+    archive = NovelArchive(novel_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    chapters = archive.chapter_files(scraper.novel_processor)
+    for ordinal, (chapter_url, file_path) in enumerate(chapters, 1):
+        with scraper.profile_stage('read'):
+            html_content = archive.read_html(file_path)
+        with scraper.profile_stage('parse'):
+            soup = BeautifulSoup(html_content, 'html.parser')
+            scraper.novel_processor.extract_chapter_content(soup, chapter_url)
+        with scraper.profile_stage('save'):
+            scraper.file_manager.save_complete_page(
+                html_content, chapter_url, f"{ordinal:04d}", output_dir, chapter_url
+            )
+    with scraper.profile_stage('save'):
+        scraper.file_manager.flush()
+    return len(chapters)
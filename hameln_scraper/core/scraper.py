@@ -3,37 +3,84 @@
 元のHamelnFinalScraperの機能を分割・整理
 """
 
+import os
+import re
+import html
+import asyncio
 import logging
-from typing import Optional, Dict, Any
-from bs4 import BeautifulSoup
+import functools
+from contextlib import nullcontext
+from typing import Optional, Dict, Any, Iterator, AsyncIterator
+from bs4 import BeautifulSoup, SoupStrainer
 
 from .config import ScraperConfig
+from .metrics import get_metrics
+from .events import EventHooks, CHAPTER_FETCHED, CHAPTER_SAVED, NOVEL_COMPLETED
+from .profiler import StageProfiler, profile_archive
+from .job_control import JobCancelled, CancellationToken, cancellation_scope, check_cancelled
+from .url_key import url_key
 from ..network.client import NetworkClient
+from ..network.single_flight import new_run, run_scope
+from ..network.failures import CircuitOpenError, FetchFailure, FailureKind
 from ..parsing.validator import PageValidator
 from ..comments.handler import CommentsHandler
 from ..resources.processor import ResourceProcessor
 from ..novel.processor import NovelProcessor
+from ..novel.chapter import ChapterRecord
+from ..novel.metadata import MetadataProbe
 from ..output.file_manager import FileManager
+from ..output.text_exporter import TextExporter
+from ..search.index import SearchIndex
+
+
+def cancellable(method):
+    """取得処理をキャンセルトークンのスコープ内で、1回の実行（ページのメモ化の範囲）として実行するデコレータ"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        token = self._start_token()
+        try:
+            with cancellation_scope(token), run_scope():
+                return method(self, *args, **kwargs)
+        finally:
+            self._active_token = None
+    return wrapper
 
 
 class HamelnScraper:
     """ハーメルンスクレイパー - リファクタリング版"""
     
-    def __init__(self, config: Optional[ScraperConfig] = None):
+    def __init__(self, config: Optional[ScraperConfig] = None,
+                 network_client: Optional[NetworkClient] = None):
         self.config = config or ScraperConfig()
         self.logger = self.config.setup_logging()
+        self.metrics = get_metrics()
         
-        # 各モジュールを初期化
-        self.network_client = NetworkClient(self.config)
+        # 各モジュールを初期化（network_client を渡した場合は共有し、close() で閉じない）
+        self.owns_network_client = network_client is None
+        self.network_client = network_client or NetworkClient(self.config)
         self.file_manager = FileManager(self.config)
-        self.comments_handler = CommentsHandler(self.config, self.network_client, self.file_manager)
-        self.resource_processor = ResourceProcessor(self.config, self.network_client)
+        # 後処理の拡張点（各モジュールが取得・保存した時点でハンドラを呼ぶ）
+        self.events = EventHooks(self.config.event_workers, self.config.event_queue_size)
+        self.comments_handler = CommentsHandler(self.config, self.network_client, self.file_manager, self.events)
+        self.resource_processor = ResourceProcessor(self.config, self.network_client, self.events)
         self.novel_processor = NovelProcessor(self.config, self.network_client)
 
         self.validator = PageValidator()
+        self._metadata_probe = None
+        self.profiler = None
+        self.progress_callback = None  # 進捗通知 progress_callback(dict)
+        self.job_control = None  # 一時停止・キャンセル（JobControl）
+        self._active_token = None  # 実行中の取得処理のキャンセルトークン
+        self.search_index = None
+        if self.config.enable_search_index:
+            self.search_index = SearchIndex(
+                os.path.join(self.config.output_root, self.config.search_index_file), self.config
+            )
+            self.events.on(CHAPTER_SAVED, self._index_chapter)
         
         self.logger.info("ハーメルンスクレイパー初期化完了（リファクタリング版）")
     
+    @cancellable
     def scrape_novel(self, novel_url: str) -> Dict[str, Any]:
         """
         小説を取得（メイン機能）
@@ -45,24 +92,37 @@ class HamelnScraper:
             Dict[str, Any]: 取得結果
         """
         self.logger.info(f"小説取得開始: {novel_url}")
+        self._reset_metrics()
         
         try:
             # メインページ取得
-            html_content = self.network_client.get_page(novel_url)
+            self.checkpoint()
+            with self.profile_stage('fetch'):
+                html_content = self.network_client.get_page(novel_url)
             if not html_content:
                 return {"success": False, "error": "ページ取得失敗"}
             
-            soup = BeautifulSoup(html_content, 'html.parser')
+            # 解析前にチャレンジ・エラーページを除外
+            verdict = self.validator.validate_raw(html_content, novel_url)
+            if not verdict.ok:
+                self.network_client.diagnostics.report_failure(novel_url, html_content, verdict.kind)
+                return {"success": False, "error": f"無効なページ ({verdict.kind})", "verdict": verdict.kind}
             
-            # ページ検証
-            if not self.validator.validate_page(soup, novel_url):
-                return {"success": False, "error": "無効なページ"}
-            
-            # 基本情報抽出
-            title = self._extract_title(soup)
-            author = self._extract_author(soup)
+            with self.profile_stage('parse'):
+                soup = BeautifulSoup(html_content, 'html.parser')
+                
+                # ページ検証
+                if not self.validator.validate_page(soup, novel_url):
+                    self.network_client.diagnostics.report_failure(novel_url, html_content, 'invalid_page', soup)
+                    return {"success": False, "error": "無効なページ"}
+                
+                # 基本情報抽出
+                title = self._extract_title(soup)
+                author = self._extract_author(soup)
             
             self.logger.info(f"小説情報取得: {title} by {author}")
+            self._report_progress(1, 1, len(html_content), title)
+            self.report_metrics()
             
             return {
                 "success": True,
@@ -76,6 +136,321 @@ class HamelnScraper:
             self.logger.error(f"小説取得エラー: {e}")
             return {"success": False, "error": str(e)}
     
+    @cancellable
+    def scrape_novel_text(self, novel_url: str, text_format: Optional[str] = None,
+                          incremental: bool = False, index_html: Optional[str] = None) -> Dict[str, Any]:
+        """
+        本文のみを取得してテキスト保存（テキストモード）
+        
+        リソース（CSS・JS・画像）、感想、小説情報ページは取得せず、
+        目次と各話の本文だけをMarkdown／プレーンテキストで保存する
+        
+        Args:
+            novel_url: 目次または各話のURL
+            text_format: "markdown" または "plain"（省略時は設定値）
+            incremental: True なら既存のマニフェストにある同じ位置の章は取得せずに引き継ぐ
+            index_html: 取得済みの目次ページ（更新確認で取得した場合に渡すと再取得しない）
+            
+        Returns:
+            Dict[str, Any]: 取得結果（出力先とマニフェストのパス、今回取得した章数を含む）
+        """
+        text_format = text_format or self.config.text_format
+        index_url = self._to_index_url(novel_url)
+        self.logger.info(f"テキストモード取得開始: {index_url} ({text_format})")
+        self._reset_metrics()
+        exporter = None
+        novel_info = {}
+        
+        def resume(info):
+            # 保存済みの章を引き継ぎ、各話を取得するかどうかの判定を返す
+            nonlocal exporter, novel_info
+            novel_info = info
+            exporter = self._text_exporter(info.get('title', 'Unknown Title'), text_format)
+            self.logger.info(f"増分取得: 保存済み {exporter.resume()}章")
+            return exporter.keep_existing
+        
+        try:
+            html_content, error = self._fetch_index(index_url, index_html)
+            if error:
+                return error
+            
+            fetched = 0
+            stream = self._chapter_stream(index_url, html_content, resume if incremental else None)
+            for record in stream:
+                novel_info = record.novel_info
+                if exporter is None:
+                    exporter = self._text_exporter(record.novel_title, text_format)
+                self._save_text_chapter(exporter, record)
+                fetched += 1
+            
+            if exporter is None or not exporter.chapters:
+                return {"success": False, "error": "本文取得失敗"}
+            
+            manifest_path = exporter.write_manifest(novel_info, index_url)
+            if self.search_index:
+                self.search_index.flush()
+            self._novel_completed(index_url, novel_info, exporter.output_dir, manifest_path, len(exporter.chapters))
+            self.logger.info(f"テキストモード保存完了: {exporter.output_dir} ({len(exporter.chapters)}章)")
+            self.report_metrics()
+            
+            return {
+                "success": True,
+                "title": novel_info.get('title', 'Unknown Title'),
+                "author": novel_info.get('author', 'Unknown Author'),
+                "url": index_url,
+                "output_dir": exporter.output_dir,
+                "manifest": manifest_path,
+                "chapters": len(exporter.chapters),
+                "new_chapters": fetched
+            }
+            
+        except JobCancelled:
+            # 保存済みの章までのマニフェストを残し、中断したアーカイブであることを記録
+            if exporter is not None and exporter.chapters:
+                exporter.write_manifest(novel_info, index_url, complete=False)
+            raise
+        except CircuitOpenError as e:
+            # サイト停止・ブロック中は残りの章を諦め、保存済みの章までを記録
+            self.logger.error(f"テキストモード取得中断: {e}")
+            if exporter is not None and exporter.chapters:
+                exporter.write_manifest(novel_info, index_url, complete=False)
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            self.logger.error(f"テキストモード取得エラー: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def iter_chapters(self, novel_url: str, save: bool = False,
+                      text_format: Optional[str] = None) -> Iterator[ChapterRecord]:
+        """
+        各話を取得・抽出した順に返すジェネレータ（ファイルへの保存は任意）
+        
+        次の話は呼び出し側が次の要素を要求した時点で取得するため、
+        取得は消費の速さに合わせて進み、読み進めない限りリクエストは発生しない
+        キャンセル・期限（job_control / job_timeout）は各話の取得ごとに適用される
+        
+        Args:
+            novel_url: 目次または各話のURL
+            save: True ならテキストモードと同じ形式で保存し、record.path に保存先を設定
+            text_format: 保存時の形式（省略時は設定値）
+            
+        Yields:
+            ChapterRecord: 各話の記録
+            
+        Raises:
+            FetchFailure: 目次ページを取得できない・無効なページ
+        """
+        index_url = self._to_index_url(novel_url)
+        token = self._start_token()
+        run = new_run()
+        exporter = None
+        stream = None
+        novel_info = {}
+        complete = False
+        count = 0
+        try:
+            with cancellation_scope(token), run_scope(run):
+                html_content, error = self._fetch_index(index_url)
+            if error:
+                kind = FailureKind.INVALID if error.get("verdict") else FailureKind.TRANSIENT
+                raise FetchFailure(kind, error["error"])
+            
+            stream = self._chapter_stream(index_url, html_content)
+            while True:
+                # 取得・抽出の間だけトークンを適用（呼び出し側の処理中は適用しない）
+                with cancellation_scope(token), run_scope(run):
+                    record = next(stream, None)
+                    if record is not None and save:
+                        if exporter is None:
+                            exporter = self._text_exporter(record.novel_title, text_format or self.config.text_format)
+                        self._save_text_chapter(exporter, record)
+                if record is None:
+                    break
+                novel_info = record.novel_info
+                count += 1
+                yield record
+            complete = True
+        finally:
+            if stream is not None:
+                stream.close()
+            manifest_path = None
+            if exporter is not None and exporter.chapters:
+                # 途中で止めた場合（break・キャンセル・エラー）は中断したアーカイブとして記録
+                manifest_path = exporter.write_manifest(novel_info, index_url, complete=complete)
+                if self.search_index:
+                    self.search_index.flush()
+            self._active_token = None
+            if complete and count:
+                output_dir = exporter.output_dir if exporter is not None else None
+                self._novel_completed(index_url, novel_info, output_dir, manifest_path, count)
+    
+    async def aiter_chapters(self, novel_url: str, save: bool = False,
+                             text_format: Optional[str] = None) -> AsyncIterator[ChapterRecord]:
+        """iter_chapters の非同期版（取得・抽出は別スレッドで行い、イベントループを止めない）"""
+        chapters = self.iter_chapters(novel_url, save, text_format)
+        try:
+            while True:
+                record = await asyncio.to_thread(next, chapters, None)
+                if record is None:
+                    return
+                yield record
+        finally:
+            await asyncio.to_thread(chapters.close)
+    
+    @property
+    def metadata_probe(self):
+        """メタデータの一括確認（初回参照時にキャッシュを読み込む）"""
+        if self._metadata_probe is None:
+            self._metadata_probe = MetadataProbe(self.config, self.network_client)
+        return self._metadata_probe
+    
+    def probe_metadata(self, novel, refresh: bool = False):
+        """
+        小説情報ページだけを取得して話数・最新投稿日時・連載状態を確認
+        
+        Args:
+            novel: 小説IDまたは小説のURL
+            refresh: True ならキャッシュの期限内でも確認する
+            
+        Returns:
+            NovelMetadata: 確認結果（取得失敗はNone）
+        """
+        with cancellation_scope(self.job_control):
+            return self.metadata_probe.probe(novel, refresh)
+    
+    def probe_metadata_many(self, novels, refresh: bool = False, workers: Optional[int] = None):
+        """複数の小説をまとめて確認（小説ID -> NovelMetadata、取得失敗はNone）"""
+        with cancellation_scope(self.job_control):
+            return self.metadata_probe.probe_many(novels, refresh, workers)
+    
+    def _fetch_index(self, index_url, html_content=None):
+        """
+        目次ページを取得して検証（html_content を渡した場合は取得せずに検証のみ）
+        
+        Returns:
+            tuple: (HTML, None) または (None, エラー結果の辞書)
+        """
+        self.checkpoint()
+        if html_content is None:
+            html_content = self.network_client.get_page(index_url)
+        if not html_content:
+            return None, {"success": False, "error": "ページ取得失敗"}
+        verdict = self.validator.validate_raw(html_content, index_url)
+        if not verdict.ok:
+            self.network_client.diagnostics.report_failure(index_url, html_content, verdict.kind)
+            return None, {"success": False, "error": f"無効なページ ({verdict.kind})", "verdict": verdict.kind}
+        return html_content, None
+    
+    def _chapter_stream(self, index_url, html_content, resume=None):
+        """
+        目次ページから各話を順に取得・抽出して ChapterRecord を返すジェネレータ
+        
+        resume(novel_info) を渡すと連載の各話の取得前に呼び、返された keep(ordinal, url) が
+        Trueの話（保存済み）は取得しない
+        """
+        soup = BeautifulSoup(html_content, 'html.parser')
+        novel_info = self.novel_processor.extract_novel_info(soup)
+        title = novel_info.get('title', 'Unknown Title')
+        chapter_links = self.novel_processor.get_chapter_links(soup, index_url)
+        total = len(chapter_links) or 1
+        self._report_progress(0, total, title=title)
+        
+        if not chapter_links:
+            # 短編は目次ページ自体に本文がある
+            body_html = self.novel_processor.extract_chapter_content(soup, index_url)
+            self._report_progress(1, 1, len(html_content), title)
+            if body_html:
+                record = ChapterRecord(1, title, index_url, body_html, 1, title, index_url, novel_info)
+                self.events.emit(CHAPTER_FETCHED, record=record)
+                yield record
+            return
+        
+        keep = resume(novel_info) if resume else None
+        fetched = 0
+        for ordinal, chapter_url in enumerate(chapter_links, 1):
+            if keep and keep(ordinal, chapter_url):
+                self._report_progress(ordinal, len(chapter_links), 0, title)
+                continue
+            if fetched:
+                self.metrics.sleep(self.config.request_delay, 'request_delay')
+            fetched += 1
+            self.checkpoint()
+            
+            self.logger.info(f"章 {ordinal}/{len(chapter_links)} を取得中: {chapter_url}")
+            with self.profile_stage('fetch'):
+                chapter_html = self.network_client.get_page(chapter_url)
+            self._report_progress(ordinal, len(chapter_links), len(chapter_html or ''), title)
+            if not chapter_html:
+                self.logger.warning(f"章 {ordinal} のページ取得に失敗しました")
+                continue
+            
+            with self.profile_stage('parse'):
+                chapter_title, body_html = self._extract_chapter_body(chapter_html, chapter_url)
+            if not body_html:
+                self.logger.warning(f"章 {ordinal} の本文取得に失敗しました")
+                self.network_client.diagnostics.report_failure(chapter_url, chapter_html, 'no_body')
+                continue
+            
+            record = ChapterRecord(
+                ordinal, chapter_title or f"第{ordinal}話", chapter_url, body_html,
+                total, title, index_url, novel_info
+            )
+            self.events.emit(CHAPTER_FETCHED, record=record)
+            yield record
+    
+    def _text_exporter(self, title, text_format):
+        """テキストモードの保存先（<output_root>/<タイトル>/text）"""
+        output_dir = os.path.join(
+            self.config.output_root, self.file_manager._sanitize_filename(title), 'text'
+        )
+        revision_store = None
+        if self.config.enable_revision_tracking:
+            revision_store = self.file_manager.get_revision_store(os.path.dirname(output_dir))
+        return TextExporter(output_dir, text_format, revision_store)
+    
+    def _save_text_chapter(self, exporter, record):
+        """1話をテキスト保存し、chapter_saved を通知（検索インデックスへの登録もここで行われる）"""
+        with self.profile_stage('save'):
+            record.path = exporter.save_chapter(record.ordinal, record.title, record.url, record.body_html)
+        self.events.emit(CHAPTER_SAVED, record=record)
+    
+    def _index_chapter(self, event):
+        """保存した話を検索インデックスに登録（chapter_saved のハンドラ）"""
+        record = event.data['record']
+        self.search_index.add_document(
+            record.url, record.text,
+            novel=record.novel_title, title=record.title, url=record.url, path=record.path
+        )
+    
+    def _novel_completed(self, index_url, novel_info, output_dir, manifest_path, chapters):
+        """全話の処理後に novel_completed を通知（ワーカーで実行中の各話のハンドラの完了を待ってから）"""
+        self.events.flush()
+        self.events.emit(
+            NOVEL_COMPLETED, url=index_url, title=novel_info.get('title', 'Unknown Title'),
+            novel_info=novel_info, output_dir=output_dir, manifest=manifest_path, chapters=chapters
+        )
+    
+    def _to_index_url(self, novel_url: str) -> str:
+        """各話のURLを目次ページのURLに変換（正規化URL）"""
+        key = url_key(novel_url)
+        return key.index_url if key.kind == 'chapter' else key
+    
+    def _extract_chapter_body(self, html_content: str, chapter_url: str):
+        """
+        章タイトルと本文HTMLを抽出
+        
+        #honbun だけを解析してツリー構築コストを抑え、見つからない場合のみページ全体を解析する
+        """
+        title_match = re.search(r'<title[^>]*>(.*?)</title>', html_content, re.IGNORECASE | re.DOTALL)
+        chapter_title = None
+        if title_match:
+            chapter_title = self.novel_processor.extract_chapter_title(html.unescape(title_match.group(1)).strip())
+        
+        body_soup = BeautifulSoup(html_content, 'html.parser', parse_only=SoupStrainer(id='honbun'))
+        if not body_soup.find(id='honbun'):
+            body_soup = BeautifulSoup(html_content, 'html.parser')
+        
+        return chapter_title, self.novel_processor.extract_chapter_content(body_soup, chapter_url)
+    
     def _extract_title(self, soup: BeautifulSoup) -> str:
         """タイトルを抽出"""
         # 複数のセレクターを試行
@@ -121,6 +496,10 @@ class HamelnScraper:
         """複数ページの感想を全て取得して統合"""
         return self.comments_handler.get_all_comments_pages(base_url)
     
+    def iter_reviews(self, comments_url):
+        """全ページの感想を逐次取り出す（ページ全体のツリーは作らない）"""
+        return self.comments_handler.iter_reviews(comments_url)
+    
     def extract_comments_content(self, soup):
         """感想コンテンツを抽出"""
         return self.comments_handler.extract_comments_content(soup)
@@ -157,13 +536,100 @@ class HamelnScraper:
         """完全なページを保存"""
         return self.file_manager.save_complete_page(url, output_dir, filename, **kwargs)
     
-    def fix_local_navigation_links(self, soup, chapter_mapping):
-        """ローカルナビゲーションリンクを修正"""
-        return self.file_manager.fix_local_navigation_links(soup, chapter_mapping)
+    def fix_local_navigation_links(self, soup, chapter_mapping, current_url=None, **kwargs):
+        """ローカルナビゲーションリンクを修正（chapter_mapping には LinkResolver も渡せる）"""
+        return self.file_manager.fix_local_navigation_links(soup, chapter_mapping, current_url, **kwargs)
+
+    def on(self, event, handler=None, background=False):
+        """
+        パイプラインイベントのハンドラを登録（handler を省略した場合はデコレータ）
+        
+        イベント: chapter_fetched / chapter_saved / resource_saved / comments_page_saved / novel_completed
+        ハンドラは handler(Event) の形で呼ばれ、Event.data に解析済みの記録・保存先などを受け取る
+        background=True のハンドラはワーカースレッド（event_workers）で実行される
+        """
+        return self.events.on(event, handler, background)
+    
+    def checkpoint(self):
+        """リクエストの合間に呼ぶ（一時停止中は待機、キャンセル時は JobCancelled）"""
+        if self.job_control:
+            self.job_control.checkpoint()
+        else:
+            check_cancelled()
+    
+    def cancel(self):
+        """実行中の取得処理を中断（別スレッドから呼び出し可能）"""
+        token = self.job_control or self._active_token
+        if token:
+            token.cancel()
+    
+    def _start_token(self):
+        """取得処理に適用するキャンセルトークン（job_timeout 設定時は期限付き）"""
+        if self.job_control:
+            self._active_token = self.job_control
+        else:
+            self._active_token = CancellationToken(self.config.job_timeout)
+        return self._active_token
+    
+    def _reset_metrics(self):
+        """単独実行時は計測値を実行ごとにリセット（共有クライアントでの並行実行時は累積）"""
+        if self.owns_network_client:
+            self.metrics.reset()
+    
+    def _report_progress(self, done, total, nbytes=0, title=None):
+        """
+        進捗を通知
+        
+        Args:
+            done: 処理済みの章数
+            total: 全章数
+            nbytes: 今回取得したバイト数（増分）
+            title: 小説タイトル
+        """
+        if self.progress_callback:
+            self.progress_callback({'done': done, 'total': total, 'bytes': nbytes, 'title': title})
+    
+    def enable_profiling(self, output_dir="profile"):
+        """段階別プロファイリングを有効化（close() でレポートを出力）"""
+        self.profiler = StageProfiler(output_dir)
+        self.logger.info(f"プロファイリング有効: {output_dir}")
+    
+    def profile_stage(self, name):
+        """プロファイリング有効時は段階を計測するコンテキスト"""
+        if self.profiler:
+            return self.profiler.stage(name)
+        return nullcontext()
+    
+    def profile_saved_novel(self, novel_dir, output_dir):
+        """保存済みアーカイブを再処理して解析・保存段階を計測（ネットワーク不要）"""
+        if not self.profiler:
+            self.enable_profiling()
+        return profile_archive(self, novel_dir, output_dir)
+    
+    def report_metrics(self):
+        """実行サマリーをログに出力し、設定があればファイルに書き出す"""
+        self.logger.info(self.metrics.summary())
+        if self.config.metrics_file:
+            try:
+                self.metrics.export(self.config.metrics_file)
+            except OSError as e:
+                self.logger.error(f"計測値の出力エラー: {e}")
 
+    def export_epub(self, novel_dir, output_path=None, workers=None):
+        """保存済みアーカイブをEPUB3に変換（ネットワーク不要）"""
+        from ..output.epub_writer import EpubWriter
+        return EpubWriter(self.config, workers).export(novel_dir, output_path)
     
     def close(self):
         """リソースをクリーンアップ"""
-        if self.network_client:
+        self.events.close()
+        self.resource_processor.flush()
+        if self.network_client and self.owns_network_client:
             self.network_client.close()
-        self.logger.info("スクレイパー終了")
+        if self.search_index:
+            self.search_index.close()
+        self.file_manager.close()
+        if self.profiler:
+            self.profiler.write_reports()
+            self.profiler = None
+        self.logger.info("スクレイパー終了")
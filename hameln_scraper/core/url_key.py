@@ -0,0 +1,161 @@
+"""
+URLの正規化キー
+URLを1回だけ解析・正規化し、小説ID・話番号・mode・ページ・アセットパスを属性に持つ
+インターン済みの文字列にする（キャッシュ・重複排除・対応表・マニフェストで共通のキーとして使う）
+"""
+
+import re
+import threading
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+SITE_HOST = 'syosetu.org'
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+_CHAPTER_PATH = re.compile(r'^/novel/(\d+)/(\d+)\.html$')
+_NOVEL_PATH = re.compile(r'^/novel/(\d+)/?$')
+_INTERN_MAX = 65536
+
+
+class UrlKey(str):
+    """
+    正規化済みURL
+
+    文字列としてそのまま比較・辞書のキー・JSON出力に使え、解析結果を属性に持つ
+    kind: 'chapter'（各話）/ 'index'（目次）/ 'mode'（?mode=... のページ）/ 'asset'（その他のファイル）/ 'other'
+    同じURLの異なる表記（スキーム・ホストの大文字・既定ポート・フラグメント・クエリの順序・page=1 の有無）は同じキーになる
+    """
+
+    origin = ''
+    host = ''
+    path = ''
+    kind = 'other'
+    novel_id = None
+    chapter = None
+    mode = None
+    page = None
+
+    @property
+    def is_site(self):
+        """サイト（syosetu.org）内のURLかどうか"""
+        return self.host == SITE_HOST or self.host.endswith('.' + SITE_HOST)
+
+    @property
+    def asset_path(self):
+        """リソースファイルのパス（ページの場合はNone）"""
+        return self.path if self.kind == 'asset' else None
+
+    @property
+    def index_url(self):
+        """小説の目次URL（小説IDがなければNone）"""
+        if self.novel_id is None:
+            return None
+        return url_key(f"{self.origin}/novel/{self.novel_id}/")
+
+    def with_page(self, page):
+        """ページ番号だけを替えたキー（mode のページ以外はそのまま）"""
+        if self.kind != 'mode' or page == self.page:
+            return self
+        parts = urlsplit(self)
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        params['page'] = str(page)
+        return url_key(urlunsplit(parts._replace(query=urlencode(params))))
+
+    def page_key(self):
+        """
+        ページの索引キー（各話・目次・mode のページ以外はNone）
+
+        Returns:
+            tuple: ('chapter', 小説ID, 話番号) / ('index', 小説ID) / ('mode', mode, 小説ID, ページ)
+        """
+        if self.kind == 'chapter':
+            return 'chapter', self.novel_id, self.chapter
+        if self.kind == 'index':
+            return 'index', self.novel_id
+        if self.kind == 'mode':
+            return 'mode', self.mode, self.novel_id, self.page
+        return None
+
+
+_interned = {}
+_intern_lock = threading.Lock()
+
+
+def _intern(key):
+    with _intern_lock:
+        existing = _interned.get(key)
+        if existing is not None:
+            return existing
+        if len(_interned) >= _INTERN_MAX:
+            _interned.clear()
+        _interned[key] = key
+        return key
+
+
+def _make(text, **attrs):
+    key = UrlKey(text)
+    key.__dict__.update(attrs)
+    return _intern(key)
+
+
+@lru_cache(maxsize=8192)
+def _parse(url, base):
+    text = urljoin(base, url.strip()) if base else url.strip()
+    if text.startswith('//'):
+        text = 'https:' + text
+    parts = urlsplit(text)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return _make(text)
+
+    host = parts.hostname.lower()
+    site = host == SITE_HOST or host.endswith('.' + SITE_HOST)
+    if site:
+        # サイト内はhttpsに統一し、クエリを並べ替えて表記の揺れをなくす
+        scheme = 'https'
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    query = parts.query
+    attrs = {'host': host, 'path': path, 'kind': 'other'}
+
+    if site:
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        chapter = _CHAPTER_PATH.match(path)
+        novel = _NOVEL_PATH.match(path)
+        if novel:
+            path = f"/novel/{novel.group(1)}/"
+            attrs.update(novel_id=novel.group(1), path=path)
+        if params.get('mode'):
+            page = params.get('page', '1')
+            page = int(page) if page.isdigit() else 1
+            if page == 1:
+                params.pop('page', None)
+            attrs.update(kind='mode', mode=params['mode'], page=page)
+            if params.get('nid'):
+                attrs['novel_id'] = params['nid']
+        elif chapter:
+            attrs.update(kind='chapter', novel_id=chapter.group(1), chapter=int(chapter.group(2)))
+        elif novel:
+            attrs['kind'] = 'index'
+        query = urlencode(sorted(params.items()))
+
+    if attrs['kind'] == 'other' and '.' in path.rsplit('/', 1)[-1]:
+        attrs['kind'] = 'asset'
+    origin = f"{scheme}://{host}"
+    return _make(origin + path + (f"?{query}" if query else ''), origin=origin, **attrs)
+
+
+def url_key(url, base=None):
+    """
+    URLの正規化キーを取得（同じ表記の解析は1回だけ行う）
+
+    Args:
+        url: URL（base があれば相対URLも可）
+        base: 相対URLの基準
+
+    Returns:
+        UrlKey: 正規化済みURL（http(s) 以外は前後の空白を除いた元の文字列、kind='other'）
+    """
+    if isinstance(url, UrlKey) and base is None:
+        return url
+    return _parse(str(url), base and str(base))
@@ -0,0 +1,334 @@
+"""
+更新監視モジュール
+フォロー中の小説の目次を条件付きリクエストで確認し、新しい話があれば増分取得する
+確認間隔は小説ごとに推定した更新間隔に合わせ、頻繁に更新される連載ほど短く、休止中の小説ほど長くする
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from bs4 import BeautifulSoup
+
+from .config import ScraperConfig
+from .metrics import get_metrics
+from .scraper import HamelnScraper
+from .job_control import JobControl, JobCancelled, cancellation_scope
+from .url_key import url_key
+from ..network.client import NetworkClient
+from ..network.failures import FetchFailure, CircuitOpenError
+from ..network.rate_limiter import RateLimiter
+
+# 更新間隔の推定値（指数移動平均）で新しい間隔に与える重み
+CADENCE_SMOOTHING = 0.3
+
+
+class WatchEntry:
+    """フォロー中の小説1件の監視状態"""
+
+    FIELDS = (
+        'url', 'title', 'etag', 'last_modified', 'chapters', 'last_change',
+        'cadence', 'interval', 'next_check', 'checks', 'changes', 'error',
+    )
+
+    def __init__(self, url, interval, **state):
+        self.url = url  # 目次の正規化URL
+        self.title = None
+        self.etag = None
+        self.last_modified = None
+        self.chapters = None  # 前回確認した話数（未確認はNone）
+        self.last_change = None  # 最後に新しい話を検出した時刻（初回確認の時刻を起点とする）
+        self.cadence = None  # 推定した更新間隔（秒）
+        self.interval = interval  # 現在の確認間隔（秒）
+        self.next_check = 0.0
+        self.checks = 0
+        self.changes = 0
+        self.error = None
+        for name, value in state.items():
+            if name in self.FIELDS:
+                setattr(self, name, value)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data, interval):
+        data = dict(data)
+        return cls(data.pop('url'), data.pop('interval', None) or interval, **data)
+
+
+class NovelWatcher:
+    """
+    フォローリストの更新監視（常駐）
+
+    watcher = NovelWatcher(config)
+    watcher.follow('https://syosetu.org/novel/123456/')
+    watcher.run()  # stop() を呼ぶまで、確認時刻の来た小説から順に確認
+
+    目次は ETag / Last-Modified 付きの条件付きリクエストで確認し（304なら本文を受信しない）、
+    話数が増えていれば保存済みの話を除いて取得する（テキストモードの増分取得）
+    リクエスト間隔は共有の RateLimiter（min_request_interval）で保つ
+    """
+
+    def __init__(self, config=None, scraper=None, on_update=None):
+        self.config = config or ScraperConfig()
+        self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
+        self.on_update = on_update  # on_update(entry, result) 増分取得の後に呼ばれる
+        self.owns_scraper = scraper is None
+        if scraper is None:
+            # DownloadManager と同様にクライアントを共有扱いにし、取得ごとに計測値をリセットしない
+            scraper = HamelnScraper(self.config, network_client=NetworkClient(self.config))
+        self.scraper = scraper
+        if self.scraper.network_client.rate_limiter is None:
+            self.scraper.network_client.rate_limiter = RateLimiter(self.config.min_request_interval)
+        self.control = JobControl()
+        self.scraper.job_control = self.control
+        self.state_path = os.path.join(self.config.output_root, self.config.watch_state_file)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def follow(self, url):
+        """小説をフォロー（各話のURLも可、既にフォロー中なら既存の状態を返す）"""
+        index_url = url_key(url).index_url
+        if index_url is None:
+            raise ValueError(f"小説のURLではありません: {url}")
+        with self._lock:
+            entry = self.entries.get(index_url)
+            if entry is None:
+                entry = self.entries[index_url] = WatchEntry(index_url, self.config.watch_initial_interval)
+        self.save()
+        return entry
+
+    def unfollow(self, url):
+        """フォローを解除（フォローしていなければFalse）"""
+        index_url = url_key(url).index_url
+        with self._lock:
+            removed = self.entries.pop(index_url, None) is not None
+        if removed:
+            self.save()
+        return removed
+
+    def load(self):
+        """保存した監視状態を読み込む"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.error(f"監視状態の読み込みエラー: {e}")
+            return
+        with self._lock:
+            for item in data.get('novels', []):
+                entry = WatchEntry.from_dict(item, self.config.watch_initial_interval)
+                self.entries[url_key(entry.url)] = entry
+
+    def save(self):
+        """監視状態を保存（一時ファイルに書いてから置き換え）"""
+        with self._lock:
+            data = {'novels': [entry.to_dict() for entry in self.entries.values()]}
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    def due(self, now=None):
+        """確認時刻の来た小説（確認時刻の早い順）"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = [entry for entry in self.entries.values() if entry.next_check <= now]
+        return sorted(entries, key=lambda entry: entry.next_check)
+
+    def check(self, entry):
+        """
+        1件を確認し、新しい話があれば増分取得
+
+        Returns:
+            bool: 新しい話を検出した（初回確認を含む）
+        """
+        now = time.time()
+        entry.checks += 1
+        try:
+            page = self.scraper.network_client.get_page_if_modified(entry.url, entry.etag, entry.last_modified)
+        except CircuitOpenError as e:
+            # サイト停止中は再開まで待ってから確認（間隔は変えない）
+            entry.error = str(e)
+            entry.next_check = now + max(e.retry_in, self.config.watch_min_interval)
+            self.metrics.inc('watch_checks_total', result='error')
+            return False
+        except FetchFailure as e:
+            self.logger.warning(f"更新確認失敗: {entry.url} ({e.reason})")
+            entry.error = e.reason
+            entry.next_check = now + entry.interval
+            self.metrics.inc('watch_checks_total', result='error')
+            return False
+
+        entry.error = None
+        if page.not_modified:
+            self.metrics.inc('watch_checks_total', result='not_modified')
+            self._schedule(entry, now, False)
+            return False
+
+        chapters = self._count_chapters(page.html, entry.url)
+        changed = entry.chapters is None or chapters > entry.chapters
+        if not changed:
+            entry.etag, entry.last_modified = page.etag, page.last_modified
+            entry.chapters = chapters
+            self.metrics.inc('watch_checks_total', result='unchanged')
+            self._schedule(entry, now, False)
+            return False
+
+        self.metrics.inc('watch_checks_total', result='changed')
+        self.logger.info(f"更新を検出: {entry.title or entry.url} ({entry.chapters} -> {chapters}話)")
+        result = self._update(entry, page.html)
+        if result.get('success'):
+            # 検証子は取得に成功してから更新する（失敗時は次回も本文を受信して再試行）
+            entry.etag, entry.last_modified = page.etag, page.last_modified
+            if entry.chapters is not None:
+                self._learn_cadence(entry, now)
+            entry.chapters = chapters
+            if entry.last_change is None:
+                entry.last_change = now
+        else:
+            entry.error = result.get('error')
+        self._schedule(entry, now, result.get('success', False))
+        return True
+
+    def _count_chapters(self, html_content, index_url):
+        soup = BeautifulSoup(html_content, 'html.parser')
+        return len(self.scraper.novel_processor.get_chapter_links(soup, index_url))
+
+    def _update(self, entry, index_html):
+        """増分取得（取得済みの目次を渡し、保存済みの話は取得しない）"""
+        try:
+            result = self.scraper.scrape_novel_text(entry.url, incremental=True, index_html=index_html)
+        except (FetchFailure, CircuitOpenError) as e:
+            result = {"success": False, "error": str(e)}
+        if result.get('success'):
+            entry.title = result.get('title') or entry.title
+            entry.changes += 1
+            self.metrics.inc('watch_updates_total')
+            self.logger.info(f"増分取得完了: {entry.title} (新規 {result.get('new_chapters', 0)}話)")
+        else:
+            self.logger.error(f"増分取得失敗: {entry.url} ({result.get('error')})")
+        if self.on_update:
+            self.on_update(entry, result)
+        return result
+
+    def _learn_cadence(self, entry, now):
+        """更新間隔の推定値を更新（前回の更新からの経過時間の指数移動平均）"""
+        if entry.last_change is not None and now > entry.last_change:
+            gap = now - entry.last_change
+            if entry.cadence is None:
+                entry.cadence = gap
+            else:
+                entry.cadence = CADENCE_SMOOTHING * gap + (1 - CADENCE_SMOOTHING) * entry.cadence
+        entry.last_change = now
+
+    def _schedule(self, entry, now, changed):
+        """次回の確認時刻を決める"""
+        config = self.config
+        target = entry.cadence * config.watch_cadence_fraction if entry.cadence else None
+        if changed:
+            interval = target or config.watch_initial_interval
+        else:
+            interval = entry.interval * config.watch_backoff
+            if target and entry.last_change is not None and now - entry.last_change < 2 * entry.cadence:
+                # 推定した更新間隔の範囲内は、推定値に基づく間隔より長く空けない
+                interval = min(interval, target)
+        entry.interval = min(max(interval, config.watch_min_interval), config.watch_max_interval)
+        entry.next_check = now + entry.interval
+
+    def run_once(self):
+        """確認時刻の来た小説を全て確認（確認した件数を返す）"""
+        entries = self.due()
+        for entry in entries:
+            self.control.checkpoint()
+            self.check(entry)
+            self.save()
+        return len(entries)
+
+    def seconds_until_next(self):
+        """次の確認までの秒数（フォローがなければ watch_min_interval）"""
+        with self._lock:
+            next_check = min((entry.next_check for entry in self.entries.values()), default=None)
+        if next_check is None:
+            return self.config.watch_min_interval
+        return max(1.0, next_check - time.time())
+
+    def run(self):
+        """stop() が呼ばれるまで監視を続ける（別スレッドからの stop() で待機中も即座に終了）"""
+        self.logger.info(f"更新監視開始: {len(self.entries)}件")
+        try:
+            with cancellation_scope(self.control):
+                while True:
+                    self.run_once()
+                    self.control.wait(self.seconds_until_next())
+        except JobCancelled:
+            self.logger.info("更新監視を停止")
+        finally:
+            self.save()
+
+    def stop(self):
+        """監視を停止（実行中の確認・取得も中断）"""
+        self.control.cancel()
+
+    def close(self):
+        if self.owns_scraper:
+            self.scraper.close()
+            self.scraper.network_client.close()
+
+
+def main():
+    """コマンドラインからフォローリストの管理と更新監視を実行"""
+    parser = argparse.ArgumentParser(description="フォロー中の小説の更新監視", prog='python -m hameln_scraper.core.watcher')
+    parser.add_argument('--root', default='saved_novels', help="保存先ルート")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    follow_parser = subparsers.add_parser('follow', help="小説をフォロー")
+    follow_parser.add_argument('urls', nargs='+', help="小説のURL")
+    unfollow_parser = subparsers.add_parser('unfollow', help="フォローを解除")
+    unfollow_parser.add_argument('urls', nargs='+', help="小説のURL")
+    subparsers.add_parser('list', help="フォロー中の小説と監視状態を表示")
+    run_parser = subparsers.add_parser('run', help="更新監視を実行（Ctrl+Cで停止）")
+    run_parser.add_argument('--once', action='store_true', help="確認時刻の来た小説を1回だけ確認して終了")
+
+    args = parser.parse_args()
+    watcher = NovelWatcher(ScraperConfig(output_root=args.root))
+    try:
+        if args.command == 'follow':
+            for url in args.urls:
+                try:
+                    watcher.follow(url)
+                    print(f"✓ フォロー: {url}")
+                except ValueError as e:
+                    print(e)
+                    sys.exit(1)
+        elif args.command == 'unfollow':
+            for url in args.urls:
+                print(f"✓ 解除: {url}" if watcher.unfollow(url) else f"フォローしていません: {url}")
+        elif args.command == 'list':
+            now = time.time()
+            for entry in sorted(watcher.entries.values(), key=lambda entry: entry.next_check):
+                cadence = f"{entry.cadence / 3600:.1f}h" if entry.cadence else "-"
+                wait = max(0.0, entry.next_check - now) / 3600
+                print(f"{entry.title or entry.url}  {entry.chapters or '-'}話  更新間隔 {cadence}  次回 {wait:.1f}h後")
+        elif args.once:
+            print(f"✓ 確認完了: {watcher.run_once()}件")
+        else:
+            try:
+                watcher.run()
+            except KeyboardInterrupt:
+                watcher.stop()
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
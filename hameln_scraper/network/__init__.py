@@ -2,5 +2,10 @@
 from .client import NetworkClient
 from .user_agent import UserAgentRotator
 from .compression import ResponseDecompressor
+from .rate_limiter import RateLimiter
+from .failures import FailureKind, FetchFailure, CircuitBreaker, CircuitOpenError
 
-__all__ = ["NetworkClient", "UserAgentRotator", "ResponseDecompressor"]
\ No newline at end of file
+__all__ = [
+    "NetworkClient", "UserAgentRotator", "ResponseDecompressor", "RateLimiter",
+    "FailureKind", "FetchFailure", "CircuitBreaker", "CircuitOpenError",
+]
\ No newline at end of file
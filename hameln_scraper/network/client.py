@@ -5,6 +5,8 @@ CloudScraper と Selenium の統合管理
 
 import time
 import logging
+from collections import namedtuple
+from contextlib import contextmanager
 import cloudscraper
 import undetected_chromedriver as uc
 from selenium.webdriver.chrome.options import Options
@@ -15,7 +17,21 @@ from typing import Optional, Union
 import requests
 
 from .user_agent import UserAgentRotator
+from ..core.metrics import get_metrics
+from ..core.diagnostics import PageDiagnostics
+from ..core.job_control import check_cancelled, limit_timeout
 from .compression import ResponseDecompressor
+from .single_flight import SingleFlight
+from ..core.url_key import url_key
+from .failures import (
+    FailureKind, FetchFailure, CircuitOpenError, CircuitBreakers, classify_response, classify_exception
+)
+
+
+# 条件付きリクエストの結果（not_modified=True なら html はNone、etag / last_modified は次回の確認に使う検証子）
+ConditionalPage = namedtuple('ConditionalPage', 'not_modified html etag last_modified')
+# リソースの条件付きリクエストの結果（not_modified=True なら content はNone）
+ConditionalResource = namedtuple('ConditionalResource', 'not_modified content etag last_modified')
 
 
 class NetworkClient:
@@ -24,6 +40,13 @@ class NetworkClient:
     def __init__(self, config):
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
+        self.rate_limiter = None  # 共有時のリクエスト間隔制御（RateLimiter）
+        self.diagnostics = PageDiagnostics(config)
+        self.circuit_breakers = CircuitBreakers(config.circuit_failure_threshold, config.circuit_cooldown)
+        # 同じURLへの同時リクエストをまとめ、取得結果を実行中メモ化
+        self.page_requests = SingleFlight(config.page_memo_size)
+        self.resource_requests = SingleFlight(config.resource_memo_size)
         self.ua_rotator = UserAgentRotator(config.user_agents)
         self.decompressor = ResponseDecompressor()
         
@@ -88,9 +111,143 @@ class NetworkClient:
         new_ua = self.ua_rotator.rotate()
         if self.cloudscraper:
             self.cloudscraper.headers.update({'User-Agent': new_ua})
-        self.logger.debug(f"User-Agent切り替え: {new_ua[:50]}...")
+        self.logger.debug("User-Agent切り替え: %s...", new_ua[:50])
     
     def get_page(self, url: str, retry_count: int = None) -> Optional[str]:
+        """
+        ページを取得（同じURLの同時リクエストは1本にまとめ、成功した結果はメモ化）
+        
+        Args:
+            url: 取得するURL
+            retry_count: リトライ回数
+            
+        Returns:
+            str: ページ内容（HTML）
+        """
+        html, shared = self.page_requests.do(url_key(url), lambda: self._fetch_page(url, retry_count))
+        if shared:
+            self.metrics.inc('request_dedup_total', kind='page')
+        return html
+    
+    def fetch_bytes(self, url: str, timeout: float = 10) -> bytes:
+        """
+        リソース（CSS・画像・JS）を取得（同じURLの同時リクエストは1本にまとめ、結果はメモ化）
+        
+        Raises:
+            requests.RequestException: 取得失敗（失敗はメモ化しない）
+        """
+        def fetch():
+            response = self.cloudscraper.get(url, timeout=limit_timeout(timeout))
+            response.raise_for_status()
+            return response.content
+        content, shared = self.resource_requests.do(url_key(url), fetch)
+        if shared:
+            self.metrics.inc('request_dedup_total', kind='resource')
+        return content
+    
+    def fetch_bytes_if_modified(self, url: str, etag: str = None, last_modified: str = None,
+                                timeout: float = 10) -> ConditionalResource:
+        """
+        リソースを条件付きリクエストで取得（共有ライブラリの再検証用、メモ化しない）
+        
+        検証子を省略した場合は通常の取得と同じで、応答の検証子を返す
+        
+        Raises:
+            requests.RequestException: 取得失敗
+        """
+        check_cancelled()
+        headers = self._validator_headers(etag, last_modified)
+        response = self.cloudscraper.get(url, headers=headers, timeout=limit_timeout(timeout))
+        if response.status_code == 304:
+            self.metrics.inc('conditional_requests_total', result='not_modified')
+            return ConditionalResource(True, None, etag, last_modified)
+        response.raise_for_status()
+        if headers:
+            self.metrics.inc('conditional_requests_total', result='modified')
+        return ConditionalResource(
+            False, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified')
+        )
+    
+    @staticmethod
+    def _validator_headers(etag, last_modified):
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+    
+    def forget(self, url: str):
+        """メモ化した取得結果を破棄（更新確認などで取得し直す場合）"""
+        key = url_key(url)
+        self.page_requests.forget(key)
+        self.resource_requests.forget(key)
+    
+    def get_page_if_modified(self, url: str, etag: str = None, last_modified: str = None) -> ConditionalPage:
+        """
+        条件付きリクエスト（If-None-Match / If-Modified-Since）でページを確認
+        
+        更新確認用のためメモ化せず、リトライもしない（失敗時は次回の確認に任せる）
+        変更があった場合は古いメモを破棄し、以降の get_page が新しい内容を取得するようにする
+        
+        Args:
+            url: 確認するURL
+            etag: 前回の ETag
+            last_modified: 前回の Last-Modified
+            
+        Returns:
+            ConditionalPage: 304なら not_modified=True、それ以外は本文と新しい検証子
+            
+        Raises:
+            FetchFailure: 取得失敗（分類済み）
+            CircuitOpenError: ホストのサーキットブレーカーが開いており、待機上限を超える場合
+        """
+        check_cancelled()
+        breaker = self.circuit_breakers.for_url(url)
+        headers = self._validator_headers(etag, last_modified)
+        with self._circuit_trial(breaker):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            return self._conditional_get(url, headers, breaker, etag, last_modified)
+    
+    def _conditional_get(self, url, headers, breaker, etag, last_modified):
+        """条件付きリクエストを1回送信し、結果をブレーカーに記録"""
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            try:
+                response = self.cloudscraper.get(url, headers=headers, timeout=limit_timeout(30))
+            except Exception as e:
+                failure = classify_exception(e)
+                if breaker.record_failure(failure):
+                    self.metrics.inc('circuit_open_total', host=breaker.host)
+                raise failure
+            status = response.status_code
+            if status == 304:
+                breaker.record_success()
+                self.metrics.inc('conditional_requests_total', result='not_modified')
+                return ConditionalPage(True, None, etag, last_modified)
+            failure = classify_response(response)
+            if failure:
+                self.metrics.inc('fetch_failures_total', kind=failure.kind)
+                if failure.kind == FailureKind.PERMANENT:
+                    breaker.record_success()
+                elif breaker.record_failure(failure):
+                    self.metrics.inc('circuit_open_total', host=breaker.host)
+                raise failure
+            breaker.record_success()
+            self.metrics.inc('conditional_requests_total', result='modified')
+            self.metrics.inc('http_response_bytes_total', len(response.content), backend='cloudscraper')
+            html = self.decompressor.decompress(response)
+            self.forget(url)
+            return ConditionalPage(
+                False, html, response.headers.get('ETag'), response.headers.get('Last-Modified')
+            )
+        finally:
+            self.metrics.observe('http_request_seconds', time.perf_counter() - start,
+                                 backend='cloudscraper', status=status)
+    
+    def _fetch_page(self, url: str, retry_count: int = None) -> Optional[str]:
         """
         ページを取得（CloudScraper + Seleniumフォールバック）
         
@@ -100,62 +257,136 @@ class NetworkClient:
             
         Returns:
             str: ページ内容（HTML）
+            
+        Raises:
+            CircuitOpenError: ホストのサーキットブレーカーが開いており、待機上限を超える場合
         """
         if retry_count is None:
             retry_count = self.config.retry_count
+        breaker = self.circuit_breakers.for_url(url)
             
         for attempt in range(retry_count):
-            try:
-                # CloudScraperで取得試行
-                response = self._get_with_cloudscraper(url)
-                if response:
-                    return response
+            check_cancelled()
+            # 半開の試行枠は結果を記録せずに抜けた場合（キャンセル・想定外の例外）も必ず返す
+            with self._circuit_trial(breaker):
+                try:
+                    if self.rate_limiter:
+                        self.rate_limiter.acquire()
                 
-                # Seleniumフォールバック
-                if self.driver:
-                    response = self._get_with_selenium(url)
-                    if response:
+                    # CloudScraperで取得試行
+                    try:
+                        response = self._get_with_cloudscraper(url)
+                        breaker.record_success()
                         return response
+                    except FetchFailure as error:
+                        failure = error
+                        self.metrics.inc('fetch_failures_total', kind=failure.kind)
+                        if failure.kind == FailureKind.PERMANENT:
+                            # ホスト自体は応答しているのでブレーカーは閉じたまま
+                            breaker.record_success()
+                            self.logger.warning(f"取得失敗（リトライ対象外）: {failure.reason} {url}")
+                            break
+                    
+                        # Seleniumフォールバック
+                        if self.driver and failure.kind in (FailureKind.CHALLENGE, FailureKind.TRANSIENT):
+                            response = self._get_with_selenium(url)
+                            if response:
+                                breaker.record_success()
+                                return response
+                    
+                        if breaker.record_failure(failure):
+                            self.metrics.inc('circuit_open_total', host=breaker.host)
+                            self.logger.warning(f"サーキットブレーカー開放: {breaker.host} ({failure.reason})")
+                            continue  # 待機は次の試行前の _wait_for_circuit に任せる
                 
-                # 失敗時の待機
-                if attempt < retry_count - 1:
-                    delay = min(self.config.request_delay * (attempt + 1), self.config.max_delay)
-                    self.logger.warning(f"取得失敗、{delay}秒後にリトライ (試行 {attempt + 1}/{retry_count})")
-                    time.sleep(delay)
-                    self.rotate_user_agent()
+                    # 失敗時の待機
+                    if attempt < retry_count - 1:
+                        delay = self._retry_delay(failure, attempt)
+                        self.logger.warning(
+                            f"取得失敗（{failure.kind}: {failure.reason}）、{delay}秒後にリトライ "
+                            f"(試行 {attempt + 1}/{retry_count})"
+                        )
+                        self.metrics.sleep(delay, 'retry_backoff')
+                        self.rotate_user_agent()
                     
-            except Exception as e:
-                self.logger.error(f"ページ取得エラー (試行 {attempt + 1}): {e}")
-                if attempt < retry_count - 1:
-                    time.sleep(self.config.request_delay)
+                except Exception as e:
+                    self.logger.error(f"ページ取得エラー (試行 {attempt + 1}): {e}")
+                    if attempt < retry_count - 1:
+                        self.metrics.sleep(self.config.request_delay, 'retry_error')
         
+        self.metrics.inc('page_fetch_failures_total')
         self.logger.error(f"ページ取得失敗: {url}")
         return None
     
-    def _get_with_cloudscraper(self, url: str) -> Optional[str]:
-        """CloudScraperでページ取得"""
+    def _retry_delay(self, failure, attempt):
+        """失敗の種類に応じたリトライまでの待機秒数"""
+        if failure.kind == FailureKind.RATE_LIMITED:
+            return failure.retry_after if failure.retry_after is not None else self.config.max_delay
+        return min(self.config.request_delay * (attempt + 1), self.config.max_delay)
+    
+    @contextmanager
+    def _circuit_trial(self, breaker):
+        """ブレーカーの再開を待ってから取得し、結果を記録せずに抜けた場合は半開の試行枠を返す"""
+        self._wait_for_circuit(breaker)
         try:
-            response = self.cloudscraper.get(url, timeout=30)
-            if response.status_code == 200:
-                return self.decompressor.decompress(response)
-            else:
-                self.logger.warning(f"CloudScraper取得失敗: {response.status_code}")
-                return None
-        except Exception as e:
-            self.logger.debug(f"CloudScraper エラー: {e}")
-            return None
+            yield
+        finally:
+            breaker.release_trial()
+    
+    def _wait_for_circuit(self, breaker):
+        """ブレーカーが開いていれば再開まで待機（circuit_max_wait を超える場合は即座に失敗）"""
+        retry_in = breaker.retry_in()
+        while retry_in > 0:
+            if retry_in > self.config.circuit_max_wait:
+                raise CircuitOpenError(breaker.host, breaker.last_reason, retry_in)
+            self.logger.warning(f"{breaker.host} への取得を一時停止中: {retry_in:.0f}秒待機 ({breaker.last_reason})")
+            self.metrics.sleep(retry_in, 'circuit_open')
+            retry_in = breaker.retry_in()
+    
+    def _get_with_cloudscraper(self, url: str) -> str:
+        """CloudScraperでページ取得（失敗時は分類した FetchFailure を送出）"""
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            try:
+                response = self.cloudscraper.get(url, timeout=limit_timeout(30))
+            except Exception as e:
+                self.logger.debug("CloudScraper エラー: %s", e)
+                raise classify_exception(e)
+            status = response.status_code
+            failure = classify_response(response)
+            if failure:
+                self.logger.warning(f"CloudScraper取得失敗: {failure.reason}")
+                if failure.kind in (FailureKind.CHALLENGE, FailureKind.INVALID):
+                    self.diagnostics.report_failure(url, response.content, failure.kind)
+                raise failure
+            self.metrics.inc('http_response_bytes_total', len(response.content), backend='cloudscraper')
+            html = self.decompressor.decompress(response)
+            self.diagnostics.observe(url, html, status)
+            return html
+        finally:
+            self.metrics.observe('http_request_seconds', time.perf_counter() - start,
+                                 backend='cloudscraper', status=status)
     
     def _get_with_selenium(self, url: str) -> Optional[str]:
         """Seleniumでページ取得"""
+        start = time.perf_counter()
+        status = 'error'
         try:
             self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(
+            WebDriverWait(self.driver, limit_timeout(10)).until(
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
-            return self.driver.page_source
+            page_source = self.driver.page_source
+            status = 'ok'
+            self.metrics.inc('http_response_bytes_total', len(page_source.encode('utf-8')), backend='selenium')
+            return page_source
         except Exception as e:
-            self.logger.debug(f"Selenium エラー: {e}")
+            self.logger.debug("Selenium エラー: %s", e)
             return None
+        finally:
+            self.metrics.observe('http_request_seconds', time.perf_counter() - start,
+                                 backend='selenium', status=status)
     
     def close(self):
         """リソースをクリーンアップ"""
@@ -165,4 +396,4 @@ class NetworkClient:
             except Exception:
                 pass
         if self.session:
-            self.session.close()
+            self.session.close()
@@ -0,0 +1,192 @@
+"""
+取得失敗の分類とホスト単位のサーキットブレーカー
+サイトの停止・ブロック時に残りの全話でリトライを繰り返さないようにする
+"""
+
+import time
+import threading
+from urllib.parse import urlparse
+
+from ..parsing.keyword_scanner import PageVerdict, scan_page
+
+
+class FailureKind:
+    """取得失敗の種類"""
+
+    PERMANENT = 'permanent'  # 404 等（リトライしても変わらない）
+    RATE_LIMITED = 'rate_limited'  # 429（Retry-After まで待機）
+    CHALLENGE = 'challenge'  # 403・Cloudflareのチャレンジページ（bot検知）
+    TRANSIENT = 'transient'  # 5xx・タイムアウト・接続エラー
+    INVALID = 'invalid'  # 200だが内容が空・不正
+
+
+PERMANENT_STATUSES = {400, 401, 404, 405, 410, 414, 451}
+
+# 200で返ったページの判定結果 -> 失敗の種類
+VERDICT_FAILURES = {
+    PageVerdict.CHALLENGE: FailureKind.CHALLENGE,
+    PageVerdict.NOT_FOUND: FailureKind.PERMANENT,
+    PageVerdict.MAINTENANCE: FailureKind.TRANSIENT,
+    PageVerdict.ERROR: FailureKind.TRANSIENT,
+    PageVerdict.EMPTY: FailureKind.INVALID,
+}
+
+
+class FetchFailure(Exception):
+    """分類済みの取得失敗"""
+
+    def __init__(self, kind, reason, status=None, retry_after=None):
+        super().__init__(reason)
+        self.kind = kind
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """ホストのサーキットブレーカーが開いている（待機上限を超えるため即座に失敗）"""
+
+    def __init__(self, host, reason, retry_in):
+        super().__init__(f"{host} への取得を停止中（{retry_in:.0f}秒後に再開）: {reason}")
+        self.host = host
+        self.reason = reason
+        self.retry_in = retry_in
+
+
+def _parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_response(response):
+    """
+    レスポンスを分類
+
+    Returns:
+        FetchFailure: 失敗の場合（成功ならNone）
+    """
+    status = response.status_code
+    body = response.content or b''
+    if status == 200:
+        verdict = scan_page(body)
+        if verdict.ok:
+            return None
+        reason = f"{verdict.kind}ページを受信" + (f" ({verdict.keyword})" if verdict.keyword else "")
+        return FetchFailure(VERDICT_FAILURES[verdict.kind], reason, status)
+    if status == 429:
+        retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+        return FetchFailure(FailureKind.RATE_LIMITED, "429 Too Many Requests", status, retry_after)
+    if status == 403 or (status == 503 and scan_page(body).kind == PageVerdict.CHALLENGE):
+        return FetchFailure(FailureKind.CHALLENGE, f"{status} bot検知により拒否", status)
+    if status in PERMANENT_STATUSES:
+        return FetchFailure(FailureKind.PERMANENT, f"{status} リトライ対象外", status)
+    return FetchFailure(FailureKind.TRANSIENT, f"HTTP {status}", status)
+
+
+def classify_exception(error):
+    """送信時の例外を分類（タイムアウト・接続エラー等は一時的な失敗）"""
+    return FetchFailure(FailureKind.TRANSIENT, f"{type(error).__name__}: {error}")
+
+
+class CircuitBreaker:
+    """
+    ホスト単位のサーキットブレーカー（スレッドセーフ）
+
+    一時的な失敗・bot検知が threshold 回続くと開き、cooldown 秒の間は取得を止める
+    経過後は1件だけ試行し（半開）、成功すれば閉じ、失敗すれば再び開く
+    Retry-After 付きの429はその時間だけ即座に開く
+    試行枠を得たスレッドは、結果を記録せずに抜ける場合（キャンセル等）は release_trial() で枠を返す
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, host, threshold=5, cooldown=60.0):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.last_reason = None
+        self._open_until = 0.0
+        self._trial_running = False
+        self._trial_owner = None  # 半開の試行枠を持つスレッド
+        self._lock = threading.Lock()
+
+    def retry_in(self):
+        """
+        取得を始めてよいか判定
+
+        Returns:
+            float: 待機が必要な秒数（0なら取得可能）
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now < self._open_until:
+                    return self._open_until - now
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self._trial_running:
+                return 1.0
+            self._trial_running = True
+            self._trial_owner = threading.get_ident()
+            return 0.0
+
+    def release_trial(self):
+        """呼び出したスレッドが半開の試行枠を持ったままなら返す（結果を記録済みなら何もしない）"""
+        with self._lock:
+            if self._trial_running and self._trial_owner == threading.get_ident():
+                self._trial_running = False
+                self._trial_owner = None
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+            self._trial_owner = None
+
+    def record_failure(self, failure):
+        """失敗を記録（開いた場合はTrue）"""
+        with self._lock:
+            if failure.kind == FailureKind.PERMANENT:
+                return False
+            self.failures += 1
+            self.last_reason = failure.reason
+            cooldown = None
+            if failure.kind == FailureKind.RATE_LIMITED and failure.retry_after:
+                cooldown = failure.retry_after
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                cooldown = max(cooldown or 0.0, self.cooldown)
+            if cooldown is None:
+                return False
+            self.state = self.OPEN
+            self._open_until = time.monotonic() + cooldown
+            self._trial_running = False
+            self._trial_owner = None
+            return True
+
+
+class CircuitBreakers:
+    """ホスト名ごとのサーキットブレーカー"""
+
+    def __init__(self, threshold=5, cooldown=60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host, self.threshold, self.cooldown)
+                self._breakers[host] = breaker
+            return breaker
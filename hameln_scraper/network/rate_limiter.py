@@ -0,0 +1,29 @@
+"""
+リクエスト間隔の制御
+複数のジョブで共有するネットワーククライアント全体のリクエスト間隔を保つ
+"""
+
+import time
+import threading
+
+from ..core.metrics import get_metrics
+
+
+class RateLimiter:
+    """最小リクエスト間隔を保証するレートリミッタ（スレッドセーフ）"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.metrics = get_metrics()
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def acquire(self):
+        """次のリクエスト枠まで待機"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_time)
+            self._next_time = slot + self.min_interval
+        wait = slot - now
+        if wait > 0:
+            self.metrics.sleep(wait, 'rate_limit')
@@ -0,0 +1,124 @@
+"""
+リクエストの重複排除
+同じURLへの同時リクエストを1本にまとめ（シングルフライト）、結果を実行中メモ化する
+"""
+
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict
+
+from ..core.job_control import JobCancelled, check_cancelled
+from ..core.url_key import url_key
+
+# 重複判定のキーはキャッシュ・対応表と共通の正規化URL（旧名）
+request_key = url_key
+
+# 現在の実行（メモ化した結果はこの実行の中でだけ再利用する、実行外はNone）
+_current_run = contextvars.ContextVar('single_flight_run', default=None)
+_run_ids = itertools.count(1)
+
+
+def new_run():
+    """新しい実行IDを発行"""
+    return next(_run_ids)
+
+
+@contextmanager
+def run_scope(run=None):
+    """
+    with ブロック内を1回の実行とする（run を省略した場合、既に実行中ならその実行を引き継ぐ）
+
+    共有のネットワーククライアントでも、前回の実行でメモ化したページは次の実行では使わない
+    """
+    if run is None:
+        run = _current_run.get() or new_run()
+    reset = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(reset)
+
+
+class _Call:
+    """実行中のリクエスト"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    キーごとのシングルフライト（スレッドセーフ）
+
+    同じキーの do() が同時に呼ばれた場合は最初の呼び出しだけが fn を実行し、
+    他の呼び出しはその完了を待って同じ結果（または例外）を受け取る
+    実行（run_scope）の中では結果が None 以外なら max_entries 件までLRUでメモ化し、同じ実行の
+    以降の呼び出しは即座に返す（別の実行のメモは使わずに取得し直し、実行外ではメモ化しない）
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._memo = OrderedDict()
+
+    def do(self, key, fn):
+        """
+        fn() を実行して結果を返す
+
+        Returns:
+            tuple: (結果, 共有・メモ化された結果なら True)
+        """
+        run = _current_run.get()
+        while True:
+            with self._lock:
+                memo = self._memo.get(key)
+                if memo is not None and memo[0] == run:
+                    self._memo.move_to_end(key)
+                    return memo[1], True
+                if memo is not None:
+                    del self._memo[key]
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if leader:
+                return self._run(key, call, fn, run), False
+
+            while not call.done.wait(0.1):
+                check_cancelled()
+            if isinstance(call.error, JobCancelled):
+                continue  # 先行した呼び出し側のジョブが中断された場合は自分で取得し直す
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+    def _run(self, key, call, fn, run):
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and call.result is not None and run is not None and self.max_entries > 0:
+                    self._memo[key] = (run, call.result)
+                    while len(self._memo) > self.max_entries:
+                        self._memo.popitem(last=False)
+            call.done.set()
+
+    def forget(self, key):
+        """メモ化した結果を破棄（次回は取得し直す）"""
+        with self._lock:
+            self._memo.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
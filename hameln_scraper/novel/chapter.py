@@ -0,0 +1,33 @@
+"""
+章の記録
+iter_chapters() が取得・抽出した順に返す各話のデータ
+"""
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class ChapterRecord:
+    """取得・抽出済みの1話分"""
+
+    ordinal: int  # 1始まりの話数（目次の順）
+    title: str
+    url: str
+    body_html: str  # 本文（#honbun）のHTML
+    total: int  # 全話数
+    novel_title: str
+    novel_url: str
+    novel_info: Dict[str, Any] = field(default_factory=dict)  # 作者・あらすじ等
+    path: Optional[str] = None  # 保存した場合のファイルパス
+
+    @property
+    def author(self):
+        return self.novel_info.get('author')
+
+    @cached_property
+    def text(self):
+        """本文のプレーンテキスト（ルビは親文字のみ）"""
+        from ..search.index import html_to_text
+        return html_to_text(self.body_html)
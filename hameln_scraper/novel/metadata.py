@@ -0,0 +1,292 @@
+"""
+小説のメタデータ確認
+小説情報ページ（?mode=ss_detail）の表だけを字句解析し、話数・最新投稿日時・連載状態を小さな記録にする
+目次や本文は取得せず、結果はキャッシュして期限切れ後は条件付きリクエストで確認する
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import tempfile
+import threading
+import contextvars
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Optional
+
+from ..core.metrics import get_metrics
+from ..core.url_key import url_key
+from ..network.failures import FetchFailure, CircuitOpenError
+from ..network.rate_limiter import RateLimiter
+
+# 表の見出し -> 記録の項目（先に見つかったものを使う）
+LABELS = {
+    'title': ('タイトル',),
+    'author': ('作者', '著者'),
+    'chapters': ('話数',),
+    'last_update': ('最新投稿', '最終更新日', '最終更新'),
+}
+ONGOING = 'ongoing'
+COMPLETED = 'completed'
+SHORT = 'short'
+_CHAPTER_COUNT = re.compile(r'(\d[\d,]*)\s*話')
+_DATETIME = re.compile(r'(\d{4})\s*[年/-]\s*(\d{1,2})\s*[月/-]\s*(\d{1,2})\s*日?(?:\s*\([^)]*\))?\s*(?:(\d{1,2}):(\d{2}))?')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@dataclass
+class NovelMetadata:
+    """小説1件のメタデータ"""
+
+    novel_id: str
+    url: str  # 小説情報ページの正規化URL
+    title: Optional[str] = None
+    author: Optional[str] = None
+    chapters: Optional[int] = None
+    status: Optional[str] = None  # ongoing（連載中）/ completed（完結）/ short（短編）
+    last_update: Optional[str] = None  # 最新投稿日時（YYYY-MM-DD HH:MM）
+    fetched_at: float = 0.0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def complete(self):
+        """完結済み（短編を含む）かどうか"""
+        return self.status in (COMPLETED, SHORT)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in cls.__dataclass_fields__ if name in data})
+
+
+class _DetailTableParser(HTMLParser):
+    """表の行を (見出し, 値) として集める字句解析器（ツリーは作らない）"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = {}
+        self._cells = None
+        self._text = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self._cells = []
+        elif tag in ('th', 'td') and self._cells is not None:
+            self._text = []
+        elif tag == 'br' and self._text is not None:
+            self._text.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in ('th', 'td') and self._text is not None:
+            self._cells.append(_WHITESPACE.sub(' ', ''.join(self._text)).strip())
+            self._text = None
+        elif tag == 'tr' and self._cells is not None:
+            if len(self._cells) >= 2 and self._cells[0]:
+                self.rows.setdefault(self._cells[0], self._cells[1])
+            self._cells = None
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+
+def _find(rows, labels):
+    for label in labels:
+        for heading, value in rows.items():
+            if heading.startswith(label):
+                return value
+    return None
+
+
+def _normalize_datetime(text):
+    match = _DATETIME.search(text or '')
+    if not match:
+        return None
+    year, month, day, hour, minute = match.groups()
+    result = f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
+    if hour is not None:
+        result += f" {int(hour):02d}:{minute}"
+    return result
+
+
+def detail_url(novel_id, base_url="https://syosetu.org"):
+    """小説情報ページの正規化URL"""
+    return url_key(f"{base_url.rstrip('/')}/?mode=ss_detail&nid={novel_id}")
+
+
+def parse_novel_metadata(html_content, novel_id, url=None):
+    """
+    小説情報ページからメタデータを抽出
+
+    Returns:
+        NovelMetadata: 抽出結果（表が見つからなければNone）
+    """
+    parser = _DetailTableParser()
+    parser.feed(html_content)
+    parser.close()
+    rows = parser.rows
+    if not rows:
+        return None
+
+    metadata = NovelMetadata(str(novel_id), url or detail_url(novel_id))
+    metadata.title = _find(rows, LABELS['title'])
+    metadata.author = _find(rows, LABELS['author'])
+    chapters = _find(rows, LABELS['chapters']) or ''
+    match = _CHAPTER_COUNT.search(chapters)
+    if match:
+        metadata.chapters = int(match.group(1).replace(',', ''))
+    if '短編' in chapters:
+        metadata.status = SHORT
+    elif '完結' in chapters:
+        metadata.status = COMPLETED
+    elif '連載' in chapters:
+        metadata.status = ONGOING
+    metadata.last_update = _normalize_datetime(_find(rows, LABELS['last_update']))
+    if metadata.chapters is None and metadata.title is None:
+        return None
+    return metadata
+
+
+class MetadataProbe:
+    """
+    メタデータの一括確認（キャッシュ付き、スレッドセーフ）
+
+    probe = MetadataProbe(config, network_client)
+    results = probe.probe_many(['123456', 'https://syosetu.org/novel/234567/'])
+    results['123456'].chapters
+
+    1件につき小説情報ページへのリクエスト1回（キャッシュの期限内は0回、期限切れ後の未変更は304）
+    リクエスト間隔は NetworkClient の RateLimiter で保つ
+    """
+
+    def __init__(self, config, network_client):
+        self.config = config
+        self.network_client = network_client
+        self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
+        self.cache_path = os.path.join(config.output_root, config.metadata_cache_file)
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+        self._dirty = False
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"メタデータのキャッシュを読み込めません（再作成します）: {e}")
+            return {}
+        return {novel_id: NovelMetadata.from_dict(item) for novel_id, item in data.items()}
+
+    def save(self):
+        """キャッシュを保存（変更がなければ何もしない）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {novel_id: metadata.to_dict() for novel_id, metadata in self._cache.items()}
+            self._dirty = False
+        directory = os.path.dirname(self.cache_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.metadata.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(temp_path, self.cache_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def novel_id(value):
+        """小説ID（数字）または小説のURLから小説IDを取得"""
+        text = str(value).strip()
+        if text.isdigit():
+            return text
+        novel_id = url_key(text).novel_id
+        if novel_id is None:
+            raise ValueError(f"小説IDを特定できません: {value}")
+        return novel_id
+
+    def cached(self, value):
+        """キャッシュ済みの記録（期限に関係なく、なければNone）"""
+        with self._lock:
+            return self._cache.get(self.novel_id(value))
+
+    def probe(self, value, refresh=False):
+        """1件を確認（失敗時はNone）"""
+        novel_id = self.novel_id(value)
+        return self.probe_many([novel_id], refresh=refresh)[novel_id]
+
+    def probe_many(self, values, refresh=False, workers=None):
+        """
+        複数の小説をまとめて確認
+
+        Args:
+            values: 小説IDまたはURLの反復
+            refresh: True ならキャッシュの期限内でも確認する（条件付きリクエスト）
+            workers: 並行数（省略時は metadata_workers）
+
+        Returns:
+            dict: 小説ID -> NovelMetadata（取得失敗はNone）、入力の順
+        """
+        novel_ids = list(dict.fromkeys(self.novel_id(value) for value in values))
+        workers = min(workers or self.config.metadata_workers, len(novel_ids))
+        if workers > 1 and self.network_client.rate_limiter is None:
+            # 並行して確認する場合もサイト全体のリクエスト間隔を保つ
+            self.network_client.rate_limiter = RateLimiter(self.config.min_request_interval)
+        try:
+            if workers <= 1:
+                return {novel_id: self._probe_one(novel_id, refresh) for novel_id in novel_ids}
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # キャンセルトークンをワーカースレッドに引き継ぐ
+                futures = {
+                    novel_id: pool.submit(contextvars.copy_context().run, self._probe_one, novel_id, refresh)
+                    for novel_id in novel_ids
+                }
+                return {novel_id: future.result() for novel_id, future in futures.items()}
+        finally:
+            self.save()
+
+    def _probe_one(self, novel_id, refresh):
+        with self._lock:
+            cached = self._cache.get(novel_id)
+        now = time.time()
+        if cached and not refresh and now - (cached.fetched_at or 0) < self.config.metadata_cache_ttl:
+            self.metrics.inc('metadata_probes_total', result='cached')
+            return cached
+
+        url = cached.url if cached else detail_url(novel_id, self.config.base_url)
+        try:
+            page = self.network_client.get_page_if_modified(
+                url, cached and cached.etag, cached and cached.last_modified
+            )
+        except (FetchFailure, CircuitOpenError) as e:
+            self.metrics.inc('metadata_probes_total', result='error')
+            self.logger.warning(f"メタデータ取得失敗: {novel_id} ({e})")
+            return None
+
+        if page.not_modified:
+            metadata = cached
+            self.metrics.inc('metadata_probes_total', result='not_modified')
+        else:
+            metadata = parse_novel_metadata(page.html, novel_id, url)
+            if metadata is None:
+                self.metrics.inc('metadata_probes_total', result='invalid')
+                self.logger.warning(f"小説情報を解析できません: {url}")
+                return None
+            metadata.etag, metadata.last_modified = page.etag, page.last_modified
+            self.metrics.inc('metadata_probes_total', result='ok')
+        metadata.fetched_at = now
+        with self._lock:
+            self._cache[novel_id] = metadata
+            self._dirty = True
+        return metadata
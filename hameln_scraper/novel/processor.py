@@ -5,9 +5,11 @@
 
 import re
 import logging
-from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
+from ..core.metrics import timed
+from ..core.url_key import url_key
+
 
 class NovelProcessor:
     """小説処理クラス"""
@@ -18,6 +20,7 @@ class NovelProcessor:
         self.logger = logging.getLogger(__name__)
         self.base_url = config.base_url
     
+    @timed('parse_seconds', stage='novel_info')
     def extract_novel_info(self, soup):
         """小説の基本情報を抽出"""
         info = {}
@@ -41,7 +44,7 @@ class NovelProcessor:
         
         self.logger.debug("タイトル抽出試行中...")
         for tag, attrs in title_selectors:
-            self.logger.debug(f"タイトルセレクター試行: {tag} {attrs}")
+            self.logger.debug("タイトルセレクター試行: %s %s", tag, attrs)
             title_elem = soup.find(tag, attrs) if attrs else soup.find(tag)
             if title_elem:
                 title_text = title_elem.get_text(strip=True)
@@ -49,10 +52,10 @@ class NovelProcessor:
                     title_text = title_text.replace(' - ハーメルン', '')
                 if title_text and title_text not in ['Unknown Title', '']:
                     info['title'] = title_text
-                    self.logger.debug(f"タイトル取得成功: {title_text}")
+                    self.logger.debug("タイトル取得成功: %s", title_text)
                     break
             else:
-                self.logger.debug(f"セレクター {tag} {attrs} で要素が見つかりませんでした")
+                self.logger.debug("セレクター %s %s で要素が見つかりませんでした", tag, attrs)
         
         author_selectors = [
             ('a', {'class': 'p-novel-author'}),
@@ -67,7 +70,7 @@ class NovelProcessor:
         
         self.logger.debug("作者抽出試行中...")
         for tag, attrs in author_selectors:
-            self.logger.debug(f"作者セレクター試行: {tag} {attrs}")
+            self.logger.debug("作者セレクター試行: %s %s", tag, attrs)
             if callable(attrs.get('href')):
                 author_elem = soup.find(tag, href=attrs['href'])
             else:
@@ -77,14 +80,15 @@ class NovelProcessor:
                 author_text = author_elem.get_text(strip=True)
                 if author_text and author_text not in ['Unknown Author', '']:
                     info['author'] = author_text
-                    self.logger.debug(f"作者取得成功: {author_text}")
+                    self.logger.debug("作者取得成功: %s", author_text)
                     break
             else:
-                self.logger.debug(f"セレクター {tag} {attrs} で要素が見つかりませんでした")
+                self.logger.debug("セレクター %s %s で要素が見つかりませんでした", tag, attrs)
         
         if not info.get('title') or not info.get('author'):
             self.logger.warning("基本情報取得失敗、詳細調査を実行")
-            self.investigate_page_structure(soup)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.investigate_page_structure(soup)
         
         return info
     
@@ -93,21 +97,21 @@ class NovelProcessor:
         self.logger.debug("=== ページ構造詳細調査 ===")
         
         h1_tags = soup.find_all('h1')
-        self.logger.debug(f"h1タグ数: {len(h1_tags)}")
+        self.logger.debug("h1タグ数: %s", len(h1_tags))
         for i, h1 in enumerate(h1_tags[:5]):
             classes = h1.get('class', [])
             text = h1.get_text(strip=True)[:50]
-            self.logger.debug(f"  h1[{i}]: class={classes}, text={text}...")
+            self.logger.debug("  h1[%s]: class=%s, text=%s...", i, classes, text)
         
         links = soup.find_all('a', href=True)
-        self.logger.debug(f"リンク数: {len(links)}")
+        self.logger.debug("リンク数: %s", len(links))
         user_links = [link for link in links if '/user/' in link.get('href', '')]
-        self.logger.debug(f"ユーザーリンク数: {len(user_links)}")
+        self.logger.debug("ユーザーリンク数: %s", len(user_links))
         for i, link in enumerate(user_links[:3]):
             classes = link.get('class', [])
             text = link.get_text(strip=True)[:30]
             href = link.get('href')
-            self.logger.debug(f"  userlink[{i}]: class={classes}, text={text}..., href={href}")
+            self.logger.debug("  userlink[%s]: class=%s, text=%s..., href=%s", i, classes, text, href)
         
         divs_with_class = soup.find_all('div', class_=True)
         unique_classes = set()
@@ -116,7 +120,7 @@ class NovelProcessor:
                 if any(keyword in cls.lower() for keyword in ['title', 'author', 'novel', 'name']):
                     unique_classes.add(cls)
         
-        self.logger.debug(f"関連クラス名: {sorted(unique_classes)}")
+        self.logger.debug("関連クラス名: %s", sorted(unique_classes))
         
         spans_with_class = soup.find_all('span', class_=True)
         span_classes = set()
@@ -125,20 +129,20 @@ class NovelProcessor:
                 if any(keyword in cls.lower() for keyword in ['title', 'author', 'novel', 'name']):
                     span_classes.add(cls)
         
-        self.logger.debug(f"関連spanクラス名: {sorted(span_classes)}")
+        self.logger.debug("関連spanクラス名: %s", sorted(span_classes))
     
+    @timed('parse_seconds', stage='chapter_links')
     def get_chapter_links(self, soup, base_novel_url):
         """章のリンクを抽出"""
         chapter_links = []
         
         self.logger.info("章リンクを検索中...")
         
-        novel_id_match = re.search(r'/novel/(\d+)', base_novel_url)
-        if not novel_id_match:
+        novel_id = url_key(base_novel_url).novel_id
+        if not novel_id:
             self.logger.error("作品IDの抽出に失敗しました")
             return []
         
-        novel_id = novel_id_match.group(1)
         self.logger.info(f"対象作品ID: {novel_id}")
         
         chapter_selectors = [
@@ -152,44 +156,44 @@ class NovelProcessor:
         ]
         
         for tag, attrs in chapter_selectors:
-            self.logger.debug(f"セレクター試行: {tag} {attrs}")
+            self.logger.debug("セレクター試行: %s %s", tag, attrs)
             
             if callable(attrs.get('href')):
                 elements = soup.find_all(tag, href=attrs['href'])
             else:
                 elements = soup.find_all(tag, attrs)
             
-            self.logger.debug(f"見つかった要素数: {len(elements)}")
+            self.logger.debug("見つかった要素数: %s", len(elements))
             
             for element in elements:
                 if tag == 'a':
                     href = element.get('href')
                     title = element.get_text(strip=True)
                     if href:
-                        full_url = urljoin(base_novel_url, href)
+                        full_url = url_key(href, base_novel_url)
                         
-                        if f'/novel/{novel_id}/' in full_url:
+                        if full_url.novel_id == novel_id:
                             if full_url not in chapter_links:
                                 chapter_links.append(full_url)
-                                self.logger.debug(f"✓ 章リンク追加: {title[:30]}... -> {full_url}")
+                                self.logger.debug("✓ 章リンク追加: %s... -> %s", title[:30], full_url)
                             else:
-                                self.logger.debug(f"重複スキップ: {full_url}")
+                                self.logger.debug("重複スキップ: %s", full_url)
                         else:
-                            self.logger.debug(f"✗ 作品ID不一致でスキップ: {full_url} (期待ID: {novel_id})")
+                            self.logger.debug("✗ 作品ID不一致でスキップ: %s (期待ID: %s)", full_url, novel_id)
                 else:
                     for link in element.find_all('a', href=True):
                         href = link.get('href')
                         if href and '/novel/' in href:
                             title = link.get_text(strip=True)
-                            full_url = urljoin(self.base_url, href)
-                            if f'/novel/{novel_id}/' in full_url:
+                            full_url = url_key(href, self.base_url)
+                            if full_url.novel_id == novel_id:
                                 if full_url not in chapter_links:
                                     chapter_links.append(full_url)
-                                    self.logger.debug(f"✓ 章リンク追加: {title[:30]}... -> {full_url}")
+                                    self.logger.debug("✓ 章リンク追加: %s... -> %s", title[:30], full_url)
                                 else:
-                                    self.logger.debug(f"重複スキップ: {full_url}")
+                                    self.logger.debug("重複スキップ: %s", full_url)
                             else:
-                                self.logger.debug(f"✗ 作品ID不一致でスキップ: {full_url} (期待ID: {novel_id})")
+                                self.logger.debug("✗ 作品ID不一致でスキップ: %s (期待ID: %s)", full_url, novel_id)
         
         if not chapter_links:
             self.logger.info("通常のリンク検索に切り替え...")
@@ -198,27 +202,27 @@ class NovelProcessor:
                 text = link.get_text(strip=True)
                 
                 if re.match(r'\./\d+\.html$', href):
-                    full_url = urljoin(base_novel_url, href)
+                    full_url = url_key(href, base_novel_url)
                     if full_url not in chapter_links:
                         chapter_links.append(full_url)
-                        self.logger.debug(f"フォールバック章リンク（相対パス）: {text[:30]}... -> {full_url}")
+                        self.logger.debug("フォールバック章リンク（相対パス）: %s... -> %s", text[:30], full_url)
                     else:
-                        self.logger.debug(f"重複スキップ: {full_url}")
+                        self.logger.debug("重複スキップ: %s", full_url)
                 elif (href and '/novel/' in href and 
                     len(href.split('/')) >= 4 and 
                     href != base_novel_url and
                     not any(x in href for x in ['user', 'tag', 'search', 'ranking'])):
                     
-                    full_url = urljoin(self.base_url, href)
+                    full_url = url_key(href, self.base_url)
                     
-                    if f'/novel/{novel_id}/' in full_url:
+                    if full_url.novel_id == novel_id:
                         if full_url not in chapter_links:
                             chapter_links.append(full_url)
-                            self.logger.debug(f"フォールバック章リンク（絶対パス）: {text[:30]}... -> {full_url}")
+                            self.logger.debug("フォールバック章リンク（絶対パス）: %s... -> %s", text[:30], full_url)
                         else:
-                            self.logger.debug(f"重複スキップ: {full_url}")
+                            self.logger.debug("重複スキップ: %s", full_url)
                     else:
-                        self.logger.debug(f"✗ フォールバック作品ID不一致でスキップ: {full_url} (期待ID: {novel_id})")
+                        self.logger.debug("✗ フォールバック作品ID不一致でスキップ: %s (期待ID: %s)", full_url, novel_id)
         
         unique_links = []
         for link in chapter_links:
@@ -228,9 +232,10 @@ class NovelProcessor:
         self.logger.info(f"最終的な章数: {len(unique_links)}")
         return unique_links
     
+    @timed('parse_seconds', stage='chapter_content')
     def extract_chapter_content(self, soup, chapter_url):
         """章の本文を抽出"""
-        self.logger.debug(f"本文抽出開始: {chapter_url}")
+        self.logger.debug("本文抽出開始: %s", chapter_url)
         
         content_selectors = [
             ('div', {'id': 'honbun'}),
@@ -279,7 +284,7 @@ class NovelProcessor:
         ]
         
         for tag, attrs in content_selectors:
-            self.logger.debug(f"本文セレクター試行: {tag} {attrs}")
+            self.logger.debug("本文セレクター試行: %s %s", tag, attrs)
             
             try:
                 if callable(attrs.get('class')):
@@ -291,7 +296,7 @@ class NovelProcessor:
                 else:
                     elements = soup.find_all(tag)
                 
-                self.logger.debug(f"見つかった要素数: {len(elements)}")
+                self.logger.debug("見つかった要素数: %s", len(elements))
                 
                 for element in elements:
                     content_text = element.get_text(strip=True)
@@ -299,19 +304,20 @@ class NovelProcessor:
                     
                     if content_length > 50:
                         if self.is_likely_novel_content(content_text):
-                            self.logger.debug(f"本文取得成功: {content_length}文字")
+                            self.logger.debug("本文取得成功: %s文字", content_length)
                             return self.preserve_original_formatting(element)
                         else:
-                            self.logger.debug(f"本文候補だが内容が適切でない: {content_length}文字")
+                            self.logger.debug("本文候補だが内容が適切でない: %s文字", content_length)
                     else:
-                        self.logger.debug(f"要素が短すぎます: {content_length}文字")
+                        self.logger.debug("要素が短すぎます: %s文字", content_length)
                         
             except Exception as e:
                 self.logger.error(f"セレクター試行エラー: {e}")
         
         self.logger.warning("本文取得失敗: 適切な要素が見つかりませんでした")
         
-        self.investigate_content_structure(soup)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.investigate_content_structure(soup)
         
         self.logger.debug("最後の手段：最も長いテキスト要素を検索")
         longest_element = None
@@ -325,11 +331,17 @@ class NovelProcessor:
                     longest_length = len(content_text)
         
         if longest_element:
-            self.logger.debug(f"最長テキスト要素を使用: {longest_length}文字")
+            self.logger.debug("最長テキスト要素を使用: %s文字", longest_length)
             return self.preserve_original_formatting(longest_element)
         
         return ""
     
+    def extract_chapter_title(self, page_title):
+        """<title>の文字列から作品名・サイト名を除いた章タイトルを取得"""
+        parts = [part.strip() for part in page_title.split(' - ')]
+        parts = [part for part in parts if part and part != 'ハーメルン']
+        return parts[-1] if parts else None
+    
     def preserve_original_formatting(self, element):
         """元のHTML構造を保持して見た目を完全再現"""
         html_content = str(element)
@@ -337,7 +349,7 @@ class NovelProcessor:
         html_content = re.sub(r'\s*on\w+\s*=\s*["\'][^"\'>]*["\']', '', html_content)
         html_content = re.sub(r'\s*data-track\w*\s*=\s*["\'][^"\'>]*["\']', '', html_content)
         
-        self.logger.debug(f"元のフォーマットを保持: {len(html_content)}バイト")
+        self.logger.debug("元のフォーマットを保持: %sバイト", len(html_content))
         return html_content
     
     def is_likely_novel_content(self, text):
@@ -371,7 +383,7 @@ class NovelProcessor:
             self.logger.debug("ハーメルン特有の作品説明文として除外")
             return False
         
-        self.logger.debug(f"小説コンテンツとして認識: {indicator_count}個の指標を確認")
+        self.logger.debug("小説コンテンツとして認識: %s個の指標を確認", indicator_count)
         return indicator_count >= 3
     
     def investigate_content_structure(self, soup):
@@ -392,10 +404,10 @@ class NovelProcessor:
         
         text_elements.sort(key=lambda x: x['length'], reverse=True)
         
-        self.logger.debug(f"テキスト要素上位5件:")
+        self.logger.debug("テキスト要素上位5件:")
         for i, elem in enumerate(text_elements[:5]):
-            self.logger.debug(f"  [{i+1}] {elem['tag']} class={elem['class']} id={elem['id']} length={elem['length']}")
-            self.logger.debug(f"      preview: {elem['preview']}")
+            self.logger.debug("  [%s] %s class=%s id=%s length=%s", i+1, elem['tag'], elem['class'], elem['id'], elem['length'])
+            self.logger.debug("      preview: %s", elem['preview'])
         
         all_classes = set()
         for div in soup.find_all('div', class_=True):
@@ -405,4 +417,4 @@ class NovelProcessor:
                                  if any(keyword in cls.lower() 
                                        for keyword in ['text', 'content', 'body', 'story', 'novel', 'chapter', 'section'])]
         
-        self.logger.debug(f"本文関連クラス名候補: {sorted(content_related_classes)}")
+        self.logger.debug("本文関連クラス名候補: %s", sorted(content_related_classes))
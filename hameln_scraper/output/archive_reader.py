@@ -0,0 +1,124 @@
+"""
+保存済みアーカイブ読み込みモジュール
+saved_novels/<タイトル>/ 配下のHTMLから目次・章の対応をネットワークなしで復元
+"""
+
+import os
+import re
+import logging
+from urllib.parse import unquote
+from bs4 import BeautifulSoup
+
+
+SAVED_FROM_PATTERN = re.compile(r'saved from url=\(\d+\)(\S+)')
+CHAPTER_URL_PATTERN = re.compile(r'/novel/(\d+)/(\d+)\.html$')
+
+
+class NovelArchive:
+    """保存済み小説アーカイブ"""
+
+    def __init__(self, novel_dir):
+        self.novel_dir = novel_dir
+        self.logger = logging.getLogger(__name__)
+        self._source_urls = None
+
+    def html_files(self):
+        """アーカイブ直下のHTMLファイル一覧"""
+        return sorted(
+            os.path.join(self.novel_dir, name)
+            for name in os.listdir(self.novel_dir)
+            if name.endswith('.html')
+        )
+
+    def read_html(self, file_path):
+        """保存済みHTMLを読み込み（BOM有無どちらにも対応）"""
+        with open(file_path, 'r', encoding='utf-8-sig') as f:
+            return f.read()
+
+    def source_url(self, file_path):
+        """保存元URLを取得（saved fromコメント、なければsource-urlメタタグ）"""
+        with open(file_path, 'r', encoding='utf-8-sig') as f:
+            head = f.read(4096)
+        match = SAVED_FROM_PATTERN.search(head)
+        if match:
+            return match.group(1)
+
+        soup = BeautifulSoup(self.read_html(file_path), 'html.parser')
+        meta = soup.find('meta', attrs={'name': 'source-url'})
+        return meta.get('content') if meta else None
+
+    @property
+    def source_urls(self):
+        """ファイルパス -> 保存元URL のマッピング"""
+        if self._source_urls is None:
+            self._source_urls = {}
+            for file_path in self.html_files():
+                url = self.source_url(file_path)
+                if url:
+                    self._source_urls[file_path] = url
+        return self._source_urls
+
+    def index_file(self):
+        """目次ページのファイルパス"""
+        for file_path, url in self.source_urls.items():
+            if re.search(r'/novel/\d+/$', url):
+                return file_path
+        for file_path in self.html_files():
+            if os.path.basename(file_path).endswith(' - 目次.html'):
+                return file_path
+        return None
+
+    def chapter_files(self, novel_processor=None):
+        """
+        章ファイルを掲載順に取得
+
+        目次ページがあれば、ローカル化されたリンクを保存元URLに戻してから
+        NovelProcessor.get_chapter_links で順序を復元する
+
+        Returns:
+            list: (章URL, ファイルパス) のリスト
+        """
+        url_to_file = {
+            url: file_path for file_path, url in self.source_urls.items()
+            if CHAPTER_URL_PATTERN.search(url)
+        }
+
+        index_path = self.index_file()
+        if novel_processor and index_path:
+            index_url = self.source_urls.get(index_path)
+            soup = self.restore_original_links(BeautifulSoup(self.read_html(index_path), 'html.parser'))
+            if index_url:
+                ordered = [
+                    (url, url_to_file[url])
+                    for url in novel_processor.get_chapter_links(soup, index_url)
+                    if url in url_to_file
+                ]
+                if ordered:
+                    return ordered
+
+        self.logger.debug("目次から章順序を復元できないため章番号順に並べます")
+        return sorted(
+            url_to_file.items(),
+            key=lambda item: int(CHAPTER_URL_PATTERN.search(item[0]).group(2))
+        )
+
+    def restore_original_links(self, soup):
+        """ローカルファイル名に書き換えられたリンクを保存元URLに戻す"""
+        name_to_url = {
+            os.path.basename(file_path): url
+            for file_path, url in self.source_urls.items()
+        }
+        for link in soup.find_all('a', href=True):
+            name = unquote(link['href']).removeprefix('./')
+            if name in name_to_url:
+                link['href'] = name_to_url[name]
+        return soup
+
+    def resolve_local_path(self, src):
+        """ページ内の相対リソースパスをアーカイブ内の実ファイルパスに解決"""
+        if not src or src.startswith(('http:', 'https:', '//', 'data:')):
+            return None
+        path = os.path.normpath(os.path.join(self.novel_dir, unquote(src.split('?')[0])))
+        if not path.startswith(os.path.normpath(self.novel_dir)):
+            return None
+        return path if os.path.isfile(path) else None
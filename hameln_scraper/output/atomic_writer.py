@@ -0,0 +1,179 @@
+"""
+原子的ファイル書き込みモジュール
+一時ファイルへの書き込み＋renameで置き換え、バックグラウンドスレッドで逐次処理
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+
+from ..core.metrics import get_metrics
+
+
+# 保存HTMLの統一エンコーディング（初回保存・リンク修正の再書き込みで共通）
+HTML_ENCODING = 'utf-8-sig'
+
+
+class AtomicFileWriter:
+    """
+    原子的ファイル書き込みクラス
+
+    - 書き込みは同じディレクトリの一時ファイルに行い、os.replaceで置き換える
+      （中断しても書きかけのファイルは残らない）
+    - background=True の場合は上限付きキューを介して専用スレッドで書き込む
+    - fsync_batch > 0 の場合は指定件数ごとにまとめてfsyncしてからrenameする
+    """
+
+    def __init__(self, max_queue=64, fsync_batch=0, background=True):
+        self.fsync_batch = fsync_batch
+        self.background = background
+        self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
+
+        # 書き込み待ちの内容（読み込み時に最新内容を返すため）
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._error = None
+        self._batch = []
+
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=max_queue)
+            self._thread = threading.Thread(target=self._worker, name="AtomicFileWriter", daemon=True)
+            self._thread.start()
+
+    def write_text(self, path, text, encoding=HTML_ENCODING):
+        """テキストを書き込み（キューが満杯の場合のみ待機）"""
+        self.write_bytes(path, text.encode(encoding))
+
+    def write_bytes(self, path, data):
+        """バイト列を書き込み"""
+        self._raise_error()
+        with self._pending_lock:
+            self._pending[path] = data
+        if self.background:
+            self._queue.put(path)
+            return
+        try:
+            self._write(path)
+            self._commit_batch(force=True)
+        except Exception:
+            self._discard_batch()
+            raise
+
+    def read_text(self, path, encoding=HTML_ENCODING):
+        """書き込み待ちの内容を優先してテキストを読み込み"""
+        with self._pending_lock:
+            data = self._pending.get(path)
+        if data is not None:
+            return data.decode(encoding)
+        # 書き込み待ちの内容と同じく改行コードは変換しない
+        with open(path, 'r', encoding=encoding, newline='') as f:
+            return f.read()
+
+    def is_pending(self, path):
+        """書き込み待ちかどうか"""
+        with self._pending_lock:
+            return path in self._pending
+
+    def flush(self):
+        """キュー内の書き込みを全て完了させる"""
+        if self.background:
+            self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """書き込みを完了してスレッドを終了"""
+        if self.background and self._thread.is_alive():
+            self._queue.join()
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _worker(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if path is None:
+                    return
+                self._write(path)
+                self._commit_batch(force=self._queue.empty())
+            except Exception as e:
+                self.logger.error(f"ファイル書き込みエラー ({path}): {e}")
+                self._discard_batch()
+                if self._error is None:
+                    self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path):
+        """一時ファイルに書き込み、バッチに追加"""
+        with self._pending_lock:
+            data = self._pending.get(path)
+        if data is None:
+            return
+
+        start = time.perf_counter()
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            if self.fsync_batch:
+                f.flush()
+        self._batch.append((temp_path, path, data))
+        self.metrics.observe('file_write_seconds', time.perf_counter() - start)
+        self.metrics.inc('file_write_bytes_total', len(data))
+
+    def _commit_batch(self, force=False):
+        """バッチ内の一時ファイルをfsyncして本来のパスに置き換え"""
+        if not self._batch:
+            return
+        if self.fsync_batch and not force and len(self._batch) < self.fsync_batch:
+            return
+
+        start = time.perf_counter()
+        if self.fsync_batch:
+            for temp_path, _, _ in self._batch:
+                fd = os.open(temp_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+        directories = set()
+        for temp_path, path, data in self._batch:
+            os.replace(temp_path, path)
+            directories.add(os.path.dirname(path) or '.')
+            with self._pending_lock:
+                # 置き換え中に同じパスへ新しい内容が投入されていれば残す
+                if self._pending.get(path) is data:
+                    del self._pending[path]
+        self._batch = []
+
+        if self.fsync_batch and hasattr(os, 'O_DIRECTORY'):
+            for directory in directories:
+                fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        self.metrics.observe('file_commit_seconds', time.perf_counter() - start)
+
+    def _discard_batch(self):
+        """失敗したバッチの一時ファイルを削除（既存ファイルはそのまま残る）"""
+        for temp_path, path, data in self._batch:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            with self._pending_lock:
+                if self._pending.get(path) is data:
+                    del self._pending[path]
+        self._batch = []
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
@@ -0,0 +1,277 @@
+"""
+EPUB3出力モジュール
+保存済みアーカイブ（saved_novels/<タイトル>/）からネットワークなしでEPUBを生成
+"""
+
+import os
+import sys
+import uuid
+import hashlib
+import logging
+import zipfile
+import argparse
+import mimetypes
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from html import escape
+from bs4 import BeautifulSoup
+
+from ..core.config import ScraperConfig
+from ..novel.processor import NovelProcessor
+from .archive_reader import NovelArchive
+
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+STYLE_CSS = """body { font-family: serif; line-height: 1.8; }
+h1 { font-size: 1.3em; margin: 1em 0; }
+p { margin: 0; }
+img { max-width: 100%; }
+"""
+
+CHAPTER_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" xml:lang="ja" lang="ja">
+<head>
+<meta charset="UTF-8"/>
+<title>{title}</title>
+<link rel="stylesheet" type="text/css" href="../style.css"/>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+# ワーカープロセスごとに使い回す抽出器
+_worker_processor = None
+
+
+def _get_worker_processor():
+    """ワーカープロセス内のNovelProcessorを取得（ネットワーク不要）"""
+    global _worker_processor
+    if _worker_processor is None:
+        config = ScraperConfig()
+        _worker_processor = NovelProcessor(config, None)
+    return _worker_processor
+
+
+def convert_chapter(novel_dir, chapter_url, file_path, ordinal):
+    """
+    保存済み章ページをEPUB用XHTML本文に変換
+
+    プロセスプールから呼ばれるためモジュールレベル関数として定義
+
+    Returns:
+        dict: title, body, images（ファイル名 -> ローカルパス）
+    """
+    archive = NovelArchive(novel_dir)
+    processor = _get_worker_processor()
+
+    soup = BeautifulSoup(archive.read_html(file_path), 'html.parser')
+    title_tag = soup.find('title')
+    title = processor.extract_chapter_title(title_tag.get_text(strip=True)) if title_tag else None
+    title = title or f"第{ordinal}話"
+    body_html = processor.extract_chapter_content(soup, chapter_url)
+
+    body = BeautifulSoup(body_html, 'html.parser')
+    for tag in body.find_all(['script', 'style', 'noscript']):
+        tag.decompose()
+    for tag in body.find_all(id=True):
+        # 数字始まりのid（<p id="0">）はXHTMLのIDとして不正
+        if tag['id'][:1].isdigit():
+            del tag['id']
+
+    images = {}
+    for img in body.find_all('img'):
+        local_path = archive.resolve_local_path(img.get('src'))
+        if not local_path:
+            img.replace_with(img.get('alt', ''))
+            continue
+        with open(local_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        ext = os.path.splitext(local_path)[1].lower() or '.bin'
+        image_name = f"{digest[:16]}{ext}"
+        images[image_name] = local_path
+        img['src'] = f"../images/{image_name}"
+        img['alt'] = img.get('alt', '')
+
+    return {'title': title, 'body': str(body), 'images': images}
+
+
+class EpubWriter:
+    """EPUB3出力クラス"""
+
+    def __init__(self, config=None, workers=None):
+        self.config = config or ScraperConfig()
+        self.workers = workers or os.cpu_count() or 1
+        self.logger = logging.getLogger(__name__)
+        self.novel_processor = NovelProcessor(self.config, None)
+
+    def export(self, novel_dir, output_path=None):
+        """
+        保存済みアーカイブをEPUB3に変換
+
+        章XHTML・画像はzipへ逐次書き込み、目次(nav)とOPFは最後に出力する
+
+        Args:
+            novel_dir: saved_novels/<タイトル>/ のパス
+            output_path: 出力先（省略時は <novel_dir>.epub）
+
+        Returns:
+            str: 出力したEPUBのパス
+        """
+        novel_dir = os.path.normpath(novel_dir)
+        output_path = output_path or f"{novel_dir}.epub"
+        archive = NovelArchive(novel_dir)
+
+        info = {}
+        index_path = archive.index_file()
+        if index_path:
+            index_soup = BeautifulSoup(archive.read_html(index_path), 'html.parser')
+            info = self.novel_processor.extract_novel_info(index_soup)
+        title = info.get('title') or os.path.basename(novel_dir)
+        author = info.get('author', '')
+        identifier = archive.source_urls.get(index_path) if index_path else None
+
+        chapters = archive.chapter_files(self.novel_processor)
+        if not chapters:
+            raise ValueError(f"章ファイルが見つかりません: {novel_dir}")
+
+        self.logger.info(f"EPUB出力開始: {title} ({len(chapters)}章)")
+
+        toc = []
+        written_images = {}
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            # mimetypeは無圧縮で先頭に置く必要がある
+            zf.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+            zf.writestr('META-INF/container.xml', CONTAINER_XML)
+            zf.writestr('OEBPS/style.css', STYLE_CSS)
+
+            for ordinal, result in enumerate(self._convert_all(novel_dir, chapters), 1):
+                href = f"text/chapter_{ordinal:04d}.xhtml"
+                zf.writestr(f"OEBPS/{href}", CHAPTER_TEMPLATE.format(
+                    title=escape(result['title']), body=result['body']
+                ))
+                toc.append((href, result['title']))
+
+                for image_name, local_path in result['images'].items():
+                    if image_name not in written_images:
+                        zf.write(local_path, f"OEBPS/images/{image_name}")
+                        written_images[image_name] = mimetypes.guess_type(local_path)[0] or 'application/octet-stream'
+
+            zf.writestr('OEBPS/nav.xhtml', self._build_nav(title, toc))
+            zf.writestr('OEBPS/content.opf', self._build_opf(title, author, identifier, toc, written_images))
+
+        self.logger.info(f"EPUB出力完了: {output_path} (画像{len(written_images)}件)")
+        return output_path
+
+    def _convert_all(self, novel_dir, chapters):
+        """章変換を並列実行し、掲載順に結果を返す（先行投入数を制限してメモリを一定に保つ）"""
+        tasks = [(novel_dir, url, path, ordinal) for ordinal, (url, path) in enumerate(chapters, 1)]
+
+        if self.workers <= 1:
+            for task in tasks:
+                yield convert_chapter(*task)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            task_iter = iter(tasks)
+            for task in task_iter:
+                pending.append(executor.submit(convert_chapter, *task))
+                if len(pending) >= self.workers * 2:
+                    break
+            while pending:
+                yield pending.popleft().result()
+                next_task = next(task_iter, None)
+                if next_task:
+                    pending.append(executor.submit(convert_chapter, *next_task))
+
+    def _build_nav(self, title, toc):
+        """EPUB3ナビゲーション文書を作成"""
+        items = '\n'.join(
+            f'<li><a href="{href}">{escape(chapter_title)}</a></li>'
+            for href, chapter_title in toc
+        )
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" xml:lang="ja" lang="ja">
+<head>
+<meta charset="UTF-8"/>
+<title>{escape(title)}</title>
+</head>
+<body>
+<nav epub:type="toc" id="toc">
+<h1>目次</h1>
+<ol>
+{items}
+</ol>
+</nav>
+</body>
+</html>
+"""
+
+    def _build_opf(self, title, author, identifier, toc, images):
+        """OPFパッケージ文書を作成"""
+        identifier = identifier or f"urn:uuid:{uuid.uuid4()}"
+        modified = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        manifest = [
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>',
+            '<item id="style" href="style.css" media-type="text/css"/>',
+        ]
+        spine = []
+        for i, (href, _) in enumerate(toc, 1):
+            manifest.append(f'<item id="chapter_{i:04d}" href="{href}" media-type="application/xhtml+xml"/>')
+            spine.append(f'<itemref idref="chapter_{i:04d}"/>')
+        for i, (image_name, media_type) in enumerate(images.items(), 1):
+            manifest.append(f'<item id="image_{i:04d}" href="images/{image_name}" media-type="{media_type}"/>')
+
+        manifest_xml = '\n    '.join(manifest)
+        spine_xml = '\n    '.join(spine)
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" xml:lang="ja">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="book-id">{escape(identifier)}</dc:identifier>
+    <dc:title>{escape(title)}</dc:title>
+    <dc:creator>{escape(author)}</dc:creator>
+    <dc:language>ja</dc:language>
+    <meta property="dcterms:modified">{modified}</meta>
+  </metadata>
+  <manifest>
+    {manifest_xml}
+  </manifest>
+  <spine>
+    {spine_xml}
+  </spine>
+</package>
+"""
+
+
+def main():
+    """コマンドラインからEPUBを出力"""
+    parser = argparse.ArgumentParser(description="保存済み小説をEPUB3に変換")
+    parser.add_argument('novel_dir', help="saved_novels/<タイトル>/ のパス")
+    parser.add_argument('-o', '--output', help="出力ファイルパス")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="並列変換プロセス数")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.novel_dir):
+        print(f"ディレクトリが見つかりません: {args.novel_dir}")
+        sys.exit(1)
+
+    output_path = EpubWriter(workers=args.workers).export(args.novel_dir, args.output)
+    print(f"✓ EPUB出力完了: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
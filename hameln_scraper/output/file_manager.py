@@ -5,11 +5,22 @@ HTMLファイルの保存とローカルナビゲーションリンクの修正
 
 import os
 import re
+import html
 import logging
 from datetime import datetime
-from urllib.parse import urljoin
 from bs4 import BeautifulSoup, Comment
 
+from .revision_store import RevisionStore, content_hash
+from .atomic_writer import AtomicFileWriter, HTML_ENCODING
+from .html_patcher import HtmlPatcher
+from .link_resolver import LinkResolver
+from ..core.metrics import get_metrics
+from ..core.job_control import check_cancelled
+from ..core.url_key import url_key
+
+
+REVISIONS_DIR_NAME = '.revisions'
+
 
 class FileManager:
     """ファイル管理クラス"""
@@ -17,16 +28,172 @@ class FileManager:
     def __init__(self, config):
         self.config = config
         self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
         self.base_url = config.base_url
+        self.revision_stores = {}
+        self.writer = AtomicFileWriter(
+            max_queue=config.writer_queue_size,
+            fsync_batch=config.fsync_batch_size,
+            background=config.enable_background_writes
+        )
+    
+    def get_revision_store(self, save_dir):
+        """保存先ディレクトリごとのリビジョンストアを取得"""
+        if save_dir not in self.revision_stores:
+            self.revision_stores[save_dir] = RevisionStore(os.path.join(save_dir, REVISIONS_DIR_NAME))
+        return self.revision_stores[save_dir]
+    
+    def write_html(self, file_path, html_content):
+        """HTMLを原子的に書き込み（バックグラウンド書き込み時はキューに投入）"""
+        with self.metrics.timer('file_enqueue_seconds'):
+            self.writer.write_text(file_path, html_content, HTML_ENCODING)
+    
+    def read_html(self, file_path):
+        """保存済みHTMLを読み込み（書き込み待ちの内容を優先）"""
+        return self.writer.read_text(file_path, HTML_ENCODING)
+    
+    def patch_links(self, file_path, resolve):
+        """
+        保存済みHTMLの <a href> を位置指定で書き換え（ツリーの構築・再シリアライズなし）
+        
+        Args:
+            file_path: 対象ファイル
+            resolve: resolve(href, リンクテキスト) が新しいhref（変更しない場合はNone）を返す関数
+            
+        Returns:
+            bool: 書き換えたかどうか
+        """
+        patcher = HtmlPatcher(self.read_html(file_path), tags=('a',))
+        for ref in patcher.elements:
+            href = ref.get('href')
+            if not href:
+                continue
+            target = resolve(href, ref.text.strip())
+            if target and target != href:
+                patcher.set_attribute(ref, 'href', target)
+        if not patcher.changed:
+            return False
+        self.write_html(file_path, patcher.result())
+        return True
+    
+    def link_resolver(self, chapter_mapping=None, index_filename=None, info_file_name=None,
+                      comments_file_name=None):
+        """
+        小説1作品分のリンク解決器を作成（全ページのリンク修正で使い回す）
+        
+        Args:
+            chapter_mapping: 章URL -> ローカルファイル名（以降は resolver.add() で追加可能）
+        """
+        return LinkResolver(self.base_url, chapter_mapping, index_filename, info_file_name, comments_file_name)
+    
+    def _resolver_for(self, chapter_mapping, index_filename, info_file_name, comments_file_name):
+        if isinstance(chapter_mapping, LinkResolver):
+            return chapter_mapping
+        return self.link_resolver(chapter_mapping, index_filename, info_file_name, comments_file_name)
+    
+    def relink_saved_page(self, file_path, chapter_mapping, current_url,
+                          index_filename=None, info_file_name=None,
+                          comments_file_name=None):
+        """
+        保存済みページのナビゲーションリンクをローカルファイルに修正
+        
+        chapter_mapping には link_resolver() で作成した LinkResolver も渡せる（複数ページで索引を共有）
+        """
+        self.logger.debug("ナビゲーションリンク修正: %s", current_url)
+        resolver = self._resolver_for(chapter_mapping, index_filename, info_file_name, comments_file_name)
+        self.patch_links(file_path, lambda href, link_text: resolver.resolve(href, link_text, current_url))
+    
+    def flush(self):
+        """書き込み待ちのファイルを全て書き込む"""
+        self.writer.flush()
+    
+    def close(self):
+        """書き込みを完了して書き込みスレッドを終了"""
+        self.writer.close()
     
     def _sanitize_filename(self, filename):
         """ファイル名を安全な形式に変換"""
         return re.sub(r'[<>:"/\\|?*]', '_', filename)
     
     def save_complete_page(self, soup, base_url, title, save_dir, page_url):
-        """ページを完全な形で保存（ブラウザ保存と同等）"""
+        """
+        ページを完全な形で保存（ブラウザ保存と同等）
+        
+        soup に取得したままのHTML文字列を渡した場合は、ツリーを作らず
+        リンクの絶対化とメタ情報の挿入を位置指定で行う（それ以外は元のHTMLのまま）
+        """
+        # キャンセルは保存の開始前にのみ反映（書き込みは原子的に完了させる）
+        check_cancelled()
         self.logger.info("=== ブラウザレベル完全保存開始 ===")
         
+        if isinstance(soup, str):
+            html_content, body_html, save_time = self._prepare_raw_page(soup, page_url)
+        else:
+            html_content, body_html, save_time = self._prepare_soup_page(soup, page_url)
+        
+        safe_filename = self._sanitize_filename(title)
+        output_file = os.path.join(save_dir, f"{safe_filename}.html")
+        
+        # 章本文のリビジョン管理：本文・ページ共に前回と同一なら書き込みを省略
+        if body_html is not None:
+            page_hash = content_hash(html_content.replace(save_time, ''))
+            revision_store = self.get_revision_store(save_dir)
+            if ((os.path.exists(output_file) or self.writer.is_pending(output_file)) and
+                    revision_store.check(page_url, body_html, page_hash) == RevisionStore.UNCHANGED):
+                self.metrics.inc('file_writes_skipped_total')
+                self.logger.info(f"本文・ページに変更がないため書き込みをスキップ: {output_file}")
+                return output_file
+        
+        self.write_html(output_file, html_content)
+        
+        if body_html is not None:
+            revision_store.record(page_url, body_html, page_hash)
+        
+        self.logger.info(f"=== ブラウザレベル完全保存完了: {output_file} ===")
+        return output_file
+    
+    def _absolute_url(self, url, page_url, site_root, skip_prefix=None):
+        """サイト内の相対URLを絶対URLに変換（変換不要ならNone）"""
+        if skip_prefix and url.startswith(skip_prefix):
+            return None
+        if url.startswith('//'):
+            return 'https:' + url
+        if url.startswith('/'):
+            return site_root + url
+        if skip_prefix is None and url.startswith('./'):
+            return '/'.join(page_url.split('/')[:-1]) + '/' + url[2:]
+        return None
+    
+    def _prepare_raw_page(self, source, page_url):
+        """取得したままのHTMLを位置指定で修正（リンクの絶対化・保存元コメント・メタ情報）"""
+        resources_prefix = './' + getattr(self, 'browser_compatible_name', 'resources') + '/'
+        site_root = url_key(page_url).origin
+        patcher = HtmlPatcher(source, tags=('a', 'img', 'link', 'script'))
+        
+        for ref in patcher.elements:
+            attr = 'src' if ref.name in ('img', 'script') else 'href'
+            value = ref.get(attr)
+            if not value:
+                continue
+            skip_prefix = None if ref.name == 'a' else resources_prefix
+            absolute = self._absolute_url(value, page_url, site_root, skip_prefix)
+            if absolute:
+                patcher.set_attribute(ref, attr, absolute)
+        
+        if patcher.html_start_end is not None:
+            patcher.insert(patcher.html_start_end, f'<!-- saved from url=({len(page_url):04d}){page_url} -->')
+        save_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if patcher.head_end is not None:
+            patcher.insert(patcher.head_end, (
+                f'<meta name="save-date" content="{save_time}"/>'
+                f'<meta name="source-url" content="{html.escape(page_url, quote=True)}"/>'
+            ))
+        
+        body_html = patcher.body_html() if self.config.enable_revision_tracking else None
+        return patcher.result(), body_html, save_time
+    
+    def _prepare_soup_page(self, soup, page_url):
+        """解析済みのページを修正してシリアライズ"""
         resources_dir_name = getattr(self, 'browser_compatible_name', 'resources')
         
         html_tag = soup.find('html')
@@ -34,7 +201,7 @@ class FileManager:
             comment = Comment(f' saved from url=({len(page_url):04d}){page_url} ')
             html_tag.insert(0, comment)
         
-        base_url = '/'.join(page_url.split('/')[:3])
+        base_url = url_key(page_url).origin
         
         for link in soup.find_all('a', href=True):
             href = link.get('href')
@@ -71,9 +238,9 @@ class FileManager:
                 elif src.startswith('/') and not src.startswith('//'):
                     script['src'] = base_url + src
         
+        save_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         head = soup.find('head')
         if head:
-            save_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             meta_save = soup.new_tag('meta')
             meta_save['name'] = 'save-date'
             meta_save['content'] = save_time
@@ -84,82 +251,25 @@ class FileManager:
             meta_source['content'] = page_url
             head.append(meta_source)
         
-        safe_filename = self._sanitize_filename(title)
-        output_file = os.path.join(save_dir, f"{safe_filename}.html")
-        
-        html_content = str(soup)
-        
-        with open(output_file, 'w', encoding='utf-8-sig') as f:
-            f.write(html_content)
-        
-        self.logger.info(f"=== ブラウザレベル完全保存完了: {output_file} ===")
-        return output_file
+        body = soup.find('div', id='honbun') if self.config.enable_revision_tracking else None
+        return str(soup), (str(body) if body is not None else None), save_time
     
     def fix_local_navigation_links(self, soup, chapter_mapping, current_url, 
                                  index_filename=None, info_file_name=None, 
                                  comments_file_name=None):
-        """ローカルナビゲーションリンクを修正"""
+        """ローカルナビゲーションリンクを修正（chapter_mapping には LinkResolver も渡せる）"""
         try:
-            self.logger.debug(f"ナビゲーションリンク修正開始: {current_url}")
+            self.logger.debug("ナビゲーションリンク修正開始: %s", current_url)
+            resolver = self._resolver_for(chapter_mapping, index_filename, info_file_name, comments_file_name)
             
             for link in soup.find_all('a', href=True):
                 href = link.get('href')
-                link_text = link.get_text(strip=True)
-                
                 if not href:
                     continue
-                
-                original_href = href
-                
-                if href.startswith('http'):
-                    if any(domain in href for domain in ['syosetu.org']):
-                        if href in chapter_mapping:
-                            link['href'] = chapter_mapping[href]
-                            self.logger.debug(f"章リンク修正: {original_href} -> {chapter_mapping[href]}")
-                        elif '/novel/' in href and href.endswith('/'):
-                            if index_filename:
-                                link['href'] = index_filename
-                                self.logger.debug(f"目次リンク修正: {original_href} -> {index_filename}")
-                        elif 'mode=ss_detail' in href:
-                            if info_file_name:
-                                link['href'] = info_file_name
-                                self.logger.debug(f"小説情報リンク修正: {original_href} -> {info_file_name}")
-                        elif 'mode=review' in href:
-                            if comments_file_name:
-                                link['href'] = comments_file_name
-                                self.logger.debug(f"感想リンク修正: {original_href} -> {comments_file_name}")
-                
-                elif href.startswith('./'):
-                    chapter_num_match = re.search(r'(\d+)\.html$', href)
-                    if chapter_num_match:
-                        for chapter_url, local_file in chapter_mapping.items():
-                            if chapter_num_match.group(1) in chapter_url:
-                                link['href'] = local_file
-                                self.logger.debug(f"相対章リンク修正: {original_href} -> {local_file}")
-                                break
-                
-                elif href.startswith('/'):
-                    full_url = urljoin(self.base_url, href)
-                    if full_url in chapter_mapping:
-                        link['href'] = chapter_mapping[full_url]
-                        self.logger.debug(f"絶対章リンク修正: {original_href} -> {chapter_mapping[full_url]}")
-                    elif '/novel/' in href and href.endswith('/'):
-                        if index_filename:
-                            link['href'] = index_filename
-                            self.logger.debug(f"絶対目次リンク修正: {original_href} -> {index_filename}")
-                
-                if any(keyword in link_text for keyword in ['目次', 'インデックス', 'もくじ']):
-                    if index_filename:
-                        link['href'] = index_filename
-                        self.logger.debug(f"目次テキストリンク修正: {original_href} -> {index_filename}")
-                elif any(keyword in link_text for keyword in ['小説情報', '作品情報']):
-                    if info_file_name:
-                        link['href'] = info_file_name
-                        self.logger.debug(f"小説情報テキストリンク修正: {original_href} -> {info_file_name}")
-                elif any(keyword in link_text for keyword in ['感想', 'レビュー']):
-                    if comments_file_name:
-                        link['href'] = comments_file_name
-                        self.logger.debug(f"感想テキストリンク修正: {original_href} -> {comments_file_name}")
+                target = resolver.resolve(href, link.get_text(strip=True), current_url)
+                if target and target != href:
+                    link['href'] = target
+                    self.logger.debug("リンク修正: %s -> %s", href, target)
             
             self.logger.debug("ナビゲーションリンク修正完了")
             return soup
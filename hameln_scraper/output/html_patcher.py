@@ -0,0 +1,184 @@
+"""
+位置指定によるHTMLの部分書き換え
+ツリーを構築・再シリアライズせず、字句解析で記録した属性値の位置に置換値を直接差し込む
+出力は意図した変更箇所以外は元のHTMLと完全に一致する
+"""
+
+import re
+import html
+from html.parser import HTMLParser
+
+
+_ATTRIBUTE = re.compile(
+    r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?'''
+)
+_TAG_NAME = re.compile(r'<[^\s/>]+')
+
+
+class AttributeSpan:
+    """属性値の位置（start / end は値の範囲、引用符の内側）"""
+
+    __slots__ = ('value', 'start', 'end', 'quoted')
+
+    def __init__(self, value, start, end, quoted):
+        self.value = value
+        self.start = start
+        self.end = end
+        self.quoted = quoted
+
+
+class TagRef:
+    """開始タグの位置と属性"""
+
+    __slots__ = ('name', 'start', 'end', 'attrs', 'text')
+
+    def __init__(self, name, start, end, attrs):
+        self.name = name
+        self.start = start
+        self.end = end  # '>' の直後
+        self.attrs = attrs
+        self.text = ''  # <a> の場合のリンクテキスト
+
+    def get(self, name, default=None):
+        span = self.attrs.get(name)
+        return span.value if span else default
+
+
+class _OffsetScanner(HTMLParser):
+    """対象タグの属性位置を記録する字句解析器（ツリーは作らない）"""
+
+    def __init__(self, source, tags):
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.tags = tags
+        self.line_starts = [0]
+        for match in re.finditer('\n', source):
+            self.line_starts.append(match.end())
+        self.elements = []
+        self.html_start_end = None
+        self.head_end = None
+        self.body_span = None
+        self._link = None
+        self._body_start = None
+        self._body_depth = 0
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def _record(self, tag):
+        start = self._offset()
+        raw = self.get_starttag_text()
+        end = start + len(raw)
+        if tag == 'html' and self.html_start_end is None:
+            self.html_start_end = end
+        if tag not in self.tags:
+            return None, start, end, raw
+        attrs = {}
+        name_end = _TAG_NAME.match(raw).end()
+        for match in _ATTRIBUTE.finditer(raw, name_end, len(raw) - 1):
+            name = match.group(1).lower()
+            if name in attrs:
+                continue
+            for group in (2, 3, 4):
+                if match.group(group) is not None:
+                    attrs[name] = AttributeSpan(
+                        html.unescape(match.group(group)), start + match.start(group),
+                        start + match.end(group), group != 4
+                    )
+                    break
+        ref = TagRef(tag, start, end, attrs)
+        self.elements.append(ref)
+        return ref, start, end, raw
+
+    def handle_starttag(self, tag, attrs):
+        ref, start, end, raw = self._record(tag)
+        if tag == 'a':
+            self._link = ref
+        elif tag == 'div':
+            if self._body_start is not None:
+                self._body_depth += 1
+            elif self.body_span is None and dict(attrs).get('id') == 'honbun':
+                self._body_start = start
+                self._body_depth = 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._record(tag)
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self._link = None
+        elif tag == 'head' and self.head_end is None:
+            self.head_end = self._offset()
+        elif tag == 'div' and self._body_start is not None:
+            self._body_depth -= 1
+            if self._body_depth == 0:
+                end = self.source.find('>', self._offset()) + 1
+                self.body_span = (self._body_start, end)
+                self._body_start = None
+
+    def handle_data(self, data):
+        if self._link is not None:
+            self._link.text += data
+
+
+class HtmlPatcher:
+    """
+    位置指定によるHTMLの部分書き換え
+
+    patcher = HtmlPatcher(html, tags={'a', 'img'})
+    for ref in patcher.elements: patcher.set_attribute(ref, 'href', ...)
+    patcher.result()  # 変更箇所だけを差し替えたHTML
+    """
+
+    def __init__(self, source, tags=('a',)):
+        self.source = source
+        scanner = _OffsetScanner(source, set(tags))
+        scanner.feed(source)
+        scanner.close()
+        self.elements = scanner.elements
+        self.html_start_end = scanner.html_start_end  # <html ...> の直後（なければNone）
+        self.head_end = scanner.head_end  # </head> の位置（なければNone）
+        self.body_span = scanner.body_span  # <div id="honbun">...</div> の範囲（なければNone）
+        self._edits = []
+
+    @property
+    def changed(self):
+        return bool(self._edits)
+
+    def set_attribute(self, ref, name, value):
+        """属性値を置換（属性がなければ開始タグの末尾に追加）"""
+        escaped = html.escape(value, quote=True)
+        span = ref.attrs.get(name)
+        if span is None:
+            close = ref.end - 2 if self.source[ref.end - 2:ref.end] == '/>' else ref.end - 1
+            self._edits.append((close, close, f' {name}="{escaped}"'))
+        elif span.quoted:
+            self._edits.append((span.start, span.end, escaped))
+        else:
+            self._edits.append((span.start, span.end, f'"{escaped}"'))
+        if span is not None:
+            span.value = value
+
+    def insert(self, offset, text):
+        """offset の位置に text を挿入"""
+        self._edits.append((offset, offset, text))
+
+    def body_html(self):
+        """本文（<div id="honbun">）の元のHTML"""
+        if self.body_span is None:
+            return None
+        return self.source[self.body_span[0]:self.body_span[1]]
+
+    def result(self):
+        """変更を適用したHTML（変更がなければ元の文字列）"""
+        if not self._edits:
+            return self.source
+        parts = []
+        position = 0
+        for start, end, text in sorted(self._edits, key=lambda edit: (edit[0], edit[1])):
+            parts.append(self.source[position:start])
+            parts.append(text)
+            position = end
+        parts.append(self.source[position:])
+        return ''.join(parts)
@@ -0,0 +1,78 @@
+"""
+ナビゲーションリンクの解決
+小説ごとに1回だけ索引（正規化URL・(小説ID, 話番号)・(mode, 小説ID, page)）を作り、
+各リンクを走査なしで一意にローカルファイルへ対応付ける
+"""
+
+from ..core.url_key import url_key
+
+INDEX_KEYWORDS = ('目次', 'インデックス', 'もくじ')
+INFO_KEYWORDS = ('小説情報', '作品情報')
+COMMENTS_KEYWORDS = ('感想', 'レビュー')
+
+
+class LinkResolver:
+    """
+    ナビゲーションリンクの解決（小説ごとに1回構築し、保存した章は add() で追加）
+
+    resolver = LinkResolver(base_url, chapter_mapping, index_filename='目次.html')
+    resolver.resolve('./2.html', '次の話', current_url)  # -> '第二話.html'
+    """
+
+    def __init__(self, base_url, chapter_mapping=None, index_filename=None,
+                 info_file_name=None, comments_file_name=None):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.index_filename = index_filename
+        self.info_file_name = info_file_name
+        self.comments_file_name = comments_file_name
+        self._by_url = {}
+        self._by_page = {}
+        self._novel_ids = set()
+        for url, filename in (chapter_mapping or {}).items():
+            self.add(url, filename)
+
+    def add(self, url, filename):
+        """URLとローカルファイルの対応を登録（章・感想の各ページなど）"""
+        key = url_key(url, self.base_url)
+        self._by_url[key] = filename
+        page = key.page_key()
+        if page is not None:
+            self._by_page[page] = filename
+        if key.kind == 'chapter':
+            self._novel_ids.add(key.novel_id)
+
+    def __len__(self):
+        return len(self._by_url)
+
+    def _base_for(self, current_url):
+        if current_url:
+            return current_url
+        # 現在のページが不明でも、1作品分の索引なら相対リンクはその作品の話とみなす
+        if len(self._novel_ids) == 1:
+            return f"{self.base_url}novel/{next(iter(self._novel_ids))}/"
+        return self.base_url
+
+    def resolve(self, href, link_text='', current_url=None):
+        """
+        リンク先のローカルファイル名を返す（修正しない場合はNone）
+
+        URLでの対応付けを先に行い、リンクテキスト（目次・小説情報・感想）があればそちらを優先する
+        """
+        target = None
+        key = url_key(href, self._base_for(current_url))
+        if key.is_site:
+            target = self._by_url.get(key) or self._by_page.get(key.page_key())
+            if target is None and key.kind == 'index':
+                target = self.index_filename
+            elif target is None and key.mode == 'ss_detail':
+                target = self.info_file_name
+            elif target is None and key.mode == 'review':
+                target = self.comments_file_name
+
+        if any(keyword in link_text for keyword in INDEX_KEYWORDS):
+            target = self.index_filename or target
+        elif any(keyword in link_text for keyword in INFO_KEYWORDS):
+            target = self.info_file_name or target
+        elif any(keyword in link_text for keyword in COMMENTS_KEYWORDS):
+            target = self.comments_file_name or target
+        return target
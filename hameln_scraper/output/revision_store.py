@@ -0,0 +1,189 @@
+"""
+章リビジョン管理モジュール
+本文のハッシュで変更を判定し、旧版は新版からの差分として保持する
+"""
+
+import os
+import re
+import json
+import zlib
+import base64
+import difflib
+import hashlib
+import logging
+from datetime import datetime
+
+
+# 本文HTMLを段落・改行単位の行に分割
+LINE_SPLIT_PATTERN = re.compile(r'(?<=</p>)|(?<=<br/>)|(?<=<br>)|(?<=\n)')
+
+
+def content_hash(text):
+    """本文のハッシュ値（sha256）"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def split_lines(text):
+    return [line for line in LINE_SPLIT_PATTERN.split(text) if line]
+
+
+def make_delta(new_text, old_text):
+    """
+    new_text から old_text を復元する差分を作成
+
+    操作列は ["=", 行数]（そのまま）/ ["-", 行数]（削除）/ ["+", [行...]]（挿入）
+    """
+    new_lines = split_lines(new_text)
+    old_lines = split_lines(old_text)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, new_lines, old_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(['=', i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(['-', i2 - i1])
+        if j2 > j1:
+            ops.append(['+', old_lines[j1:j2]])
+    return ops
+
+
+def apply_delta(new_text, ops):
+    """make_delta の差分を適用して旧版を復元"""
+    new_lines = split_lines(new_text)
+    old_lines = []
+    position = 0
+    for op, value in ops:
+        if op == '=':
+            old_lines.extend(new_lines[position:position + value])
+            position += value
+        elif op == '-':
+            position += value
+        elif op == '+':
+            old_lines.extend(value)
+    return ''.join(old_lines)
+
+
+def _pack(data):
+    return base64.b64encode(zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'))).decode('ascii')
+
+
+def _unpack(text):
+    return json.loads(zlib.decompress(base64.b64decode(text)).decode('utf-8'))
+
+
+class RevisionStore:
+    """
+    章リビジョン管理クラス
+
+    章ごとに1ファイル（<root>/<キーのハッシュ>.json）を持ち、
+    最新版の本文全体と、旧版を新版からの逆差分として保存する
+    """
+
+    UNCHANGED = 'unchanged'
+    NEW = 'new'
+    CHANGED = 'changed'
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.logger = logging.getLogger(__name__)
+
+    def _record_path(self, key):
+        return os.path.join(self.root_dir, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]}.json")
+
+    def _load(self, key):
+        path = self._record_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _store(self, key, record):
+        os.makedirs(self.root_dir, exist_ok=True)
+        path = self._record_path(key)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def check(self, key, body, page_hash=None):
+        """
+        保存済みの最新版と比較
+
+        Args:
+            key: 章のキー（URL）
+            body: 本文HTML
+            page_hash: ページ全体のハッシュ（本文以外の変更検出用、省略可）
+
+        Returns:
+            str: UNCHANGED / NEW / CHANGED
+        """
+        record = self._load(key)
+        if not record:
+            return self.NEW
+        head = record['head']
+        if head['sha256'] != content_hash(body):
+            return self.CHANGED
+        if page_hash and head.get('page_sha256') != page_hash:
+            return self.CHANGED
+        return self.UNCHANGED
+
+    def record(self, key, body, page_hash=None):
+        """
+        本文を最新版として記録（変更時は旧版を差分として履歴に追加）
+
+        Returns:
+            str: UNCHANGED / NEW / CHANGED
+        """
+        sha256 = content_hash(body)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        record = self._load(key)
+
+        if not record:
+            record = {'key': key, 'revisions': []}
+            status = self.NEW
+        else:
+            head = record['head']
+            if head['sha256'] == sha256:
+                if page_hash and head.get('page_sha256') != page_hash:
+                    head['page_sha256'] = page_hash
+                    self._store(key, record)
+                return self.UNCHANGED
+
+            old_body = zlib.decompress(base64.b64decode(record['body'])).decode('utf-8')
+            record['revisions'].insert(0, {
+                'sha256': head['sha256'],
+                'saved_at': head['saved_at'],
+                'delta': _pack(make_delta(body, old_body)),
+            })
+            status = self.CHANGED
+            self.logger.info(f"本文の変更を検出: {key} (履歴{len(record['revisions'])}件)")
+
+        record['head'] = {'sha256': sha256, 'saved_at': now, 'page_sha256': page_hash}
+        record['body'] = base64.b64encode(zlib.compress(body.encode('utf-8'))).decode('ascii')
+        self._store(key, record)
+        return status
+
+    def history(self, key):
+        """リビジョン一覧（新しい順、sha256と保存日時）"""
+        record = self._load(key)
+        if not record:
+            return []
+        entries = [{'sha256': record['head']['sha256'], 'saved_at': record['head']['saved_at']}]
+        entries.extend({'sha256': r['sha256'], 'saved_at': r['saved_at']} for r in record['revisions'])
+        return entries
+
+    def get_revision(self, key, index=0):
+        """
+        指定リビジョンの本文を復元
+
+        Args:
+            index: 0が最新、1以降が過去の版（新しい順）
+        """
+        record = self._load(key)
+        if not record or index > len(record['revisions']):
+            return None
+        body = zlib.decompress(base64.b64decode(record['body'])).decode('utf-8')
+        for revision in record['revisions'][:index]:
+            body = apply_delta(body, _unpack(revision['delta']))
+        return body
@@ -0,0 +1,223 @@
+"""
+テキスト出力モジュール
+本文HTML（#honbun）をMarkdown／プレーンテキストに変換し、マニフェストと共に保存
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from datetime import datetime
+from bs4 import BeautifulSoup, NavigableString, Comment
+
+from ..core.metrics import get_metrics
+from ..core.url_key import url_key
+from .revision_store import RevisionStore, content_hash
+from .atomic_writer import AtomicFileWriter
+
+
+TEXT_FORMATS = {
+    'markdown': '.md',
+    'plain': '.txt',
+}
+
+BLOCK_TAGS = {'p', 'div', 'section', 'article', 'blockquote', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+EMPHASIS_TAGS = {'b': '**', 'strong': '**', 'i': '*', 'em': '*'}
+MARKDOWN_ESCAPE = re.compile(r'([\\`*_\[\]<>#])')
+
+
+class TextConverter:
+    """本文HTML -> テキスト変換クラス"""
+
+    def __init__(self, text_format='markdown'):
+        if text_format not in TEXT_FORMATS:
+            raise ValueError(f"未対応のテキスト形式: {text_format}")
+        self.text_format = text_format
+
+    @property
+    def markdown(self):
+        return self.text_format == 'markdown'
+
+    def convert(self, body_html):
+        """
+        本文HTMLをテキストに変換
+
+        段落・改行・ルビ・強調を保持する
+        （Markdown: <ruby>タグと**強調**、プレーン: ｜親文字《ルビ》）
+
+        Args:
+            body_html: extract_chapter_content が返す本文HTML
+
+        Returns:
+            str: 変換後テキスト（行単位）
+        """
+        soup = BeautifulSoup(body_html, 'html.parser')
+        lines = ['']
+        self._walk(soup, lines)
+
+        # 行末・前後の空行を整理（全角空白の字下げは保持）
+        text_lines = [line.rstrip(' \t\r\n') for line in lines]
+        while text_lines and not text_lines[0].strip():
+            text_lines.pop(0)
+        while text_lines and not text_lines[-1].strip():
+            text_lines.pop()
+
+        if self.markdown:
+            # 空行は段落区切り、それ以外の行は行末2スペースで強制改行
+            text_lines = [line + '  ' if line.strip() else '' for line in text_lines]
+        return '\n'.join(text_lines) + '\n'
+
+    def _walk(self, node, lines):
+        for child in node.children:
+            if isinstance(child, Comment):
+                continue
+            if isinstance(child, NavigableString):
+                text = str(child).replace('\r', '').replace('\n', '')
+                lines[-1] += self._escape(text)
+                continue
+
+            name = child.name
+            if name in ('script', 'style', 'rp'):
+                continue
+            if name == 'br':
+                lines.append('')
+            elif name == 'ruby':
+                lines[-1] += self._ruby(child)
+            elif name in EMPHASIS_TAGS:
+                inner = ['']
+                self._walk(child, inner)
+                text = ''.join(inner)
+                mark = EMPHASIS_TAGS[name] if self.markdown and text.strip() else ''
+                lines[-1] += f"{mark}{text}{mark}"
+            elif name == 'img':
+                alt = child.get('alt', '')
+                if alt:
+                    lines[-1] += self._escape(alt)
+            elif name in BLOCK_TAGS:
+                if lines[-1]:
+                    lines.append('')
+                self._walk(child, lines)
+                lines.append('')
+            else:
+                self._walk(child, lines)
+
+    def _ruby(self, ruby):
+        """ルビを変換（<rb>がない形式にも対応）"""
+        base = ''.join(
+            rb.get_text() for rb in ruby.find_all('rb')
+        ) or ''.join(
+            str(c) for c in ruby.children if isinstance(c, NavigableString)
+        )
+        reading = ''.join(rt.get_text() for rt in ruby.find_all('rt'))
+        if not reading:
+            return self._escape(base)
+        if self.markdown:
+            return f"<ruby>{base}<rt>{reading}</rt></ruby>"
+        return f"｜{base}《{reading}》"
+
+    def _escape(self, text):
+        if self.markdown:
+            return MARKDOWN_ESCAPE.sub(r'\\\1', text)
+        return text
+
+
+class TextExporter:
+    """
+    テキストモードの保存クラス
+
+    章ファイルとマニフェストは一時ファイルへの書き込み＋置き換えで保存する（中断しても書きかけは残らない）
+    """
+
+    def __init__(self, output_dir, text_format='markdown', revision_store=None, writer=None):
+        self.output_dir = output_dir
+        self.revision_store = revision_store
+        # 保存直後に読まれる（イベント・増分取得）ため、既定はその場で書き込む
+        self.writer = writer or AtomicFileWriter(background=False)
+        self.text_format = text_format
+        self.extension = TEXT_FORMATS[text_format]
+        self.converter = TextConverter(text_format)
+        self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
+        self.chapters = []
+        self._existing = {}  # 増分取得時に引き継ぐ保存済みの章（正規化URL -> マニフェストの項目）
+        os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.output_dir, 'manifest.json')
+
+    def resume(self):
+        """
+        既存のマニフェストを読み込み、保存済みの章を引き継げるようにする（増分取得用）
+
+        Returns:
+            int: 引き継げる章数（形式が異なる・ファイルが消えている章は対象外）
+        """
+        self._existing = {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if manifest.get('format') != self.text_format:
+            return 0
+        for entry in manifest.get('chapters', []):
+            if os.path.exists(os.path.join(self.output_dir, entry['file'])):
+                self._existing[url_key(entry['url'])] = entry
+        return len(self._existing)
+
+    def keep_existing(self, ordinal, url):
+        """同じ位置に保存済みの章ならマニフェストの項目を引き継いでTrue（取得不要）"""
+        entry = self._existing.get(url_key(url))
+        if entry is None or entry['ordinal'] != ordinal:
+            return False
+        self.chapters.append(entry)
+        return True
+
+    def save_chapter(self, ordinal, title, url, body_html):
+        """章を変換して保存（リビジョンストアで本文・出力とも未変更なら書き込まない）"""
+        text = self.converter.convert(body_html)
+        if self.text_format == 'markdown':
+            content = f"# {title}\n\n{text}"
+        else:
+            content = f"{title}\n\n{text}"
+
+        filename = f"{ordinal:04d}{self.extension}"
+        file_path = os.path.join(self.output_dir, filename)
+        # 出力のハッシュも比較し、見出し・形式だけの変更も書き込む
+        output_hash = content_hash(content)
+        if (self.revision_store and os.path.exists(file_path) and
+                self.revision_store.check(url, body_html, output_hash) == RevisionStore.UNCHANGED):
+            self.metrics.inc('file_writes_skipped_total')
+            self.logger.debug("内容に変更がないため書き込みをスキップ: %s", filename)
+        else:
+            self.writer.write_text(file_path, content, 'utf-8')
+            if self.revision_store:
+                self.revision_store.record(url, body_html, output_hash)
+
+        self.chapters.append({
+            'ordinal': ordinal,
+            'title': title,
+            'url': url,
+            'file': filename,
+            'chars': len(text),
+            'sha256': hashlib.sha256(text.encode('utf-8')).hexdigest(),
+        })
+        self.logger.debug("テキスト保存: %s (%s文字)", filename, len(text))
+        return file_path
+
+    def write_manifest(self, novel_info, novel_url, complete=True):
+        """マニフェスト（manifest.json）を出力（中断時は complete=False）"""
+        manifest = {
+            'title': novel_info.get('title'),
+            'author': novel_info.get('author'),
+            'url': novel_url,
+            'format': self.text_format,
+            'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'chapters': sorted(self.chapters, key=lambda c: c['ordinal']),
+        }
+        if not complete:
+            manifest['complete'] = False
+        self.writer.write_text(self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2), 'utf-8')
+        return self.manifest_path
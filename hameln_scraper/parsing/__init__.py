@@ -2,5 +2,6 @@
 from .content_extractor import ContentExtractor
 from .url_extractor import UrlExtractor
 from .validator import PageValidator
+from .keyword_scanner import PageVerdict, KeywordScanner
 
-__all__ = ["ContentExtractor", "UrlExtractor", "PageValidator"]
\ No newline at end of file
+__all__ = ["ContentExtractor", "UrlExtractor", "PageValidator", "PageVerdict", "KeywordScanner"]
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+キーワード一括走査によるページ判定
+解析前の生のレスポンスの <head> 部分だけを1回走査し、チャレンジ・エラーページを判定する
+"""
+
+import re
+from collections import namedtuple
+
+
+HEAD_SCAN_BYTES = 16384
+# 小説・各話のページのタイトル末尾（「<話> - <作品> - ハーメルン」、話・作品名は任意の文字列）
+SITE_TITLE_SUFFIX = ' - ハーメルン'
+_SITE_TITLE_SUFFIX = SITE_TITLE_SUFFIX.encode('utf-8')
+_TITLE_PATTERN = re.compile(rb'<title[^>]*>(.*?)</title', re.IGNORECASE | re.DOTALL)
+_HEAD_END = re.compile(rb'</head\s*>|<body[\s>]', re.IGNORECASE)
+
+
+class PageVerdict(namedtuple('PageVerdict', 'kind keyword')):
+    """ページ判定の結果（kind は下記の定数、keyword は一致した語）"""
+
+    OK = 'ok'
+    CHALLENGE = 'challenge'  # Cloudflare等のbot検知
+    NOT_FOUND = 'not_found'  # 存在しないページ
+    MAINTENANCE = 'maintenance'  # メンテナンス・一時的な停止
+    ERROR = 'error'  # その他のエラーページ
+    EMPTY = 'empty'  # 空のレスポンス
+
+    @property
+    def ok(self):
+        return self.kind == self.OK
+
+
+# (種類, 一致を見る範囲, キーワード)  範囲は 'head'（<head>全体）または 'title'
+# 'title' のキーワードは、サイトのタイトル末尾を持つページ（話・作品名を含む）には適用しない
+PAGE_KEYWORDS = [
+    (PageVerdict.CHALLENGE, 'head', 'cf-chl'),
+    (PageVerdict.CHALLENGE, 'head', 'cf_chl_opt'),
+    (PageVerdict.CHALLENGE, 'head', 'challenge-platform'),
+    (PageVerdict.CHALLENGE, 'title', 'Just a moment'),
+    (PageVerdict.CHALLENGE, 'title', 'Attention Required'),
+    (PageVerdict.CHALLENGE, 'title', '403 Forbidden'),
+    (PageVerdict.CHALLENGE, 'title', 'Access Denied'),
+    (PageVerdict.NOT_FOUND, 'title', 'Not Found'),
+    (PageVerdict.NOT_FOUND, 'title', 'ページが見つかりません'),
+    (PageVerdict.MAINTENANCE, 'title', 'メンテナンス中'),
+    (PageVerdict.MAINTENANCE, 'title', 'Service Unavailable'),
+    (PageVerdict.ERROR, 'title', 'エラーが発生しました'),
+]
+
+
+class KeywordScanner:
+    """
+    複数キーワードの一括走査
+
+    全キーワードを1つの正規表現（選択）にまとめ、対象を1回だけ走査する
+    正規表現エンジンの内部ループはCで動くため、Python で状態遷移を回すより速い
+    """
+
+    def __init__(self, keywords):
+        self._entries = {}
+        alternatives = []
+        for kind, scope, keyword in keywords:
+            encoded = keyword.encode('utf-8')
+            self._entries[encoded.lower()] = (kind, scope, keyword)
+            alternatives.append(re.escape(encoded))
+        # 長いキーワードを優先して同じ位置の短い一致に負けないようにする
+        alternatives.sort(key=len, reverse=True)
+        self._pattern = re.compile(b'|'.join(alternatives), re.IGNORECASE)
+
+    def scan(self, data, title_span=None):
+        """
+        data を走査し、最初に条件を満たしたキーワードの (種類, キーワード) を返す
+
+        Args:
+            data: 走査するバイト列
+            title_span: <title> の範囲 (start, end)。scope が 'title' のキーワードはこの範囲だけ有効
+        """
+        for match in self._pattern.finditer(data):
+            kind, scope, keyword = self._entries[match.group(0).lower()]
+            if scope == 'title' and not (title_span and title_span[0] <= match.start() < title_span[1]):
+                continue
+            return kind, keyword
+        return None
+
+
+_scanner = KeywordScanner(PAGE_KEYWORDS)
+
+
+def _head_region(content):
+    head = content[:HEAD_SCAN_BYTES]
+    if isinstance(head, str):
+        head = head.encode('utf-8', errors='replace')
+    end = _HEAD_END.search(head)
+    return head[:end.start()] if end else head
+
+
+def _title_span(data, span):
+    """タイトルのキーワードを適用する範囲（サイトのページのタイトルならNone）"""
+    if data[span[0]:span[1]].strip().endswith(_SITE_TITLE_SUFFIX):
+        return None
+    return span
+
+
+def scan_page(content):
+    """
+    生のレスポンス（bytes または str）を解析せずに判定
+
+    Returns:
+        PageVerdict: 判定結果
+    """
+    if not content or content.isspace():
+        return PageVerdict(PageVerdict.EMPTY, None)
+    head = _head_region(content)
+    title = _TITLE_PATTERN.search(head)
+    found = _scanner.scan(head, _title_span(head, title.span(1)) if title else None)
+    if found:
+        return PageVerdict(*found)
+    return PageVerdict(PageVerdict.OK, None)
+
+
+def scan_title(title):
+    """タイトル文字列だけを判定（解析済みページ用）"""
+    data = (title or '').encode('utf-8')
+    found = _scanner.scan(data, _title_span(data, (0, len(data))))
+    if found:
+        return PageVerdict(*found)
+    return PageVerdict(PageVerdict.OK, None)
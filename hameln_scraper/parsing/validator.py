@@ -5,6 +5,8 @@
 import logging
 from bs4 import BeautifulSoup
 
+from .keyword_scanner import PageVerdict, scan_page, scan_title
+
 
 class PageValidator:
     """ページ検証クラス"""
@@ -12,12 +14,24 @@ class PageValidator:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
-        # 除外キーワード
-        self.exclude_keywords = [
-            'アクセス解析', 'Google Analytics', 'advertisement',
-            'ページが見つかりませんでした', '404', 'Not Found',
-            'メンテナンス中', 'maintenance', 'エラーが発生しました'
-        ]
+        # 本文の最小文字数
+        self.min_text_length = 100
+    
+    def validate_raw(self, content, url: str) -> PageVerdict:
+        """
+        解析前の生のレスポンスを検証（<head> 部分のキーワード一括走査のみ）
+        
+        Args:
+            content: レスポンス（bytes または str）
+            url: ページURL
+            
+        Returns:
+            PageVerdict: 判定結果（チャレンジ・エラーページなら ok が False）
+        """
+        verdict = scan_page(content)
+        if not verdict.ok:
+            self.logger.warning(f"ページ判定: {verdict.kind} ({verdict.keyword}) {url}")
+        return verdict
     
     def validate_page(self, soup: BeautifulSoup, url: str) -> bool:
         """
@@ -38,15 +52,16 @@ class PageValidator:
             self.logger.warning(f"bodyタグが見つかりません: {url}")
             return False
         
-        # エラーページチェック
-        page_text = soup.get_text()
-        for keyword in self.exclude_keywords:
-            if keyword in page_text:
-                self.logger.warning(f"除外キーワード検出: {keyword} in {url}")
-                return False
+        # エラーページチェック（本文中の語では判定しない）
+        title = soup.title.get_text() if soup.title else ''
+        verdict = scan_title(title)
+        if not verdict.ok:
+            self.logger.warning(f"エラーページ検出: {verdict.kind} ({verdict.keyword}) in {url}")
+            return False
         
         # 最小コンテンツ長チェック
-        if len(page_text.strip()) < 100:
+        page_text = soup.get_text()
+        if len(page_text.strip()) < self.min_text_length:
             self.logger.warning(f"コンテンツが短すぎます: {len(page_text)} 文字")
             return False
         
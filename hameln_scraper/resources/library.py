@@ -0,0 +1,202 @@
+"""
+共有リソースライブラリ
+全小説で共通のCSS・JS・画像を内容のハッシュで1つだけ保存し、
+各小説のリソースフォルダにはハードリンク（別ファイルシステムではコピー）で配置する
+"""
+
+import os
+import json
+import time
+import errno
+import atexit
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+
+
+# 索引の1件（fresh=False なら期限切れで、etag / last_modified を使って条件付きリクエストで確認する）
+LibraryEntry = namedtuple('LibraryEntry', 'path etag last_modified fresh')
+
+# ハードリンクできない場合（別ドライブ・非対応のファイルシステム）にコピーで代替するエラー
+_LINK_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+class ResourceLibrary:
+    """
+    共有リソースライブラリ（スレッドセーフ）
+
+    <root>/objects/<ハッシュ先頭2文字>/<sha256> に内容を保存し、
+    <root>/index.json にURLキーとハッシュ・検証子（ETag / Last-Modified）・確認日時の対応を保持する
+    同じURLキーのリソースは期限内ならダウンロードせず、期限切れ後は条件付きリクエストで確認する
+    索引の変更はメモリ上にまとめ、flush() で1回だけ書き込む（ページごと・終了時）
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.logger = logging.getLogger(__name__)
+        self.index_path = os.path.join(root, 'index.json')
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._index = self._load_index()
+        self._dirty = False
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"リソースライブラリの索引を読み込めません（再作成します）: {e}")
+            return {}
+        # 旧形式（URLキー -> ハッシュ）は確認日時なし（次回の参照時に確認する）として読み込む
+        return {key: {'digest': item} if isinstance(item, str) else item for key, item in data.items()}
+
+    def flush(self):
+        """索引の変更を保存（変更がなければ何もしない）"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {key: dict(item) for key, item in self._index.items()}
+                self._dirty = False
+            fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.index.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+                os.replace(temp_path, self.index_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def lookup(self, key, ttl):
+        """
+        URLキーの保存済みオブジェクトを検索
+
+        Args:
+            key: URLキー
+            ttl: 確認せずに使う期間（秒、0なら常に期限切れ）
+
+        Returns:
+            LibraryEntry: 保存済みオブジェクト（未保存ならNone）
+        """
+        with self._lock:
+            item = self._index.get(key)
+            item = dict(item) if item else None
+        if item is None:
+            return None
+        path = self.object_path(item['digest'])
+        if not os.path.exists(path):
+            return None
+        fresh = time.time() - (item.get('checked') or 0) < ttl
+        return LibraryEntry(path, item.get('etag'), item.get('last_modified'), fresh)
+
+    def path_for(self, key):
+        """URLキーの保存済みオブジェクトのパス（期限に関係なく、未保存ならNone）"""
+        entry = self.lookup(key, 0)
+        return entry.path if entry else None
+
+    def read(self, key):
+        """URLキーの保存済み内容（未保存ならNone）"""
+        path = self.path_for(key)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def put(self, content, key=None, etag=None, last_modified=None):
+        """
+        内容を保存（同じ内容は1つだけ）し、key があればURLキーとして検証子とともに登録
+
+        Returns:
+            str: オブジェクトのパス
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+                os.replace(temp_path, path)
+            if key is not None:
+                self._index[key] = {
+                    'digest': digest, 'etag': etag, 'last_modified': last_modified, 'checked': time.time()
+                }
+                self._dirty = True
+        return path
+
+    def touch(self, key):
+        """URLキーを確認済み（条件付きリクエストで未変更）として期限を延ばす"""
+        with self._lock:
+            item = self._index.get(key)
+            if item is not None:
+                item['checked'] = time.time()
+                self._dirty = True
+
+    def link(self, object_path, dest_path):
+        """
+        オブジェクトを dest_path に配置（ハードリンク、できない場合はコピー）
+
+        一時ファイルとして作成してから置き換えるため、既存の dest_path（別のオブジェクトへの
+        ハードリンクの場合がある）に書き込むことはない
+
+        Returns:
+            str: 'link' または 'copy'
+        """
+        if os.path.exists(dest_path) and os.path.samefile(object_path, dest_path):
+            return 'link'
+        os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+        temp_path = f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                os.link(object_path, temp_path)
+                mode = 'link'
+            except OSError as e:
+                if e.errno not in _LINK_UNSUPPORTED:
+                    raise
+                shutil.copyfile(object_path, temp_path)
+                mode = 'copy'
+            os.replace(temp_path, dest_path)
+            return mode
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+
+def get_resource_library(root):
+    """root ごとに共有される ResourceLibrary を取得（並行ジョブ間で索引を共有）"""
+    root = os.path.abspath(root)
+    with _libraries_lock:
+        library = _libraries.get(root)
+        if library is None:
+            os.makedirs(root, exist_ok=True)
+            library = _libraries[root] = ResourceLibrary(root)
+        return library
+
+
+@atexit.register
+def _flush_libraries():
+    # ページの処理後に保存されなかった索引の変更を終了時に保存
+    with _libraries_lock:
+        libraries = list(_libraries.values())
+    for library in libraries:
+        try:
+            library.flush()
+        except OSError:
+            pass
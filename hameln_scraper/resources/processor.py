@@ -4,32 +4,110 @@ CSS、画像、JavaScriptなどのWebリソースのダウンロードと処理
 """
 
 import os
-import re
-import time
-from urllib.parse import urljoin, urlparse
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 import logging
 
+from ..core.metrics import get_metrics
+from ..core.events import EventHooks, RESOURCE_SAVED
+from ..core.job_control import check_cancelled
+from ..core.url_key import url_key
+from .library import get_resource_library
+from .rewriter import find_css_references, rewrite_css, find_html_references, rewrite_html, is_local_reference
+
 
 class ResourceProcessor:
     """リソース処理クラス"""
     
-    def __init__(self, config, network_client):
+    def __init__(self, config, network_client, events=None):
         self.config = config
         self.network_client = network_client
+        self.events = events or EventHooks(workers=0)
         self.logger = logging.getLogger(__name__)
+        self.metrics = get_metrics()
         self.resource_cache = {}
+        self.css_cache = {}  # (URL, 保存先) -> 処理済みCSSのファイル名
         self.base_url = config.base_url
+        self._library = None
+    
+    @property
+    def library(self):
+        """共有リソースライブラリ（無効時はNone、初回参照時に作成）"""
+        if self._library is None and self.config.enable_resource_library:
+            self._library = get_resource_library(
+                os.path.join(self.config.output_root, self.config.resource_library_dir)
+            )
+        return self._library
+    
+    def _resolve_batch(self, urls, resolve, resources_dir):
+        """参照URLをまとめて解決（resource_workers 件まで並行してダウンロード）"""
+        urls = list(dict.fromkeys(urls))
+        workers = min(self.config.resource_workers, len(urls))
+        if workers <= 1:
+            return {url: resolve(url, resources_dir) for url in urls}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # キャンセルトークンをワーカースレッドに引き継ぐ
+            futures = {
+                url: pool.submit(contextvars.copy_context().run, resolve, url, resources_dir) for url in urls
+            }
+            return {url: future.result() for url, future in futures.items()}
+    
+    def _download(self, url, kind):
+        with self.metrics.timer('resource_download_seconds', kind=kind):
+            content = self.network_client.fetch_bytes(url)
+        self.metrics.inc('resource_bytes_total', len(content), kind=kind)
+        return content
+    
+    def _fetch_from_library(self, url, kind):
+        """
+        ライブラリ経由でリソースを取得
+        
+        期限内の保存済みオブジェクトはそのまま使い、期限切れなら条件付きリクエストで確認して
+        変更があれば取得し直す（確認に失敗した場合は保存済みの内容を使う）
+        
+        Returns:
+            tuple: (オブジェクトのパス, 結果 library / not_modified / stale / ok)
+        """
+        entry = self.library.lookup(url, self.config.resource_library_ttl)
+        if entry and entry.fresh:
+            return entry.path, 'library'
+        try:
+            with self.metrics.timer('resource_download_seconds', kind=kind):
+                resource = self.network_client.fetch_bytes_if_modified(
+                    url, entry and entry.etag, entry and entry.last_modified
+                )
+        except Exception as e:
+            if entry is None:
+                raise
+            self.logger.warning(f"リソースの確認に失敗（保存済みの内容を使用）: {url} ({e})")
+            return entry.path, 'stale'
+        if resource.not_modified and entry:
+            self.library.touch(url)
+            return entry.path, 'not_modified'
+        self.metrics.inc('resource_bytes_total', len(resource.content), kind=kind)
+        return self.library.put(resource.content, url, resource.etag, resource.last_modified), 'ok'
+    
+    def _write_resource(self, local_path, content):
+        """リソースを保存（ライブラリ有効時はライブラリのオブジェクトへのハードリンク）"""
+        if self.library:
+            mode = self.library.link(self.library.put(content), local_path)
+            self.metrics.inc('resource_library_links_total', mode=mode)
+            return
+        with open(local_path, 'wb') as f:
+            f.write(content)
         
     def download_resource(self, url, resources_dir):
-        """リソースをダウンロード（キャッシュ機能付き）"""
+        """リソースをダウンロード（キャッシュ機能付き、失敗時は元のURLを返す）"""
+        source_url = url
+        url = url_key(url, self.base_url)
         if url in self.resource_cache:
+            self.metrics.inc('resource_downloads_total', result='cached')
             return self.resource_cache[url]
         
+        check_cancelled()
         try:
-            if not url.startswith('http'):
-                url = urljoin(self.base_url, url)
-            
             parsed = urlparse(url)
             filename = os.path.basename(parsed.path)
             if not filename or '.' not in filename:
@@ -39,24 +117,30 @@ class ResourceProcessor:
             local_path = os.path.join(resources_dir, filename)
             
             if os.path.exists(local_path):
+                self.metrics.inc('resource_downloads_total', result='cached')
                 self.resource_cache[url] = filename
                 return filename
             
             os.makedirs(resources_dir, exist_ok=True)
             
-            response = self.network_client.cloudscraper.get(url, timeout=10)
-            response.raise_for_status()
-            
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
-            
+            if self.library:
+                object_path, result = self._fetch_from_library(url, 'binary')
+                mode = self.library.link(object_path, local_path)
+                self.metrics.inc('resource_downloads_total', result=result)
+                self.metrics.inc('resource_library_links_total', mode=mode)
+            else:
+                content = self._download(url, 'binary')
+                self._write_resource(local_path, content)
+                self.metrics.inc('resource_downloads_total', result='ok')
             self.resource_cache[url] = filename
-            self.logger.debug(f"リソースダウンロード完了: {filename}")
+            self.events.emit(RESOURCE_SAVED, url=url, path=local_path, kind='binary')
+            self.logger.debug("リソースダウンロード完了: %s", filename)
             return filename
             
         except Exception as e:
+            self.metrics.inc('resource_downloads_total', result='error')
             self.logger.error(f"リソースダウンロードエラー ({url}): {e}")
-            return url
+            return source_url
     
     def _get_extension_from_url(self, url):
         """URLから拡張子を推測"""
@@ -79,110 +163,99 @@ class ResourceProcessor:
         
         self.logger.info("リソース処理開始")
         
-        for link in soup.find_all('link', rel='stylesheet'):
-            href = link.get('href')
-            if href:
-                local_css = self.download_and_process_css(href, resources_dir)
-                if local_css != href:
-                    link['href'] = f"./{resources_dir_name}/{local_css}"
-        
-        for img in soup.find_all('img', src=True):
-            src = img.get('src')
-            if src and not src.startswith('data:'):
-                local_img = self.download_resource(src, resources_dir)
-                if local_img != src:
-                    img['src'] = f"./{resources_dir_name}/{local_img}"
+        # 参照を1回の走査で収集し、まとめて解決してから1回で書き換える
+        references = find_html_references(soup)
+        stylesheets, resources = [], []
+        for ref in references:
+            if ref.kind == 'stylesheet':
+                stylesheets.append(ref.url)
+            elif ref.kind == 'css':
+                for css_ref in ref.css_references:
+                    if not is_local_reference(css_ref.url):
+                        (stylesheets if css_ref.kind == 'import' else resources).append(css_ref.url)
+            else:
+                resources.append(ref.url)
         
-        for script in soup.find_all('script', src=True):
-            src = script.get('src')
-            if src:
-                local_js = self.download_resource(src, resources_dir)
-                if local_js != src:
-                    script['src'] = f"./{resources_dir_name}/{local_js}"
+        try:
+            resolved = self._resolve_batch(stylesheets, self.download_and_process_css, resources_dir)
+            resolved.update(self._resolve_batch(resources, self.download_resource, resources_dir))
+        finally:
+            # ライブラリの索引はページごとに1回だけ書き込む
+            self.flush()
+        mapping = {url: f"./{resources_dir_name}/{local}" for url, local in resolved.items() if local != url}
+        rewrite_html(references, mapping)
         
         self.logger.info("リソース処理完了")
         return soup
     
     def download_and_process_css(self, url, resources_dir):
         """CSSファイルをダウンロードして内部の画像参照も処理"""
+        source_url = url
+        url = url_key(url, self.base_url)
+        check_cancelled()
         try:
-            if not url.startswith('http'):
-                url = urljoin(self.base_url, url)
-            
             parsed = urlparse(url)
             filename = os.path.basename(parsed.path)
             if not filename or '.' not in filename:
                 filename = f"style_{hash(url) % 10000}.css"
             
-            self.logger.debug(f"CSS詳細処理中: {url}")
+            # 処理済み（@import の循環を含む）は同じファイル名を返す
+            css_key = (url, resources_dir)
+            if css_key in self.css_cache:
+                return self.css_cache[css_key]
+            self.css_cache[css_key] = filename
             
-            response = self.network_client.cloudscraper.get(url, timeout=10)
-            response.raise_for_status()
+            self.logger.debug("CSS詳細処理中: %s", url)
             
-            response.encoding = 'utf-8'
-            css_content = response.text
+            # 元のCSSはライブラリにあれば期限内はダウンロードしない（書き換え後の内容は別に保存）
+            if self.library:
+                object_path, _ = self._fetch_from_library(url, 'css')
+                with open(object_path, 'rb') as f:
+                    content = f.read()
+            else:
+                content = self._download(url, 'css')
+            css_content = content.decode('utf-8', errors='replace')
             
-            def replace_url_func(match):
-                full_match = match.group(0)
-                img_url = match.group(1)
-                
-                if img_url.startswith('data:'):
-                    return full_match
-                
-                original_img_url = img_url
-                
-                if not img_url.startswith('http'):
-                    if img_url.startswith('//'):
-                        img_url = 'https:' + img_url
-                    elif img_url.startswith('/'):
-                        base_domain = '/'.join(url.split('/')[:3])
-                        img_url = base_domain + img_url
-                    else:
-                        base_css_url = '/'.join(url.split('/')[:-1])
-                        img_url = urljoin(base_css_url + '/', img_url)
-                
-                cleaned_url = img_url.split(')')[0]
-                if '?' in cleaned_url:
-                    cleaned_url = cleaned_url.split('?')[0]
-                
-                local_img = self.download_resource(cleaned_url, resources_dir)
-                if local_img != cleaned_url:
-                    browser_compatible_path = f"./{local_img}"
-                    return full_match.replace(original_img_url, browser_compatible_path)
+            # url() と @import をトークン単位で収集（url() のクエリは除いて取得）
+            references = find_css_references(css_content)
+            images, imports = {}, {}
+            for ref in references:
+                if is_local_reference(ref.url):
+                    continue
+                if ref.kind == 'import':
+                    imports[ref.url] = url_key(ref.url, url)
                 else:
-                    return full_match
+                    images[ref.url] = url_key(ref.url.split('?')[0], url)
             
-            css_content = re.sub(r'url\([\'"]?([^\'"]+?)[\'"]?\)', replace_url_func, css_content)
-            
-            # @import文を処理
-            imports = re.findall(r'@import\s+[\'"]([^\'"]+)[\'"]', css_content)
-            for import_url in imports:
-                if not import_url.startswith('http'):
-                    if import_url.startswith('//'):
-                        import_url = 'https:' + import_url
-                    elif import_url.startswith('/'):
-                        base_domain = '/'.join(url.split('/')[:3])
-                        import_url = base_domain + import_url
-                    else:
-                        base_css_url = '/'.join(url.split('/')[:-1])
-                        import_url = urljoin(base_css_url + '/', import_url)
-                
-                local_css = self.download_and_process_css(import_url, resources_dir)
-                if local_css != import_url:
-                    browser_compatible_css = f"./{local_css}"
-                    css_content = css_content.replace(f'@import "{import_url}"', f'@import "{browser_compatible_css}"')
-                    css_content = css_content.replace(f"@import '{import_url}'", f"@import '{browser_compatible_css}'")
+            resolved = self._resolve_batch(list(images.values()), self.download_resource, resources_dir)
+            resolved.update(self._resolve_batch(list(imports.values()), self.download_and_process_css, resources_dir))
+            mapping = {}
+            for original, absolute in list(images.items()) + list(imports.items()):
+                local = resolved[absolute]
+                if local != absolute:
+                    mapping[original] = f"./{local}"
+            css_content = rewrite_css(css_content, references, mapping)
             
+            os.makedirs(resources_dir, exist_ok=True)
             local_path = os.path.join(resources_dir, filename)
-            with open(local_path, 'w', encoding='utf-8') as f:
-                f.write(css_content)
+            self._write_resource(local_path, css_content.encode('utf-8'))
+            self.events.emit(RESOURCE_SAVED, url=url, path=local_path, kind='css')
             
-            self.logger.debug(f"CSS処理完了: {filename}")
+            self.logger.debug("CSS処理完了: %s", filename)
             return filename
             
         except Exception as e:
             self.logger.error(f"CSS処理エラー ({url}): {e}")
-            return self.download_resource(url, resources_dir)
+            self.css_cache.pop((url, resources_dir), None)
+            return self.download_resource(source_url, resources_dir)
+    
+    def flush(self):
+        """共有ライブラリの索引の変更を保存"""
+        if self._library:
+            try:
+                self._library.flush()
+            except OSError as e:
+                self.logger.warning(f"リソースライブラリの索引を保存できません: {e}")
     
     def adjust_resource_paths_only(self, soup, base_path):
         """リソースパスのみを調整（ダウンロードは行わない）"""
@@ -0,0 +1,195 @@
+"""
+リソースURLの書き換え
+CSSはトークン単位、HTMLは属性単位で参照を1回の走査で収集し、
+まとめて解決した対応表で1回の走査で書き換える
+"""
+
+import re
+from collections import namedtuple
+
+
+# start / end は参照URL（引用符の内側）の範囲、kind は 'url' または 'import'
+CssReference = namedtuple('CssReference', 'start end url kind')
+
+_CSS_TOKEN = re.compile(r'/\*|["\']|\burl\(|@import\b', re.IGNORECASE)
+_WHITESPACE = ' \t\r\n\f'
+
+# リソースとして取得する属性（<link rel="stylesheet"> と style 属性・<style> は別扱い）
+ICON_RELS = {'icon', 'shortcut', 'apple-touch-icon', 'apple-touch-icon-precomposed', 'mask-icon', 'fluid-icon'}
+MEDIA_TAGS = {'video', 'audio', 'embed', 'object', 'source'}
+MEDIA_ATTRS = ('src', 'data', 'href', 'poster')
+
+
+def _string_end(css, pos):
+    """pos の引用符で始まる文字列の閉じ引用符の位置（閉じていなければ改行・末尾）"""
+    quote = css[pos]
+    i = pos + 1
+    length = len(css)
+    while i < length:
+        char = css[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == quote or char == '\n':
+            return i
+        i += 1
+    return length
+
+
+def _skip_whitespace(css, pos):
+    length = len(css)
+    while pos < length and css[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _read_url(css, pos, kind):
+    """url( の直後から参照を読み取り、(CssReference または None, 次の走査位置) を返す"""
+    pos = _skip_whitespace(css, pos)
+    if pos < len(css) and css[pos] in '"\'':
+        end = _string_end(css, pos)
+        close = css.find(')', end)
+        reference = CssReference(pos + 1, end, css[pos + 1:end], kind)
+        return reference, (len(css) if close < 0 else close + 1)
+    close = css.find(')', pos)
+    if close < 0:
+        return None, len(css)
+    end = close
+    while end > pos and css[end - 1] in _WHITESPACE:
+        end -= 1
+    return CssReference(pos, end, css[pos:end], kind), close + 1
+
+
+def find_css_references(css):
+    """
+    CSS内のリソース参照（url() と @import）を1回の走査で収集
+
+    コメントと文字列リテラルの中は参照として扱わない
+    """
+    references = []
+    pos = 0
+    while True:
+        match = _CSS_TOKEN.search(css, pos)
+        if not match:
+            break
+        token = match.group(0).lower()
+        if token == '/*':
+            end = css.find('*/', match.end())
+            pos = len(css) if end < 0 else end + 2
+        elif token in ('"', "'"):
+            pos = _string_end(css, match.start()) + 1
+        elif token == '@import':
+            pos = _skip_whitespace(css, match.end())
+            if pos < len(css) and css[pos] in '"\'':
+                end = _string_end(css, pos)
+                references.append(CssReference(pos + 1, end, css[pos + 1:end], 'import'))
+                pos = end + 1
+            elif css[pos:pos + 4].lower() == 'url(':
+                reference, pos = _read_url(css, pos + 4, 'import')
+                if reference:
+                    references.append(reference)
+        else:
+            reference, pos = _read_url(css, match.end(), 'url')
+            if reference:
+                references.append(reference)
+    return [ref for ref in references if ref.url]
+
+
+def rewrite_css(css, references, mapping):
+    """参照URLを mapping（元のURL -> 置換後）で置換した文字列を1回の走査で生成"""
+    parts = []
+    position = 0
+    for ref in references:
+        replacement = mapping.get(ref.url)
+        if replacement is None:
+            continue
+        parts.append(css[position:ref.start])
+        parts.append(replacement)
+        position = ref.end
+    if not parts:
+        return css
+    parts.append(css[position:])
+    return ''.join(parts)
+
+
+def is_local_reference(url):
+    """書き換え不要な参照（data: URI・ページ内リンク・保存済みの相対パス）"""
+    return url.startswith(('data:', '#', './', 'javascript:', 'about:'))
+
+
+class HtmlReference:
+    """HTML内のリソース参照（要素の属性1つ、または style 属性・<style> のCSS）"""
+
+    __slots__ = ('element', 'attr', 'url', 'kind', 'css_references')
+
+    def __init__(self, element, attr, url=None, kind='resource', css_references=None):
+        self.element = element
+        self.attr = attr  # None の場合は <style> の本文
+        self.url = url
+        self.kind = kind  # 'resource' / 'stylesheet' / 'css'（インラインCSS）
+        self.css_references = css_references
+
+
+def _rel_values(element):
+    rel = element.get('rel') or []
+    if isinstance(rel, str):
+        rel = rel.split()
+    return {value.lower() for value in rel}
+
+
+def find_html_references(soup):
+    """HTML内のリソース参照を1回の走査で収集"""
+    references = []
+    for element in soup.find_all(True):
+        name = element.name
+        if name == 'link':
+            href = element.get('href')
+            rels = _rel_values(element)
+            if href and not is_local_reference(href):
+                if 'stylesheet' in rels:
+                    references.append(HtmlReference(element, 'href', href, 'stylesheet'))
+                elif rels & ICON_RELS:
+                    references.append(HtmlReference(element, 'href', href))
+        elif name in ('img', 'script'):
+            src = element.get('src')
+            if src and not is_local_reference(src):
+                references.append(HtmlReference(element, 'src', src))
+        elif name in MEDIA_TAGS:
+            for attr in MEDIA_ATTRS:
+                url = element.get(attr)
+                if url and url.startswith(('http', '//')):
+                    references.append(HtmlReference(element, attr, url))
+        elif name == 'style' and element.string:
+            css_refs = find_css_references(element.string)
+            if css_refs:
+                references.append(HtmlReference(element, None, kind='css', css_references=css_refs))
+
+        data_src = element.get('data-src')
+        if data_src and not is_local_reference(data_src):
+            references.append(HtmlReference(element, 'data-src', data_src))
+        style = element.get('style')
+        if style and 'url(' in style.lower():
+            css_refs = find_css_references(style)
+            if css_refs:
+                references.append(HtmlReference(element, 'style', kind='css', css_references=css_refs))
+    return references
+
+
+def rewrite_html(references, mapping):
+    """
+    収集した参照を mapping（元のURL -> 置換後）で書き換え
+
+    インラインCSSの参照は url() も @import も mapping から引く
+    """
+    for ref in references:
+        if ref.kind == 'css':
+            css = ref.element.string if ref.attr is None else ref.element[ref.attr]
+            rewritten = rewrite_css(css, ref.css_references, mapping)
+            if rewritten is css:
+                continue
+            if ref.attr is None:
+                ref.element.string = rewritten
+            else:
+                ref.element[ref.attr] = rewritten
+        elif ref.url in mapping:
+            ref.element[ref.attr] = mapping[ref.url]
@@ -0,0 +1,4 @@
+"""全文検索モジュール"""
+from .index import SearchIndex
+
+__all__ = ["SearchIndex"]
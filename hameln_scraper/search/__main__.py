@@ -0,0 +1,4 @@
+"""python -m hameln_scraper.search で全文検索CLIを実行"""
+from .index import main
+
+main()
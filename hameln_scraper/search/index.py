@@ -0,0 +1,489 @@
+"""
+全文検索インデックスモジュール
+保存済み章本文を文字バイグラムで索引化し、フレーズ検索を行う
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import argparse
+import functools
+import threading
+import unicodedata
+from array import array
+from collections import defaultdict
+from itertools import accumulate
+from bs4 import BeautifulSoup
+
+from ..core.config import ScraperConfig
+from ..novel.processor import NovelProcessor
+from ..output.archive_reader import NovelArchive
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    novel TEXT,
+    title TEXT,
+    url TEXT,
+    path TEXT,
+    sha256 TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS docs_key ON docs(key, deleted);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (term, block)
+) WITHOUT ROWID;
+"""
+
+# 本文テキストで改行として扱う要素
+BLOCK_TAGS = ['p', 'div', 'li', 'tr', 'blockquote', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+BLANK_LINES = re.compile(r'\n[ \t\u3000]*(?=\n)')
+
+RUBY_PLAIN = re.compile(r'｜([^《\n]+)《[^》\n]*》')
+RUBY_MARKDOWN = re.compile(r'<ruby>(.*?)<rt>.*?</rt></ruby>')
+MARKDOWN_MARKUP = re.compile(r'\*\*|\\(?=[\\`*_\[\]<>#])|^# ', re.MULTILINE)
+
+# BM25パラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 削除扱いの文書がこの割合を超えたら閉じる時に詰め直す
+COMPACT_RATIO = 0.2
+
+
+def normalize(text):
+    """検索用に正規化（NFKC・小文字化）"""
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def bigrams(text):
+    """空白を含まない文字バイグラムを生成"""
+    for i in range(len(text) - 1):
+        term = text[i:i + 2]
+        if not term[0].isspace() and not term[1].isspace():
+            yield term
+
+
+def _synchronized(method):
+    """接続を共有するメソッドをインスタンスのロックで直列化するデコレータ"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SearchIndex:
+    """
+    バイグラム転置インデックス（SQLite格納、スレッドセーフ）
+
+    接続は作成したスレッド以外（イベントハンドラのワーカー・非同期取得のスレッド）からも使うため、
+    スレッドの確認を無効にして各操作をロックで直列化する
+    """
+
+    def __init__(self, index_path, config=None):
+        self.index_path = index_path
+        self.config = config or ScraperConfig()
+        self.logger = logging.getLogger(__name__)
+        self.novel_processor = NovelProcessor(self.config, None)
+
+        index_dir = os.path.dirname(index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(index_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+        # 未書き込みのポスティング（term -> [(doc_id, tf), ...]）
+        self._pending = defaultdict(list)
+        self._pending_docs = 0
+
+    # ------------------------------------------------------------------
+    # 索引化
+    # ------------------------------------------------------------------
+
+    @_synchronized
+    def add_document(self, key, text, novel=None, title=None, url=None, path=None):
+        """
+        文書を追加（同じ本文なら何もしない、変更時は旧版を削除扱いにして追加）
+
+        Args:
+            key: 文書キー（章URLなど）
+            text: 本文テキスト
+
+        Returns:
+            bool: 索引を更新したかどうか
+        """
+        sha256 = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        row = self.conn.execute(
+            "SELECT id, sha256 FROM docs WHERE key = ? AND deleted = 0", (key,)
+        ).fetchone()
+        if row and row[1] == sha256:
+            return False
+        if row:
+            self.conn.execute("UPDATE docs SET deleted = 1 WHERE id = ?", (row[0],))
+
+        normalized = normalize(text)
+        cursor = self.conn.execute(
+            "INSERT INTO docs (key, novel, title, url, path, sha256, length, body) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, novel, title, url, path, sha256, len(normalized), zlib.compress(text.encode('utf-8')))
+        )
+        doc_id = cursor.lastrowid
+
+        counts = defaultdict(int)
+        for term in bigrams(normalized):
+            counts[term] += 1
+        for term, tf in counts.items():
+            self._pending[term].append((doc_id, tf))
+
+        self._pending_docs += 1
+        if self._pending_docs >= 200:
+            self.flush()
+        return True
+
+    @_synchronized
+    def remove_document(self, key):
+        """
+        文書を削除扱いにする（ポスティングは compact() で消去）
+
+        Returns:
+            bool: 削除したかどうか
+        """
+        cursor = self.conn.execute("UPDATE docs SET deleted = 1 WHERE key = ? AND deleted = 0", (key,))
+        return cursor.rowcount > 0
+
+    @_synchronized
+    def compact(self):
+        """
+        削除扱い（差し替え前の版を含む）の文書とそのポスティングを消去する
+
+        削除した文書を含む語だけ、残りのポスティングを1ブロックにまとめて書き直す
+
+        Returns:
+            int: 消去した文書数
+        """
+        self.flush()
+        deleted = {doc_id for (doc_id,) in self.conn.execute("SELECT id FROM docs WHERE deleted = 1")}
+        if not deleted:
+            return 0
+
+        rewrites = []
+        term, entries, dirty = None, [], False
+        for row_term, data in self.conn.execute("SELECT term, data FROM postings ORDER BY term, block"):
+            if row_term != term:
+                if dirty:
+                    rewrites.append((term, entries))
+                term, entries, dirty = row_term, [], False
+            for doc_id, tf in self._decode_block(data):
+                if doc_id in deleted:
+                    dirty = True
+                else:
+                    entries.append((doc_id, tf))
+        if dirty:
+            rewrites.append((term, entries))
+
+        for term, entries in rewrites:
+            self.conn.execute("DELETE FROM postings WHERE term = ?", (term,))
+            if entries:
+                self.conn.execute(
+                    "INSERT INTO postings (term, block, data) VALUES (?, 0, ?)",
+                    (term, self._encode_block(sorted(entries)))
+                )
+        self.conn.execute("DELETE FROM docs WHERE deleted = 1")
+        self.conn.commit()
+        self.logger.info(f"索引を詰め直し: 文書{len(deleted)}件、語{len(rewrites)}件")
+        return len(deleted)
+
+    def _needs_compaction(self):
+        total, deleted = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(deleted), 0) FROM docs").fetchone()
+        return deleted > 0 and deleted >= total * COMPACT_RATIO
+
+    @_synchronized
+    def flush(self):
+        """未書き込みのポスティングをブロックとして追記"""
+        if not self._pending:
+            self.conn.commit()
+            return
+
+        for term, entries in self._pending.items():
+            block = self.conn.execute(
+                "SELECT COALESCE(MAX(block), -1) + 1 FROM postings WHERE term = ?", (term,)
+            ).fetchone()[0]
+            self.conn.execute(
+                "INSERT INTO postings (term, block, data) VALUES (?, ?, ?)",
+                (term, block, self._encode_block(entries))
+            )
+        self._pending.clear()
+        self._pending_docs = 0
+        self.conn.commit()
+
+    def _encode_block(self, entries):
+        """(doc_id, tf) のリストを差分符号化して圧縮"""
+        doc_ids = array('I')
+        tfs = array('I')
+        previous = 0
+        for doc_id, tf in entries:
+            doc_ids.append(doc_id - previous)
+            tfs.append(tf)
+            previous = doc_id
+        return zlib.compress(doc_ids.tobytes() + tfs.tobytes())
+
+    def _decode_block(self, data):
+        values = array('I')
+        values.frombytes(zlib.decompress(data))
+        half = len(values) // 2
+        return zip(accumulate(values[:half]), values[half:])
+
+    def index_novel_dir(self, novel_dir):
+        """
+        保存済み小説ディレクトリを索引化
+
+        text/manifest.json があればテキストを、なければ保存済みHTMLから本文を抽出する
+
+        Returns:
+            int: 更新した文書数
+        """
+        manifest_path = os.path.join(novel_dir, 'text', 'manifest.json')
+        updated = 0
+
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            for chapter in manifest.get('chapters', []):
+                text_path = os.path.join(novel_dir, 'text', chapter['file'])
+                if not os.path.exists(text_path):
+                    continue
+                with open(text_path, encoding='utf-8') as f:
+                    text = strip_text_markup(f.read())
+                updated += self.add_document(
+                    chapter.get('url') or text_path, text,
+                    novel=manifest.get('title'), title=chapter.get('title'),
+                    url=chapter.get('url'), path=text_path
+                )
+        else:
+            archive = NovelArchive(novel_dir)
+            novel_title = os.path.basename(os.path.normpath(novel_dir))
+            for chapter_url, file_path in archive.chapter_files(self.novel_processor):
+                soup = BeautifulSoup(archive.read_html(file_path), 'html.parser')
+                body_html = self.novel_processor.extract_chapter_content(soup, chapter_url)
+                title_tag = soup.find('title')
+                title = self.novel_processor.extract_chapter_title(title_tag.get_text(strip=True)) if title_tag else None
+                updated += self.add_document(
+                    chapter_url, html_to_text(body_html),
+                    novel=novel_title, title=title, url=chapter_url, path=file_path
+                )
+
+        self.flush()
+        self.logger.info(f"索引更新: {novel_dir} ({updated}件)")
+        return updated
+
+    def index_root(self, root_dir):
+        """saved_novels 配下の全作品を索引化"""
+        updated = 0
+        for name in sorted(os.listdir(root_dir)):
+            novel_dir = os.path.join(root_dir, name)
+            if os.path.isdir(novel_dir):
+                updated += self.index_novel_dir(novel_dir)
+        return updated
+
+    # ------------------------------------------------------------------
+    # 検索
+    # ------------------------------------------------------------------
+
+    def _postings(self, term):
+        """term のポスティング {doc_id: tf} を取得"""
+        postings = {}
+        for (data,) in self.conn.execute(
+            "SELECT data FROM postings WHERE term = ? ORDER BY block", (term,)
+        ):
+            postings.update(self._decode_block(data))
+        return postings
+
+    def _prefix_postings(self, char):
+        """1文字クエリ用: char で始まるバイグラムのポスティングを合算"""
+        postings = defaultdict(int)
+        for term, data in self.conn.execute(
+            "SELECT term, data FROM postings WHERE term >= ? AND term < ?", (char, char + '\U0010ffff')
+        ):
+            for doc_id, tf in self._decode_block(data):
+                postings[doc_id] += tf
+        return postings
+
+    @_synchronized
+    def search(self, query, limit=20, snippet_width=40):
+        """
+        フレーズ検索
+
+        バイグラムのポスティング積で候補を絞り、BM25近似スコア順に本文で一致を確認する
+
+        Returns:
+            list: dict(score, novel, title, url, path, snippet) のリスト
+        """
+        self.flush()
+        needle = normalize(query.strip())
+        if not needle:
+            return []
+
+        terms = sorted(set(bigrams(needle)))
+        if terms:
+            posting_lists = sorted((self._postings(term) for term in terms), key=len)
+            if not posting_lists[0]:
+                return []
+            candidates = {
+                doc_id: min(plist[doc_id] for plist in posting_lists)
+                for doc_id in posting_lists[0]
+                if all(doc_id in plist for plist in posting_lists[1:])
+            }
+        else:
+            candidates = dict(self._prefix_postings(needle))
+
+        if not candidates:
+            return []
+
+        # 削除扱いの文書（詰め直し前のポスティング）は候補・文書頻度に数えない
+        lengths = {}
+        doc_ids = list(candidates)
+        for start in range(0, len(doc_ids), 500):
+            chunk = doc_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for doc_id, length in self.conn.execute(
+                f"SELECT id, length FROM docs WHERE deleted = 0 AND id IN ({placeholders})", chunk
+            ):
+                lengths[doc_id] = length
+        if not lengths:
+            return []
+
+        total_docs, avg_length = self.conn.execute(
+            "SELECT COUNT(*), AVG(length) FROM docs WHERE deleted = 0"
+        ).fetchone()
+        idf = math.log(1 + (total_docs - len(lengths) + 0.5) / (len(lengths) + 0.5))
+
+        def bm25(doc_id):
+            tf = candidates[doc_id]
+            norm = 1 - BM25_B + BM25_B * lengths[doc_id] / (avg_length or 1)
+            return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        ranked = sorted(lengths, key=bm25, reverse=True)
+
+        hits = []
+        for doc_id in ranked:
+            novel, title, url, path, body = self.conn.execute(
+                "SELECT novel, title, url, path, body FROM docs WHERE id = ?", (doc_id,)
+            ).fetchone()
+            text = zlib.decompress(body).decode('utf-8')
+            position = normalize(text).find(needle)
+            if position < 0:
+                continue
+            # 正規化で文字数が変わらない限り原文と同じ位置になる
+            exact = text.find(query.strip())
+            if exact >= 0:
+                position = exact
+            hits.append({
+                'score': round(bm25(doc_id), 4),
+                'novel': novel,
+                'title': title,
+                'url': url,
+                'path': path,
+                'snippet': make_snippet(text, position, len(needle), snippet_width),
+            })
+            if len(hits) >= limit:
+                break
+        return hits
+
+    @_synchronized
+    def close(self):
+        """未書き込み分を反映して閉じる（削除扱いの文書が多ければ詰め直す）"""
+        self.flush()
+        if self._needs_compaction():
+            self.compact()
+        self.conn.close()
+
+
+def html_to_text(body_html):
+    """本文HTMLを検索用テキストに変換（段落外のテキストも含む、ルビは親文字のみ）"""
+    soup = BeautifulSoup(body_html, 'html.parser')
+    for tag in soup.find_all(['rt', 'rp', 'script', 'style']):
+        tag.decompose()
+    for br in soup.find_all('br'):
+        br.replace_with('\n')
+    for block in soup.find_all(BLOCK_TAGS):
+        block.insert_before('\n')
+        block.insert_after('\n')
+    return BLANK_LINES.sub('', soup.get_text()).strip('\n')
+
+
+def strip_text_markup(text):
+    """テキストモード出力（Markdown／プレーン）からルビ・強調記法を除去"""
+    text = RUBY_PLAIN.sub(r'\1', text)
+    text = RUBY_MARKDOWN.sub(r'\1', text)
+    text = MARKDOWN_MARKUP.sub('', text)
+    return re.sub(r' +$', '', text, flags=re.MULTILINE)
+
+
+def make_snippet(text, position, length, width):
+    """一致箇所の前後を切り出し、一致部分を【】で強調"""
+    start = max(0, position - width)
+    end = min(len(text), position + length + width)
+    snippet = text[start:end]
+    match = text[position:position + length]
+    snippet = snippet.replace(match, f"【{match}】", 1)
+    snippet = snippet.replace('\n', ' ')
+    return ('…' if start > 0 else '') + snippet + ('…' if end < len(text) else '')
+
+
+def main():
+    """コマンドラインから索引作成・検索を実行"""
+    parser = argparse.ArgumentParser(description="保存済み小説の全文検索", prog='python -m hameln_scraper.search')
+    parser.add_argument('--index', default=os.path.join('saved_novels', 'search_index.db'), help="索引ファイル")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="索引を作成・更新")
+    build_parser.add_argument('root', nargs='?', default='saved_novels', help="保存先ルート")
+
+    query_parser = subparsers.add_parser('query', help="フレーズ検索")
+    query_parser.add_argument('phrase', help="検索語")
+    query_parser.add_argument('-n', '--limit', type=int, default=20, help="表示件数")
+
+    subparsers.add_parser('compact', help="削除扱いの文書を索引から消去")
+
+    args = parser.parse_args()
+    index = SearchIndex(args.index)
+    try:
+        if args.command == 'build':
+            if not os.path.isdir(args.root):
+                print(f"ディレクトリが見つかりません: {args.root}")
+                sys.exit(1)
+            updated = index.index_root(args.root)
+            print(f"✓ 索引更新完了: {updated}件")
+        elif args.command == 'compact':
+            removed = index.compact()
+            print(f"✓ 詰め直し完了: {removed}件を消去")
+        else:
+            started = time.perf_counter()
+            hits = index.search(args.phrase, limit=args.limit)
+            elapsed = (time.perf_counter() - started) * 1000
+            for rank, hit in enumerate(hits, 1):
+                print(f"{rank:3d}. [{hit['score']:.2f}] {hit['novel']} / {hit['title']}")
+                print(f"     {hit['snippet']}")
+                print(f"     {hit['url'] or hit['path']}")
+            print(f"{len(hits)}件 ({elapsed:.1f}ms)")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
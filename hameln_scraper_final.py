@@ -700,6 +700,8 @@ class HamelnFinalScraperLegacy:
                         print(f"目次リンク修正: {old_href} -> {index_file}")
         
         # 2. 章間ナビゲーションリンクの修正
+        # 話番号 -> ファイル名の索引（短縮形式リンクがあったときに1回だけ作成）
+        chapter_numbers = None
         # 全てのaタグを調査して、章URLパターンを検出
         all_links = soup.find_all('a', href=True)
         for link in all_links:
@@ -739,19 +741,18 @@ class HamelnFinalScraperLegacy:
                     chapter_num = chapter_match.group(1)
                     print(f"短縮リンク検出: {href}, 章番号: {chapter_num}")
                     
-                    # chapter_mappingからマッチするファイル名を探す
-                    found_mapping = False
-                    for url, filename in chapter_mapping.items():
-                        # URLから章番号を抽出
-                        url_match = re.search(r'/(\d+)\.html', url)
-                        if url_match and url_match.group(1) == chapter_num:
-                            print(f"マッピング発見: URL={url}, 章番号={url_match.group(1)}, ファイル名={filename}")
-                            link['href'] = filename
-                            print(f"短縮リンク修正: {href} -> {filename}")
-                            found_mapping = True
-                            break
+                    if chapter_numbers is None:
+                        chapter_numbers = {}
+                        for url, filename in chapter_mapping.items():
+                            url_match = re.search(r'/(\d+)\.html$', url)
+                            if url_match:
+                                chapter_numbers.setdefault(url_match.group(1), filename)
                     
-                    if not found_mapping:
+                    filename = chapter_numbers.get(chapter_num)
+                    if filename:
+                        link['href'] = filename
+                        print(f"短縮リンク修正: {href} -> {filename}")
+                    else:
                         # 存在しないファイルへのリンクは無効化
                         print(f"存在しないファイルへのリンク: {href} -> 無効化")
                         link['href'] = 'javascript:void(0);'
@@ -2478,18 +2479,34 @@ class HamelnFinalScraperLegacy:
 
 def main():
     """メイン関数"""
+    import argparse
+    parser = argparse.ArgumentParser(description="ハーメルン小説保存ツール（最終版）")
+    parser.add_argument('url', nargs='?', help="小説のURL")
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='DIR',
+                        help="段階別プロファイルを出力（既定: ./profile）")
+    parser.add_argument('--replay', metavar='NOVEL_DIR',
+                        help="保存済みアーカイブを再処理してプロファイル（ネットワーク不要、--profile と併用）")
+    args = parser.parse_args()
+    
     scraper = None
     
     try:
         scraper = HamelnFinalScraper()
+        if args.profile:
+            scraper.enable_profiling(args.profile)
         
         print("ハーメルン小説保存ツール（最終版）")
         print("完全モード（CSS・画像・JavaScript含む完全保存）")
         print("=" * 50)
         
-        import sys
-        if len(sys.argv) > 1:
-            novel_url = sys.argv[1]
+        if args.replay:
+            replay_output = os.path.join(args.profile or 'profile', 'replay')
+            count = scraper.profile_saved_novel(args.replay, replay_output)
+            print(f"\n✓ 再処理完了: {count}章 -> {replay_output}")
+            return
+        
+        if args.url:
+            novel_url = args.url
             print(f"指定されたURL: {novel_url}")
         else:
             novel_url = input("小説のURLを入力してください: ").strip()
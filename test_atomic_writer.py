@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+原子的ファイル書き込みのテストケース
+"""
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+from unittest.mock import patch
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.output.atomic_writer import AtomicFileWriter
+from hameln_scraper.output.file_manager import FileManager
+
+
+class TestAtomicFileWriter(unittest.TestCase):
+    """AtomicFileWriterのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_background_write_and_flush(self):
+        """キュー投入後、flushで全ファイルが書き込まれ一時ファイルが残らない"""
+        writer = AtomicFileWriter(max_queue=2, fsync_batch=3)
+        paths = [os.path.join(self.temp_dir, f"{i}.html") for i in range(10)]
+        for i, path in enumerate(paths):
+            writer.write_text(path, f"<p>本文{i}</p>")
+        writer.close()
+
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), f"<p>本文{i}</p>".encode('utf-8-sig'))
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), sorted(os.path.basename(p) for p in paths))
+
+    def test_failed_write_keeps_original(self):
+        """書き込みに失敗しても既存ファイルは壊れず、エラーはflushで通知される"""
+        path = os.path.join(self.temp_dir, "page.html")
+        writer = AtomicFileWriter()
+        writer.write_text(path, "初版")
+        writer.flush()
+
+        with patch('hameln_scraper.output.atomic_writer.os.replace', side_effect=OSError("disk full")):
+            writer.write_text(path, "改稿")
+            with self.assertRaises(OSError):
+                writer.flush()
+        writer.close()
+
+        with open(path, encoding='utf-8-sig') as f:
+            self.assertEqual(f.read(), "初版")
+        self.assertEqual(os.listdir(self.temp_dir), ["page.html"])
+
+
+class TestFileManagerRewrite(unittest.TestCase):
+    """FileManagerの読み書きのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_manager = FileManager(ScraperConfig(enable_revision_tracking=False))
+
+    def tearDown(self):
+        self.file_manager.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_relink_saved_page_before_flush(self):
+        """書き込み待ちのページにもリンク修正が適用され、BOMが重複しない"""
+        page_url = "https://syosetu.org/novel/123456/1.html"
+        soup = BeautifulSoup(
+            '<html><head><title>第一話</title></head><body>'
+            '<a href="https://syosetu.org/novel/123456/2.html">次の話 &gt;&gt;</a></body></html>',
+            'html.parser'
+        )
+        path = self.file_manager.save_complete_page(soup, page_url, "第一話", self.temp_dir, page_url)
+        self.file_manager.relink_saved_page(
+            path, {"https://syosetu.org/novel/123456/2.html": "第二話.html"}, page_url
+        )
+        self.file_manager.flush()
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b'\xef\xbb\xbf'))
+        self.assertFalse(data[3:].startswith(b'\xef\xbb\xbf'))
+        self.assertIn('href="第二話.html"', data.decode('utf-8-sig'))
+
+
+if __name__ == '__main__':
+    unittest.main()
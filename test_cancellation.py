@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+キャンセル・期限のテストケース
+"""
+import unittest
+from unittest.mock import Mock
+import threading
+import tempfile
+import shutil
+import json
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.scraper import HamelnScraper
+from hameln_scraper.core.metrics import get_metrics
+from hameln_scraper.core.job_control import (
+    CancellationToken, JobCancelled, DeadlineExceeded, cancellation_scope, limit_timeout
+)
+from hameln_scraper.network.rate_limiter import RateLimiter
+
+NOVEL_TEXT = "彼はそう言った。だが、それは違うという事を彼女は知っていた。そして、しかし、ところが、物語は続いていく。"
+
+INDEX_HTML = """
+<html><head><title>テスト小説 - ハーメルン</title></head>
+<body>
+    <div class="ss"><span style="font-size:120%">テスト小説</span></div>
+    <a href="https://syosetu.org/user/1/">作者名</a>
+    <a href="./1.html">第一話</a>
+    <a href="./2.html">第二話</a>
+</body></html>
+"""
+
+CHAPTER_HTML = """
+<html><head><title>テスト小説 - 第{num}話 - ハーメルン</title></head>
+<body><div id="honbun"><p id="0">{text}</p></div></body></html>
+"""
+
+
+class TestCancellationToken(unittest.TestCase):
+    """CancellationTokenのテストクラス"""
+
+    def test_cancel_interrupts_sleep(self):
+        """キャンセルで待機中の sleep がすぐに中断される"""
+        token = CancellationToken()
+        threading.Timer(0.1, token.cancel).start()
+        start = time.monotonic()
+        with cancellation_scope(token):
+            with self.assertRaises(JobCancelled):
+                get_metrics().sleep(30, 'request_delay')
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_cancel_interrupts_rate_limit_wait(self):
+        """キャンセルでレートリミッタの待機も中断される"""
+        token = CancellationToken()
+        limiter = RateLimiter(30)
+        threading.Timer(0.1, token.cancel).start()
+        start = time.monotonic()
+        with cancellation_scope(token):
+            limiter.acquire()
+            with self.assertRaises(JobCancelled):
+                limiter.acquire()
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_deadline(self):
+        """期限を過ぎると DeadlineExceeded、タイムアウトは残り時間に制限される"""
+        token = CancellationToken(timeout=0.2)
+        with cancellation_scope(token):
+            self.assertLessEqual(limit_timeout(30), 0.2)
+            with self.assertRaises(DeadlineExceeded):
+                get_metrics().sleep(30, 'request_delay')
+
+    def test_not_swallowed_by_except_exception(self):
+        """except Exception では握りつぶされない"""
+        token = CancellationToken()
+        token.cancel()
+        with self.assertRaises(JobCancelled):
+            try:
+                token.check()
+            except Exception:
+                pass
+
+
+class TestScraperCancellation(unittest.TestCase):
+    """スクレイパーのキャンセルのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.scraper = HamelnScraper(ScraperConfig(output_root=self.temp_dir, request_delay=30))
+        base = "https://syosetu.org/novel/1/"
+        pages = {
+            base: INDEX_HTML,
+            base + "1.html": CHAPTER_HTML.format(num=1, text=NOVEL_TEXT),
+            base + "2.html": CHAPTER_HTML.format(num=2, text=NOVEL_TEXT),
+        }
+        self.scraper.network_client.get_page = Mock(side_effect=lambda url, **kwargs: pages.get(url))
+
+    def tearDown(self):
+        self.scraper.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_cancel_during_request_delay_leaves_partial_manifest(self):
+        """章間の待機中に中断でき、保存済みの章がマニフェストに残る"""
+        threading.Timer(0.2, self.scraper.cancel).start()
+        start = time.monotonic()
+        with self.assertRaises(JobCancelled):
+            self.scraper.scrape_novel_text("https://syosetu.org/novel/1/")
+        self.assertLess(time.monotonic() - start, 2.0)
+
+        manifest_path = os.path.join(self.temp_dir, "テスト小説", "text", "manifest.json")
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertFalse(manifest['complete'])
+        self.assertEqual([c['ordinal'] for c in manifest['chapters']], [1])
+
+    def test_job_timeout(self):
+        """job_timeout を過ぎると DeadlineExceeded で中断される"""
+        self.scraper.config.job_timeout = 0.2
+        with self.assertRaises(DeadlineExceeded):
+            self.scraper.scrape_novel_text("https://syosetu.org/novel/1/")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+取得失敗の分類とサーキットブレーカーのテストケース
+"""
+import unittest
+import threading
+from unittest.mock import Mock, patch
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.metrics import get_metrics
+from hameln_scraper.core.job_control import CancellationToken, JobCancelled, cancellation_scope
+from hameln_scraper.network.client import NetworkClient
+from hameln_scraper.network.failures import (
+    FailureKind, FetchFailure, CircuitBreaker, CircuitOpenError, classify_response
+)
+
+
+def response(status, content=b'<html><body>ok</body></html>', headers=None):
+    return Mock(status_code=status, content=content, headers=headers or {}, text=content.decode())
+
+
+class TestClassifyResponse(unittest.TestCase):
+    """classify_responseのテストクラス"""
+
+    def test_kinds(self):
+        """ステータスと内容から失敗の種類を判定する"""
+        self.assertIsNone(classify_response(response(200)))
+        self.assertEqual(classify_response(response(404)).kind, FailureKind.PERMANENT)
+        self.assertEqual(classify_response(response(403)).kind, FailureKind.CHALLENGE)
+        self.assertEqual(classify_response(response(503)).kind, FailureKind.TRANSIENT)
+        self.assertEqual(classify_response(response(200, b'  ')).kind, FailureKind.INVALID)
+        challenge = b'<html><title>Just a moment...</title></html>'
+        self.assertEqual(classify_response(response(503, challenge)).kind, FailureKind.CHALLENGE)
+
+        limited = classify_response(response(429, headers={'Retry-After': '12'}))
+        self.assertEqual(limited.kind, FailureKind.RATE_LIMITED)
+        self.assertEqual(limited.retry_after, 12.0)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """CircuitBreakerのテストクラス"""
+
+    def test_opens_after_threshold_and_half_opens(self):
+        """連続失敗で開き、時間経過後は1件だけ試行を許可する"""
+        breaker = CircuitBreaker('syosetu.org', threshold=2, cooldown=10)
+        failure = FetchFailure(FailureKind.TRANSIENT, "HTTP 503", 503)
+        self.assertFalse(breaker.record_failure(failure))
+        self.assertTrue(breaker.record_failure(failure))
+        self.assertGreater(breaker.retry_in(), 9)
+
+        with patch('hameln_scraper.network.failures.time.monotonic', return_value=breaker._open_until):
+            self.assertEqual(breaker.retry_in(), 0.0)
+            self.assertEqual(breaker.retry_in(), 1.0)
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_permanent_failures_do_not_count(self):
+        """404 はホスト障害とみなさない"""
+        breaker = CircuitBreaker('syosetu.org', threshold=1)
+        self.assertFalse(breaker.record_failure(FetchFailure(FailureKind.PERMANENT, "404", 404)))
+        self.assertEqual(breaker.retry_in(), 0.0)
+
+
+class TestNetworkClientFailures(unittest.TestCase):
+    """NetworkClientの失敗処理のテストクラス"""
+
+    def setUp(self):
+        get_metrics().reset()
+        self.client = NetworkClient(ScraperConfig(
+            request_delay=0, circuit_failure_threshold=2, circuit_cooldown=300, circuit_max_wait=0
+        ))
+
+    def test_permanent_failure_is_not_retried(self):
+        """リトライ対象外の失敗は1回で諦める"""
+        self.client.cloudscraper.get = Mock(return_value=response(404))
+        self.assertIsNone(self.client.get_page("https://syosetu.org/novel/1/9.html"))
+        self.assertEqual(self.client.cloudscraper.get.call_count, 1)
+
+    def test_open_circuit_fails_fast(self):
+        """ブレーカーが開いた後は同じホストへの取得を即座に失敗させる"""
+        self.client.cloudscraper.get = Mock(return_value=response(503))
+        with patch('hameln_scraper.core.metrics.time.sleep'):
+            with self.assertRaises(CircuitOpenError):
+                self.client.get_page("https://syosetu.org/novel/1/1.html")
+            with self.assertRaises(CircuitOpenError) as ctx:
+                self.client.get_page("https://syosetu.org/novel/1/2.html")
+        self.assertEqual(ctx.exception.host, 'syosetu.org')
+        self.assertEqual(self.client.cloudscraper.get.call_count, 2)
+
+    def test_rate_limit_waits_retry_after(self):
+        """429 は Retry-After の秒数だけ待ってからリトライする"""
+        self.client.config.circuit_max_wait = 60
+        self.client.cloudscraper.get = Mock(side_effect=[
+            response(429, headers={'Retry-After': '0.2'}),
+            response(200),
+        ])
+        with patch('hameln_scraper.core.metrics.time.sleep') as sleep:
+            html = self.client.get_page("https://syosetu.org/novel/1/")
+        self.assertIn('ok', html)
+        self.assertAlmostEqual(sleep.call_args_list[0].args[0], 0.2, places=1)
+
+    def _half_open(self):
+        """ブレーカーを開き、冷却期間の経過後（半開）の状態にする"""
+        breaker = self.client.circuit_breakers.for_url("https://syosetu.org/")
+        failure = FetchFailure(FailureKind.TRANSIENT, "HTTP 503", 503)
+        breaker.record_failure(failure)
+        breaker.record_failure(failure)
+        breaker._open_until = 0.0
+        return breaker
+
+    def test_cancel_during_half_open_trial_releases_slot(self):
+        """半開の試行中にキャンセルされても試行枠は返され、次の取得が待たされない"""
+        breaker = self._half_open()
+        token = CancellationToken()
+        self.client.rate_limiter = Mock()
+        self.client.rate_limiter.acquire.side_effect = lambda: token.cancel() or token.check()
+
+        with cancellation_scope(token):
+            with self.assertRaises(JobCancelled):
+                self.client.get_page("https://syosetu.org/novel/1/")
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(breaker.retry_in(), 0.0)
+
+    def test_unexpected_error_during_trial_releases_slot(self):
+        """分類されない例外で試行が終わっても試行枠は返される"""
+        breaker = self._half_open()
+        self.client.config.retry_count = 1
+        self.client.cloudscraper.get = Mock(return_value=response(200))
+        with patch.object(self.client, '_get_with_cloudscraper', side_effect=RuntimeError('想定外')):
+            self.assertIsNone(self.client.get_page("https://syosetu.org/novel/1/"))
+        self.assertEqual(breaker.retry_in(), 0.0)
+
+    def test_conditional_request_cancel_releases_slot(self):
+        """条件付きリクエストでも試行枠は返される"""
+        breaker = self._half_open()
+        self.client.rate_limiter = Mock()
+        self.client.rate_limiter.acquire.side_effect = JobCancelled()
+        with self.assertRaises(JobCancelled):
+            self.client.get_page_if_modified("https://syosetu.org/novel/1/", etag='"v1"')
+        self.assertEqual(breaker.retry_in(), 0.0)
+
+    def test_trial_slot_held_by_other_thread_is_kept(self):
+        """他のスレッドの試行枠は release_trial() で返さない"""
+        breaker = self._half_open()
+        self.assertEqual(breaker.retry_in(), 0.0)
+        thread = threading.Thread(target=breaker.release_trial)
+        thread.start()
+        thread.join()
+        self.assertEqual(breaker.retry_in(), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
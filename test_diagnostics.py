@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+ページ診断のテストケース
+"""
+import unittest
+from unittest.mock import Mock
+import tempfile
+import shutil
+import sys
+import os
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.diagnostics import PageDiagnostics, quick_signals, analyze_structure
+from hameln_scraper.network.client import NetworkClient
+
+
+class TestQuickSignals(unittest.TestCase):
+    """quick_signalsのテストクラス"""
+
+    def test_signals_from_raw_bytes(self):
+        """生のバイト列からタイトル・長さ・チャレンジを求める"""
+        body = "<html><head><title>\n 小説 - ハーメルン </title></head><body>本文</body></html>".encode('utf-8')
+        signals = quick_signals(body)
+        self.assertEqual(signals['title'], "小説 - ハーメルン")
+        self.assertEqual(signals['length'], len(body))
+        self.assertFalse(signals['challenge'])
+        self.assertTrue(quick_signals(b'<title>Just a moment...</title>')['challenge'])
+        self.assertTrue(quick_signals('<title>404 Not Found</title>')['error_title'])
+
+    def test_analyze_structure(self):
+        """構造解析は要素数と本文の有無を返す"""
+        soup = BeautifulSoup('<div class="ss"><h1>t</h1><div id="honbun"><p>a</p></div></div>', 'html.parser')
+        result = analyze_structure(soup)
+        self.assertEqual(result['tags'], {'div': 2, 'h1': 1, 'p': 1})
+        self.assertEqual(result['classes'], {'ss': 1})
+        self.assertTrue(result['honbun'])
+
+
+class TestPageDiagnostics(unittest.TestCase):
+    """PageDiagnosticsのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = ScraperConfig(debug_capture_dir=self.temp_dir, debug_capture_max_files=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_success_is_not_captured_without_sampling(self):
+        """既定（サンプル率0）では取得成功時に保存しない"""
+        PageDiagnostics(self.config).observe("https://syosetu.org/novel/1/", b"<title>t</title>")
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_failure_capture_rotates(self):
+        """検証失敗時は生データを保存し、上限を超えると古いものから削除する"""
+        diagnostics = PageDiagnostics(self.config)
+        paths = [diagnostics.report_failure(f"https://syosetu.org/novel/1/{i}.html", b"raw", 'no_body')
+                 for i in range(5)]
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), sorted(os.path.basename(p) for p in paths[2:]))
+        with open(paths[-1], 'rb') as f:
+            self.assertEqual(f.read(), b"raw")
+
+    def test_sampled_success_is_captured(self):
+        """サンプル対象の取得成功は保存する"""
+        self.config.diagnostics_sample_rate = 1.0
+        PageDiagnostics(self.config).observe("https://syosetu.org/novel/1/", b"<title>t</title>")
+        self.assertEqual(len(os.listdir(self.temp_dir)), 1)
+
+    def test_challenge_response_is_captured_by_client(self):
+        """チャレンジページを受信した場合はクライアントが生データを保存する"""
+        client = NetworkClient(ScraperConfig(request_delay=0, retry_count=1, debug_capture_dir=self.temp_dir))
+        client.cloudscraper.get = Mock(return_value=Mock(
+            status_code=403, content=b'<title>Just a moment...</title>', headers={}
+        ))
+        self.assertIsNone(client.get_page("https://syosetu.org/novel/1/"))
+        names = os.listdir(self.temp_dir)
+        self.assertEqual(len(names), 1)
+        self.assertIn('_challenge_syosetu_org_novel_1', names[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
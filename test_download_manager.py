@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+並行ダウンロード管理のテストケース
+"""
+import unittest
+from unittest.mock import Mock, patch
+import threading
+import tempfile
+import shutil
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.download_manager import DownloadManager, DownloadJob
+from hameln_scraper.network.rate_limiter import RateLimiter
+
+NOVEL_TEXT = "彼はそう言った。だが、それは違うという事を彼女は知っていた。そして、しかし、ところが、物語は続いていく。"
+
+INDEX_HTML = """
+<html><head><title>小説{nid} - ハーメルン</title></head>
+<body>
+    <div class="ss"><span style="font-size:120%">小説{nid}</span></div>
+    <a href="https://syosetu.org/user/1/">作者名</a>
+    <a href="./1.html">第一話</a>
+    <a href="./2.html">第二話</a>
+</body></html>
+"""
+
+CHAPTER_HTML = """
+<html><head><title>小説 - 第{num}話 - ハーメルン</title></head>
+<body><div id="honbun"><p id="0">{text}</p></div></body></html>
+"""
+
+
+def novel_pages(nid):
+    base = f"https://syosetu.org/novel/{nid}/"
+    return {
+        base: INDEX_HTML.format(nid=nid),
+        base + "1.html": CHAPTER_HTML.format(num=1, text=NOVEL_TEXT),
+        base + "2.html": CHAPTER_HTML.format(num=2, text=NOVEL_TEXT),
+    }
+
+
+class TestDownloadManager(unittest.TestCase):
+    """DownloadManagerのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        config = ScraperConfig(output_root=self.temp_dir, request_delay=0, min_request_interval=0)
+        self.manager = DownloadManager(config, max_concurrent=2)
+        self.pages = {**novel_pages(1), **novel_pages(2)}
+        self.manager.network_client.get_page = Mock(side_effect=lambda url, **kwargs: self.pages.get(url))
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_jobs_run_through_shared_client(self):
+        """複数ジョブが共有クライアントで取得され、ジョブごとに進捗が記録される"""
+        jobs = [self.manager.add(f"https://syosetu.org/novel/{nid}/", text_mode=True) for nid in (1, 2)]
+        self.manager.wait()
+
+        for job in jobs:
+            self.assertEqual(job.status, DownloadJob.COMPLETED)
+            self.assertEqual((job.done, job.total), (2, 2))
+            self.assertGreater(job.bytes, 0)
+            self.assertGreater(job.throughput(), 0)
+        self.assertEqual(self.manager.network_client.get_page.call_count, 6)
+
+    def test_cancel_takes_effect_between_requests(self):
+        """キャンセルは実行中のリクエスト完了後、次のリクエストの前に反映される"""
+        entered = threading.Event()
+        release = threading.Event()
+
+        def slow_get_page(url, **kwargs):
+            if url.endswith("1.html"):
+                entered.set()
+                release.wait(5)
+            return self.pages.get(url)
+        self.manager.network_client.get_page = Mock(side_effect=slow_get_page)
+
+        job = self.manager.add("https://syosetu.org/novel/1/", text_mode=True)
+        self.assertTrue(entered.wait(5))
+        self.manager.cancel(job.job_id)
+        release.set()
+        self.manager.wait()
+
+        self.assertEqual(job.status, DownloadJob.CANCELLED)
+        requested = [call.args[0] for call in self.manager.network_client.get_page.call_args_list]
+        self.assertNotIn("https://syosetu.org/novel/1/2.html", requested)
+
+    def test_paused_job_waits_for_resume(self):
+        """開始前に一時停止したジョブは再開まで開始せず、その間もワーカーを占有しない"""
+        self.manager.close()
+        self.manager = DownloadManager(
+            ScraperConfig(output_root=self.temp_dir, request_delay=0, min_request_interval=0), max_concurrent=1
+        )
+        self.pages.update(novel_pages(3))
+        entered = threading.Event()
+        release = threading.Event()
+
+        def get_page(url, **kwargs):
+            if url == "https://syosetu.org/novel/1/":
+                entered.set()
+                release.wait(5)
+            return self.pages.get(url)
+        self.manager.network_client.get_page = Mock(side_effect=get_page)
+
+        running = self.manager.add("https://syosetu.org/novel/1/", text_mode=True)
+        self.assertTrue(entered.wait(5))
+        paused = self.manager.add("https://syosetu.org/novel/2/", text_mode=True)
+        self.manager.pause(paused.job_id)
+        waiting = self.manager.add("https://syosetu.org/novel/3/", text_mode=True)
+        release.set()
+        self.manager.wait()
+
+        self.assertEqual(running.status, DownloadJob.COMPLETED)
+        self.assertEqual(waiting.status, DownloadJob.COMPLETED)
+        self.assertEqual(paused.status, DownloadJob.PAUSED)
+        requested = [call.args[0] for call in self.manager.network_client.get_page.call_args_list]
+        self.assertNotIn("https://syosetu.org/novel/2/", requested)
+
+        self.manager.resume(paused.job_id)
+        self.manager.wait()
+        self.assertEqual(paused.status, DownloadJob.COMPLETED)
+
+    def test_cancel_parked_job(self):
+        """保留中のジョブをキャンセルすると再開しても実行しない"""
+        self.manager.close()
+        self.manager = DownloadManager(
+            ScraperConfig(output_root=self.temp_dir, request_delay=0, min_request_interval=0), max_concurrent=1
+        )
+        self.manager.network_client.get_page = Mock(side_effect=lambda url, **kwargs: self.pages.get(url))
+        # ワーカーが取り出す前に一時停止したジョブ
+        job = DownloadJob(99, "https://syosetu.org/novel/1/", text_mode=True)
+        job.control.pause()
+        self.manager.jobs.append(job)
+        self.manager._queue.put(job)
+        self.manager.wait()
+        self.assertIn(job.job_id, self.manager._parked)
+
+        self.manager.cancel(job.job_id)
+        self.manager.resume(job.job_id)
+        self.manager.wait()
+        self.assertEqual(job.status, DownloadJob.CANCELLED)
+        self.manager.network_client.get_page.assert_not_called()
+
+
+class TestRateLimiter(unittest.TestCase):
+    """RateLimiterのテストクラス"""
+
+    def test_requests_are_spaced(self):
+        """連続したリクエストは最小間隔だけ待機する"""
+        limiter = RateLimiter(2.0)
+        with patch('hameln_scraper.core.metrics.time.sleep') as sleep:
+            limiter.acquire()
+            limiter.acquire()
+            limiter.acquire()
+        waits = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(waits), 2)
+        self.assertAlmostEqual(waits[0], 2.0, places=1)
+        self.assertAlmostEqual(waits[1], 4.0, places=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+EPUB出力機能のテストケース
+保存済みアーカイブからネットワークなしでEPUBを生成できることを確認
+"""
+import unittest
+import tempfile
+import zipfile
+import shutil
+import sys
+import os
+import xml.dom.minidom
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.output.epub_writer import EpubWriter
+from hameln_scraper.output.archive_reader import NovelArchive
+
+NOVEL_TEXT = "　彼はそう言った。だが、それは違うという事を彼女は知っていた。そして、しかし、ところが、物語は続いていく。"
+
+
+def saved_page(url, title, body):
+    return f"""<!DOCTYPE html>
+<html lang="ja"><!-- saved from url=({len(url):04d}){url} -->
+<head><title>{title}</title></head>
+<body>{body}</body>
+</html>"""
+
+
+class TestEpubWriter(unittest.TestCase):
+    """EPUB出力のテストクラス"""
+
+    def setUp(self):
+        """テスト用アーカイブを作成"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.novel_dir = os.path.join(self.temp_dir, "テスト小説")
+        os.makedirs(os.path.join(self.novel_dir, "resources"))
+
+        with open(os.path.join(self.novel_dir, "resources", "pic.png"), 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n' + b'0' * 32)
+
+        index_body = """
+            <div class="ss"><a href="テスト小説 - 第二話 - ハーメルン.html">第二話</a></div>
+            <div class="ss"><a href="テスト小説 - 第一話 - ハーメルン.html">第一話</a></div>
+        """
+        pages = {
+            "テスト小説 - 目次.html": saved_page("https://syosetu.org/novel/123456/", "テスト小説 - ハーメルン", index_body),
+            # 目次では2話→1話の順に並べ、ファイル名順ではなく目次順になることを確認する
+            "テスト小説 - 第一話 - ハーメルン.html": saved_page(
+                "https://syosetu.org/novel/123456/2.html", "テスト小説 - 第一話 - ハーメルン",
+                f'<div id="honbun"><p id="0">{NOVEL_TEXT}</p><img src="./resources/pic.png"></div>'),
+            "テスト小説 - 第二話 - ハーメルン.html": saved_page(
+                "https://syosetu.org/novel/123456/1.html", "テスト小説 - 第二話 - ハーメルン",
+                f'<div id="honbun"><p id="0">{NOVEL_TEXT}<br>&amp;</p><img src="./resources/pic.png"></div>'),
+        }
+        for name, html in pages.items():
+            with open(os.path.join(self.novel_dir, name), 'w', encoding='utf-8-sig') as f:
+                f.write(html)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_chapter_order_follows_index(self):
+        """目次ページのリンク順で章が並ぶ"""
+        writer = EpubWriter(workers=1)
+        chapters = NovelArchive(self.novel_dir).chapter_files(writer.novel_processor)
+        urls = [url for url, _ in chapters]
+        self.assertEqual(urls, [
+            "https://syosetu.org/novel/123456/1.html",
+            "https://syosetu.org/novel/123456/2.html",
+        ])
+
+    def test_export_structure(self):
+        """mimetypeが無圧縮で先頭にあり、XHTML/OPFが整形式である"""
+        output_path = EpubWriter(workers=1).export(self.novel_dir)
+
+        with zipfile.ZipFile(output_path) as zf:
+            first = zf.infolist()[0]
+            self.assertEqual(first.filename, 'mimetype')
+            self.assertEqual(first.compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.read('mimetype'), b'application/epub+zip')
+
+            names = zf.namelist()
+            self.assertIn('OEBPS/text/chapter_0001.xhtml', names)
+            self.assertIn('OEBPS/text/chapter_0002.xhtml', names)
+            for name in names:
+                if name.endswith(('.xhtml', '.opf')):
+                    xml.dom.minidom.parseString(zf.read(name))
+
+            chapter = zf.read('OEBPS/text/chapter_0001.xhtml').decode('utf-8')
+            self.assertIn('第二話', chapter)
+            self.assertIn('../images/', chapter)
+
+    def test_images_stored_once_per_hash(self):
+        """同一画像は1回だけ格納される"""
+        output_path = EpubWriter(workers=1).export(self.novel_dir)
+        with zipfile.ZipFile(output_path) as zf:
+            images = [name for name in zf.namelist() if name.startswith('OEBPS/images/')]
+        self.assertEqual(len(images), 1)
+
+    def test_parallel_export_matches_serial(self):
+        """並列変換でも章の内容と順序が同じ"""
+        serial = EpubWriter(workers=1).export(self.novel_dir, os.path.join(self.temp_dir, "serial.epub"))
+        parallel = EpubWriter(workers=2).export(self.novel_dir, os.path.join(self.temp_dir, "parallel.epub"))
+        with zipfile.ZipFile(serial) as a, zipfile.ZipFile(parallel) as b:
+            for name in ('OEBPS/text/chapter_0001.xhtml', 'OEBPS/text/chapter_0002.xhtml', 'OEBPS/nav.xhtml'):
+                self.assertEqual(a.read(name), b.read(name))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+パイプラインイベント（EventHooks）のテストケース
+"""
+import unittest
+import threading
+import tempfile
+import shutil
+import time
+from unittest.mock import Mock
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.events import EventHooks, Event, CHAPTER_SAVED, NOVEL_COMPLETED
+from hameln_scraper.core.scraper import HamelnScraper
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.metrics import get_metrics
+
+INDEX_HTML = """
+<html><head><title>テスト小説 - ハーメルン</title></head>
+<body>
+    <div class="ss"><span style="font-size:120%">テスト小説</span></div>
+    <a href="./1.html">第一話</a>
+    <a href="./2.html">第二話</a>
+</body></html>
+"""
+
+CHAPTER_HTML = """
+<html><head><title>テスト小説 - {title} - ハーメルン</title></head>
+<body><div id="honbun"><p>{title}。彼はそう言った。だが、それは違うという事を彼女は知っていた。そして、しかし、ところが、物語は続いていく。</p></div></body></html>
+"""
+
+
+class TestEventHooks(unittest.TestCase):
+    """ハンドラの登録と呼び出しのテストクラス"""
+
+    def setUp(self):
+        self.hooks = EventHooks(workers=2, queue_size=2)
+
+    def tearDown(self):
+        self.hooks.close()
+
+    def test_inline_handlers_run_in_order(self):
+        """その場で実行するハンドラは登録順に呼ばれ、データを受け取る"""
+        calls = []
+        self.hooks.on(CHAPTER_SAVED, lambda event: calls.append(('a', event)))
+
+        @self.hooks.on(CHAPTER_SAVED)
+        def second(event):
+            calls.append(('b', event))
+
+        self.hooks.emit(CHAPTER_SAVED, record='r')
+        self.assertEqual(calls, [('a', Event(CHAPTER_SAVED, {'record': 'r'})), ('b', Event(CHAPTER_SAVED, {'record': 'r'}))])
+
+    def test_handler_error_does_not_propagate(self):
+        """ハンドラの例外は記録され、後続のハンドラも呼ばれる"""
+        get_metrics().reset()
+        called = Mock()
+        self.hooks.on(CHAPTER_SAVED, Mock(side_effect=ValueError('失敗')))
+        self.hooks.on(CHAPTER_SAVED, called)
+
+        self.hooks.emit(CHAPTER_SAVED, record=None)
+        called.assert_called_once()
+        counters = get_metrics().snapshot()['counters']
+        self.assertIn({'name': 'event_handler_errors_total', 'labels': {'event': CHAPTER_SAVED}, 'value': 1}, counters)
+
+    def test_unknown_event_rejected(self):
+        with self.assertRaises(ValueError):
+            self.hooks.on('unknown', Mock())
+
+    def test_off_removes_handler(self):
+        handler = Mock()
+        self.hooks.on(CHAPTER_SAVED, handler)
+        self.hooks.off(CHAPTER_SAVED, handler)
+        self.hooks.emit(CHAPTER_SAVED, record=None)
+        handler.assert_not_called()
+        self.assertFalse(self.hooks.has_handlers(CHAPTER_SAVED))
+
+    def test_background_handlers_run_on_workers(self):
+        """background=True のハンドラはワーカースレッドで実行され、flush() で完了を待てる"""
+        threads = []
+
+        def handler(event):
+            time.sleep(0.01)
+            threads.append(threading.current_thread().name)
+
+        self.hooks.on(CHAPTER_SAVED, handler, background=True)
+        for _ in range(5):
+            self.hooks.emit(CHAPTER_SAVED, record=None)
+        self.hooks.flush()
+
+        self.assertEqual(len(threads), 5)
+        self.assertTrue(all(name.startswith('event-hook') for name in threads))
+
+    def test_background_without_workers_runs_inline(self):
+        hooks = EventHooks(workers=0)
+        threads = []
+        hooks.on(CHAPTER_SAVED, lambda event: threads.append(threading.current_thread()), background=True)
+        hooks.emit(CHAPTER_SAVED, record=None)
+        self.assertEqual(threads, [threading.current_thread()])
+
+
+class TestScraperEvents(unittest.TestCase):
+    """スクレイパーからのイベント発行のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        config = ScraperConfig(output_root=self.temp_dir, request_delay=0)
+        self.scraper = HamelnScraper(config)
+        pages = {
+            "https://syosetu.org/novel/123456/": INDEX_HTML,
+            "https://syosetu.org/novel/123456/1.html": CHAPTER_HTML.format(title="第一話"),
+            "https://syosetu.org/novel/123456/2.html": CHAPTER_HTML.format(title="第二話"),
+        }
+        self.scraper.network_client.get_page = Mock(side_effect=lambda url, **kwargs: pages.get(url))
+
+    def tearDown(self):
+        self.scraper.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_text_mode_emits_pipeline_events(self):
+        """各話の取得・保存の直後にイベントが発行され、最後に novel_completed が発行される"""
+        events = []
+        for name in ('chapter_fetched', 'chapter_saved', 'novel_completed'):
+            self.scraper.on(name, events.append)
+
+        result = self.scraper.scrape_novel_text("https://syosetu.org/novel/123456/")
+
+        self.assertTrue(result["success"])
+        self.assertEqual([event.name for event in events], [
+            'chapter_fetched', 'chapter_saved', 'chapter_fetched', 'chapter_saved', 'novel_completed'
+        ])
+        saved = events[1].data['record']
+        self.assertEqual(saved.title, "第一話")
+        self.assertTrue(os.path.exists(saved.path))
+        completed = events[-1].data
+        self.assertEqual(completed['chapters'], 2)
+        self.assertEqual(completed['manifest'], result['manifest'])
+
+    def test_novel_completed_waits_for_background_handlers(self):
+        """novel_completed はワーカーで実行中の各話のハンドラが終わってから発行される"""
+        finished = []
+
+        def slow(event):
+            time.sleep(0.02)
+            finished.append(event.data['record'].ordinal)
+
+        self.scraper.on(CHAPTER_SAVED, slow, background=True)
+        seen_at_completion = []
+        self.scraper.on(NOVEL_COMPLETED, lambda event: seen_at_completion.extend(finished))
+
+        self.scraper.scrape_novel_text("https://syosetu.org/novel/123456/")
+        self.assertEqual(sorted(seen_at_completion), [1, 2])
+
+    def test_iter_chapters_completion_only_when_exhausted(self):
+        """iter_chapters を途中で止めた場合は novel_completed を発行しない"""
+        completed = Mock()
+        self.scraper.on(NOVEL_COMPLETED, completed)
+
+        for record in self.scraper.iter_chapters("https://syosetu.org/novel/123456/"):
+            break
+        completed.assert_not_called()
+
+        list(self.scraper.iter_chapters("https://syosetu.org/novel/123456/"))
+        completed.assert_called_once()
+        self.assertEqual(completed.call_args.args[0].data['chapters'], 2)
+
+    def test_comments_page_saved(self):
+        """感想ページの保存後に comments_page_saved が発行される"""
+        comments_url = "https://syosetu.org/?mode=review&nid=123456"
+        html = "<html><head><title>感想</title></head><body><div class='review-item'>感想</div></body></html>"
+        self.scraper.network_client.get_page = Mock(return_value=html)
+        self.scraper.resource_processor.process_html_resources = Mock()
+        saved = []
+        self.scraper.on('comments_page_saved', saved.append)
+
+        path = self.scraper.save_comments_page(comments_url, self.temp_dir, "テスト小説")
+
+        self.assertEqual(len(saved), 1)
+        self.assertEqual(saved[0].data['path'], path)
+        self.assertEqual((saved[0].data['page'], saved[0].data['total']), (1, 1))
+        self.assertEqual(saved[0].data['html'], html)
+
+    def test_resource_saved(self):
+        """リソースの保存後に resource_saved が発行される"""
+        self.scraper.config.enable_resource_library = False
+        self.scraper.network_client.fetch_bytes = Mock(return_value=b'\x89PNG')
+        saved = []
+        self.scraper.on('resource_saved', saved.append)
+
+        filename = self.scraper.resource_processor.download_resource(
+            "https://syosetu.org/img/a.png", os.path.join(self.temp_dir, 'resources')
+        )
+
+        self.assertEqual(filename, 'a.png')
+        self.assertEqual(saved[0].data['kind'], 'binary')
+        self.assertEqual(saved[0].data['path'], os.path.join(self.temp_dir, 'resources', 'a.png'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+位置指定によるHTML書き換えのテストケース
+"""
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.output.html_patcher import HtmlPatcher
+from hameln_scraper.output.file_manager import FileManager
+
+
+SOURCE = (
+    '<!DOCTYPE html>\r\n<HTML lang=ja>\r\n<head>\r\n<title>第一話 &amp; 序章</title>\r\n'
+    "<link rel='stylesheet' href='/css/style.css'>\r\n</head>\r\n<body>\r\n"
+    '<A  class="nav"\r\n   HREF=/novel/123456/>目次</A>\r\n'
+    '<a href="./2.html?a=1&amp;b=2" >次の話 &gt;&gt;</a>\r\n'
+    '<img src=//img.syosetu.org/a.png alt="挿絵">\r\n'
+    '<div id="honbun"><div><p>本文　<br/>&nbsp;</p></div></div>\r\n'
+    '<a name="top">上へ</a>\r\n</body>\r\n</HTML>\r\n'
+)
+
+
+class TestHtmlPatcher(unittest.TestCase):
+    """HtmlPatcherのテストクラス"""
+
+    def test_unchanged_source_is_identical(self):
+        """変更しなければ元の文字列をそのまま返す"""
+        patcher = HtmlPatcher(SOURCE, tags={'a', 'img', 'link'})
+        self.assertEqual(patcher.result(), SOURCE)
+        self.assertEqual([ref.text.strip() for ref in patcher.elements if ref.name == 'a'],
+                         ['目次', '次の話 >>', '上へ'])
+
+    def test_only_edited_values_change(self):
+        """置換した属性値以外（改行・大文字・引用符・実体参照）は元のまま"""
+        patcher = HtmlPatcher(SOURCE, tags={'a', 'img'})
+        links = [ref for ref in patcher.elements if ref.name == 'a']
+        self.assertEqual(links[0].get('href'), '/novel/123456/')
+        self.assertEqual(links[1].get('href'), './2.html?a=1&b=2')
+        patcher.set_attribute(links[0], 'href', '目次.html')
+        patcher.set_attribute(links[1], 'href', '第二話.html?x=1&y=2')
+        patcher.set_attribute(links[2], 'href', '#top')
+
+        expected = (
+            SOURCE.replace('HREF=/novel/123456/>', 'HREF="目次.html">')
+            .replace('"./2.html?a=1&amp;b=2"', '"第二話.html?x=1&amp;y=2"')
+            .replace('<a name="top">', '<a name="top" href="#top">')
+        )
+        self.assertEqual(patcher.result(), expected)
+
+    def test_body_span(self):
+        """入れ子のdivを含む本文の範囲を元のHTMLのまま取り出す"""
+        patcher = HtmlPatcher(SOURCE)
+        self.assertEqual(patcher.body_html(), '<div id="honbun"><div><p>本文　<br/>&nbsp;</p></div></div>')
+
+
+class TestFileManagerPatch(unittest.TestCase):
+    """FileManagerの位置指定保存のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_manager = FileManager(ScraperConfig())
+
+    def tearDown(self):
+        self.file_manager.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _read(self, path):
+        self.file_manager.flush()
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            return f.read()
+
+    def test_save_raw_page(self):
+        """生のHTMLはリンクの絶対化とメタ情報の挿入以外は元のまま保存される"""
+        page_url = "https://syosetu.org/novel/123456/1.html"
+        path = self.file_manager.save_complete_page(SOURCE, page_url, "第一話", self.temp_dir, page_url)
+        saved = self._read(path)
+
+        self.assertIn('<HTML lang=ja><!-- saved from url=(0039)https://syosetu.org/novel/123456/1.html -->', saved)
+        self.assertIn('HREF="https://syosetu.org/novel/123456/">目次</A>', saved)
+        self.assertIn('href="https://syosetu.org/novel/123456/2.html?a=1&amp;b=2" >', saved)
+        self.assertIn("href='https://syosetu.org/css/style.css'", saved)
+        self.assertIn('src="https://img.syosetu.org/a.png"', saved)
+        self.assertIn(f'<meta name="source-url" content="{page_url}"/></head>', saved)
+        self.assertIn('<title>第一話 &amp; 序章</title>\r\n', saved)
+
+        # 同じ内容の再保存は書き込みを省略する
+        os.remove(path)
+        self.file_manager.save_complete_page(SOURCE, page_url, "第一話", self.temp_dir, page_url)
+        self.file_manager.flush()
+        self.assertTrue(os.path.exists(path))
+        os.utime(path, (0, 0))
+        self.file_manager.save_complete_page(SOURCE, page_url, "第一話", self.temp_dir, page_url)
+        self.file_manager.flush()
+        self.assertEqual(os.path.getmtime(path), 0)
+
+    def test_patch_links_writes_only_when_changed(self):
+        """リンクが変わらなければファイルを書き換えない"""
+        path = os.path.join(self.temp_dir, "page.html")
+        self.file_manager.write_html(path, SOURCE)
+        self.file_manager.flush()
+
+        self.assertFalse(self.file_manager.patch_links(path, lambda href, text: None))
+        self.assertTrue(self.file_manager.patch_links(
+            path, lambda href, text: '目次.html' if text == '目次' else None
+        ))
+        self.assertEqual(self._read(path), SOURCE.replace('HREF=/novel/123456/>', 'HREF="目次.html">'))
+
+
+if __name__ == '__main__':
+    unittest.main()
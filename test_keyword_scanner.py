@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+キーワード一括走査によるページ判定のテストケース
+"""
+import unittest
+from unittest.mock import Mock
+import sys
+import os
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.parsing.keyword_scanner import PageVerdict, scan_page, scan_title
+from hameln_scraper.parsing.validator import PageValidator
+from hameln_scraper.network.failures import FailureKind, classify_response
+
+NOVEL_TEXT = "彼はそう言った。だが、それは違うという事を彼女は知っていた。そして、しかし、ところが、物語は続いていく。" * 3
+
+
+def page(title, head="", body=NOVEL_TEXT):
+    return f"<html><head>{head}<title>{title}</title></head><body>{body}</body></html>"
+
+
+class TestScanPage(unittest.TestCase):
+    """scan_pageのテストクラス"""
+
+    def test_verdicts(self):
+        """<head> とタイトルのキーワードから判定する"""
+        self.assertEqual(scan_page(page("小説 - ハーメルン")), PageVerdict(PageVerdict.OK, None))
+        self.assertEqual(scan_page(page("Just a moment...")).kind, PageVerdict.CHALLENGE)
+        self.assertEqual(scan_page(page("t", '<script src="/cdn-cgi/challenge-platform/x.js"></script>')).kind,
+                         PageVerdict.CHALLENGE)
+        self.assertEqual(scan_page(page("404 Not Found")).kind, PageVerdict.NOT_FOUND)
+        self.assertEqual(scan_page(page("ハーメルン - メンテナンス中").encode('utf-8')).kind, PageVerdict.MAINTENANCE)
+        self.assertEqual(scan_page(b"  \n").kind, PageVerdict.EMPTY)
+
+    def test_body_keywords_are_ignored(self):
+        """本文中の語（404・Not Found・challenge 等）では判定しない"""
+        body = NOVEL_TEXT + "彼は「404 Not Found」と呟いた。cf-chl advertisement メンテナンス中"
+        self.assertTrue(scan_page(page("小説 - ハーメルン", body=body)).ok)
+        self.assertTrue(scan_page(page("第404話 - ハーメルン")).ok)
+
+    def test_chapter_titles_are_not_error_titles(self):
+        """話・作品名にエラーの語を含むサイトのページは有効（<head> のキーワードでは判定する）"""
+        for title in ("Just a moment - 僕の物語 - ハーメルン", "Access Denied ～禁断の書庫～ - ハーメルン",
+                      "第1話 Not Found - 404 Not Found - ハーメルン"):
+            self.assertTrue(scan_page(page(title)).ok, title)
+            self.assertTrue(scan_title(title).ok, title)
+            self.assertIsNone(classify_response(Mock(status_code=200, content=page(title).encode('utf-8'), headers={})))
+        self.assertEqual(scan_page(page("Just a moment - ハーメルン", '<meta name="cf_chl_opt">')).kind,
+                         PageVerdict.CHALLENGE)
+
+
+class TestValidatorVerdicts(unittest.TestCase):
+    """PageValidatorと取得失敗の分類のテストクラス"""
+
+    def test_validate_page_ignores_body_keywords(self):
+        """本文に「404」「advertisement」を含む小説ページも有効"""
+        html = page("小説 - ハーメルン", body=NOVEL_TEXT + " 404 advertisement")
+        self.assertTrue(PageValidator().validate_page(BeautifulSoup(html, 'html.parser'), "https://syosetu.org/novel/1/"))
+
+    def test_verdict_drives_failure_kind(self):
+        """200で返ったエラーページは判定に応じた失敗の種類になる"""
+        def response(html):
+            return Mock(status_code=200, content=html.encode('utf-8'), headers={})
+        self.assertIsNone(classify_response(response(page("小説 - ハーメルン"))))
+        self.assertEqual(classify_response(response(page("Not Found"))).kind, FailureKind.PERMANENT)
+        self.assertEqual(classify_response(response(page("メンテナンス中"))).kind, FailureKind.TRANSIENT)
+        self.assertEqual(classify_response(response(page("Just a moment..."))).kind, FailureKind.CHALLENGE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+ナビゲーションリンク解決のテストケース
+"""
+import unittest
+import sys
+import os
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.output.file_manager import FileManager
+from hameln_scraper.output.link_resolver import LinkResolver
+
+
+NOVEL = "https://syosetu.org/novel/123456/"
+MAPPING = {f"{NOVEL}{n}.html": f"第{n}話.html" for n in (1, 2, 10, 100)}
+
+
+class TestLinkResolver(unittest.TestCase):
+    """LinkResolverのテストクラス"""
+
+    def setUp(self):
+        self.resolver = LinkResolver(
+            "https://syosetu.org", MAPPING, index_filename="目次.html",
+            info_file_name="小説情報.html", comments_file_name="感想.html"
+        )
+
+    def test_chapter_numbers_are_exact(self):
+        """相対・絶対・プロトコル相対のどの書き方でも話番号が完全一致で解決される"""
+        current = f"{NOVEL}2.html"
+        self.assertEqual(self.resolver.resolve("./1.html", "<< 前の話", current), "第1話.html")
+        self.assertEqual(self.resolver.resolve("./10.html", "", current), "第10話.html")
+        self.assertEqual(self.resolver.resolve("/novel/123456/100.html", "", current), "第100話.html")
+        self.assertEqual(self.resolver.resolve("//syosetu.org/novel/123456/2.html#top", "", current), "第2話.html")
+        self.assertIsNone(self.resolver.resolve("./3.html", "次の話 >>", current))
+        self.assertIsNone(self.resolver.resolve("/novel/999/1.html", "", current))
+
+    def test_special_pages_and_link_text(self):
+        """目次・小説情報・感想はURLとリンクテキストの両方で解決される"""
+        self.assertEqual(self.resolver.resolve(NOVEL, ""), "目次.html")
+        self.assertEqual(self.resolver.resolve("https://syosetu.org/?nid=123456&mode=ss_detail", ""), "小説情報.html")
+        self.assertEqual(self.resolver.resolve("https://syosetu.org/?mode=review&nid=123456", ""), "感想.html")
+        self.assertEqual(self.resolver.resolve("./1.html", "目次", f"{NOVEL}2.html"), "目次.html")
+        self.assertIsNone(self.resolver.resolve("https://example.com/novel/123456/1.html", ""))
+
+    def test_mode_pages_and_relative_without_current(self):
+        """(mode, page) で感想の各ページを区別し、現在ページ不明でも1作品分なら相対リンクを解決する"""
+        self.resolver.add("https://syosetu.org/?mode=review&nid=123456&page=2", "感想 - ページ2.html")
+        self.assertEqual(
+            self.resolver.resolve("https://syosetu.org/?page=2&mode=review&nid=123456", ""), "感想 - ページ2.html"
+        )
+        self.assertEqual(self.resolver.resolve("./10.html", ""), "第10話.html")
+
+
+class TestFileManagerNavigation(unittest.TestCase):
+    """FileManagerのナビゲーションリンク修正のテストクラス"""
+
+    def test_fix_local_navigation_links_with_shared_resolver(self):
+        """作成済みの LinkResolver を渡しても辞書を渡しても同じ結果になる"""
+        file_manager = FileManager(ScraperConfig())
+        resolver = file_manager.link_resolver(MAPPING, "目次.html")
+        html = ('<a href="./1.html">前</a><a href="./10.html">次</a>'
+                '<a href="https://syosetu.org/novel/123456/">戻る</a>')
+        for mapping in (resolver, MAPPING):
+            soup = BeautifulSoup(html, 'html.parser')
+            file_manager.fix_local_navigation_links(soup, mapping, f"{NOVEL}2.html", "目次.html")
+            self.assertEqual([a['href'] for a in soup.find_all('a')], ["第1話.html", "第10話.html", "目次.html"])
+        file_manager.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
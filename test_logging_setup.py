@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+ログ設定のテストケース
+"""
+import unittest
+import tempfile
+import logging
+import shutil
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.logging_setup import configure_logging, shutdown_logging
+
+
+class CountingArg:
+    """文字列化された回数を数える引数"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return "arg"
+
+
+class TestConfigureLogging(unittest.TestCase):
+    """configure_loggingのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = logging.getLogger()
+        self.saved_handlers = self.root.handlers[:]
+        self.saved_level = self.root.level
+        self.root.handlers = []
+
+    def tearDown(self):
+        shutdown_logging()
+        self.root.handlers = self.saved_handlers
+        self.root.setLevel(self.saved_level)
+        shutil.rmtree(self.temp_dir)
+
+    def config(self, **kwargs):
+        return ScraperConfig(log_file=os.path.join(self.temp_dir, "scraper.log"), **kwargs)
+
+    def test_default_level_is_info(self):
+        """既定ではDEBUGメッセージを整形しない"""
+        configure_logging(self.config())
+        arg = CountingArg()
+        logging.getLogger("hameln_scraper.test").debug("リンク修正: %s", arg)
+        shutdown_logging()
+
+        self.assertEqual(self.root.level, logging.INFO)
+        self.assertEqual(arg.count, 0)
+
+    def test_json_output_with_extra_fields(self):
+        """JSON形式では extra= のフィールドも出力される"""
+        configure_logging(self.config(log_format='json'))
+        logging.getLogger("hameln_scraper.test").info("章保存: %s", "第一話", extra={'chapter': 1})
+        shutdown_logging()
+
+        with open(os.path.join(self.temp_dir, "scraper.log"), encoding='utf-8') as f:
+            entry = json.loads(f.readline())
+        self.assertEqual(entry['message'], "章保存: 第一話")
+        self.assertEqual(entry['level'], "INFO")
+        self.assertEqual(entry['chapter'], 1)
+
+    def test_rotation(self):
+        """サイズ上限でローテーションされる"""
+        configure_logging(self.config(log_max_bytes=1024, log_backup_count=2))
+        logger = logging.getLogger("hameln_scraper.test")
+        for i in range(200):
+            logger.warning("メッセージ %d", i)
+        shutdown_logging()
+
+        files = sorted(os.listdir(self.temp_dir))
+        self.assertEqual(files, ["scraper.log", "scraper.log.1", "scraper.log.2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
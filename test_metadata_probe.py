@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+メタデータ確認（小説情報ページの軽量解析・一括確認・キャッシュ）のテストケース
+"""
+import unittest
+import tempfile
+import shutil
+from unittest.mock import Mock
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.scraper import HamelnScraper
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.metrics import get_metrics
+from hameln_scraper.novel.metadata import parse_novel_metadata, detail_url, MetadataProbe
+
+DETAIL_HTML = """
+<html><head><title>小説情報 - ハーメルン</title></head>
+<body>
+<table class="table1">
+    <tr><td>タイトル</td><td><a href="https://syosetu.org/novel/{nid}/">テスト小説{nid}</a></td></tr>
+    <tr><td>小説ID</td><td>{nid}</td></tr>
+    <tr><td>作者</td><td><a href="https://syosetu.org/user/1/">作者名</a></td></tr>
+    <tr><td>あらすじ</td><td>あらすじ<br>二行目</td></tr>
+    <tr><td>話数</td><td>{status} {chapters}話</td></tr>
+    <tr><td>総文字数</td><td>123,456文字</td></tr>
+    <tr><td>初回投稿</td><td>2023年04月01日(土) 12:00</td></tr>
+    <tr><td>最新投稿</td><td>2024年01月05日(金) 18:05</td></tr>
+    <tr><td>最終更新日</td><td>2024年01月06日(土) 09:00</td></tr>
+</table>
+</body></html>
+"""
+
+
+def detail_page(nid, chapters=12, status="連載(連載中)"):
+    return DETAIL_HTML.format(nid=nid, chapters=chapters, status=status)
+
+
+class TestParseNovelMetadata(unittest.TestCase):
+    """小説情報ページの解析のテストクラス"""
+
+    def test_parse_fields(self):
+        metadata = parse_novel_metadata(detail_page('123456'), '123456')
+        self.assertEqual(metadata.title, "テスト小説123456")
+        self.assertEqual(metadata.author, "作者名")
+        self.assertEqual(metadata.chapters, 12)
+        self.assertEqual(metadata.status, 'ongoing')
+        self.assertFalse(metadata.complete)
+        self.assertEqual(metadata.last_update, "2024-01-05 18:05")
+        self.assertEqual(metadata.url, "https://syosetu.org/?mode=ss_detail&nid=123456")
+
+    def test_completion_status(self):
+        self.assertEqual(parse_novel_metadata(detail_page('1', 1234, "完結"), '1').status, 'completed')
+        self.assertEqual(parse_novel_metadata(detail_page('1', 1234, "完結"), '1').chapters, 1234)
+        short = parse_novel_metadata(detail_page('1', 1, "短編"), '1')
+        self.assertEqual(short.status, 'short')
+        self.assertTrue(short.complete)
+
+    def test_page_without_table(self):
+        self.assertIsNone(parse_novel_metadata("<html><body><p>エラー</p></body></html>", '1'))
+
+    def test_novel_id_from_url(self):
+        self.assertEqual(MetadataProbe.novel_id(123456), '123456')
+        self.assertEqual(MetadataProbe.novel_id("https://syosetu.org/novel/123456/7.html"), '123456')
+        self.assertEqual(MetadataProbe.novel_id(detail_url('42')), '42')
+        with self.assertRaises(ValueError):
+            MetadataProbe.novel_id("https://example.com/")
+
+
+class TestMetadataProbe(unittest.TestCase):
+    """一括確認とキャッシュのテストクラス"""
+
+    def setUp(self):
+        get_metrics().reset()
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = ScraperConfig(output_root=self.temp_dir, min_request_interval=0)
+        self.scraper = HamelnScraper(self.config)
+        self.requests = []
+        self.scraper.network_client.cloudscraper.get = self._get
+
+    def tearDown(self):
+        self.scraper.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        nid = url.rsplit('=', 1)[-1]
+        if nid == '999':
+            return Mock(status_code=404, content=b'', headers={})
+        if headers.get('If-None-Match') == f'"{nid}"':
+            return Mock(status_code=304, content=b'', headers={})
+        body = detail_page(nid)
+        return Mock(status_code=200, content=body.encode('utf-8'), text=body, headers={'ETag': f'"{nid}"'})
+
+    def test_batch_one_request_per_novel(self):
+        """1件につき小説情報ページへのリクエスト1回、失敗はNone"""
+        results = self.scraper.probe_metadata_many(['1', 'https://syosetu.org/novel/2/', '3', '999', '1'])
+
+        self.assertEqual(list(results), ['1', '2', '3', '999'])
+        self.assertEqual(results['2'].title, "テスト小説2")
+        self.assertIsNone(results['999'])
+        self.assertEqual(sorted(url for url, headers in self.requests), [
+            "https://syosetu.org/?mode=ss_detail&nid=1",
+            "https://syosetu.org/?mode=ss_detail&nid=2",
+            "https://syosetu.org/?mode=ss_detail&nid=3",
+            "https://syosetu.org/?mode=ss_detail&nid=999",
+        ])
+        self.assertIsNotNone(self.scraper.network_client.rate_limiter)
+
+    def test_cached_within_ttl(self):
+        """期限内はリクエストせずキャッシュを返す（次回の実行でも有効）"""
+        first = self.scraper.probe_metadata('5')
+        self.scraper.close()
+
+        self.scraper = HamelnScraper(self.config)
+        self.scraper.network_client.cloudscraper.get = self._get
+        self.requests.clear()
+        second = self.scraper.probe_metadata('5')
+
+        self.assertEqual(self.requests, [])
+        self.assertEqual(second, first)
+
+    def test_expired_entry_revalidated_with_etag(self):
+        """期限切れ・refresh 時は条件付きリクエストで確認し、304ならキャッシュを使う"""
+        first = self.scraper.probe_metadata('7')
+        self.requests.clear()
+
+        second = self.scraper.probe_metadata('7', refresh=True)
+
+        self.assertEqual(self.requests, [("https://syosetu.org/?mode=ss_detail&nid=7", {'If-None-Match': '"7"'})])
+        self.assertEqual(second.chapters, first.chapters)
+        counters = get_metrics().snapshot()['counters']
+        self.assertIn({'name': 'metadata_probes_total', 'labels': {'result': 'not_modified'}, 'value': 1}, counters)
+
+
+if __name__ == '__main__':
+    unittest.main()
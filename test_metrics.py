@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+計測モジュールのテストケース
+"""
+import unittest
+import tempfile
+import shutil
+import json
+import sys
+import os
+from unittest.mock import Mock, patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.metrics import MetricsRegistry, get_metrics
+from hameln_scraper.network.client import NetworkClient
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """MetricsRegistryのテストクラス"""
+
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+
+    def test_counter_and_histogram(self):
+        """ラベル別に集計される"""
+        self.metrics.inc('requests_total', backend='cloudscraper')
+        self.metrics.inc('requests_total', 2, backend='cloudscraper')
+        self.metrics.observe('request_seconds', 0.2, backend='cloudscraper')
+        self.metrics.observe('request_seconds', 0.4, backend='cloudscraper')
+
+        data = self.metrics.snapshot()
+        self.assertEqual(data['counters'][0]['value'], 3)
+        histogram = data['histograms'][0]
+        self.assertEqual(histogram['count'], 2)
+        self.assertAlmostEqual(histogram['sum'], 0.6)
+        self.assertEqual(histogram['max'], 0.4)
+
+    def test_sleep_is_recorded(self):
+        """待機時間が理由別に記録される"""
+        with patch('hameln_scraper.core.metrics.time.sleep') as sleep:
+            self.metrics.sleep(3.0, 'request_delay')
+        sleep.assert_called_once_with(3.0)
+        self.assertIn('sleep_seconds_total{reason="request_delay"}', self.metrics.summary())
+
+    def test_prometheus_export(self):
+        """Prometheusテキスト形式のバケットは累積値になる"""
+        self.metrics.observe('parse_seconds', 0.003, stage='chapter_content')
+        self.metrics.observe('parse_seconds', 0.2, stage='chapter_content')
+        text = self.metrics.to_prometheus()
+
+        self.assertIn('# TYPE hameln_parse_seconds histogram', text)
+        self.assertIn('hameln_parse_seconds_bucket{stage="chapter_content",le="0.005"} 1', text)
+        self.assertIn('hameln_parse_seconds_bucket{stage="chapter_content",le="+Inf"} 2', text)
+        self.assertIn('hameln_parse_seconds_count{stage="chapter_content"} 2', text)
+
+    def test_json_export(self):
+        """拡張子 .json ではJSONで出力される"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            self.metrics.inc('page_fetch_failures_total')
+            path = self.metrics.export(os.path.join(temp_dir, 'metrics.json'))
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.assertEqual(data['counters'][0]['name'], 'page_fetch_failures_total')
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestNetworkClientMetrics(unittest.TestCase):
+    """NetworkClientの計測のテストクラス"""
+
+    def test_get_page_records_attempts_and_backoff(self):
+        """試行ごとの時間・ステータスとリトライ待機が記録される"""
+        metrics = get_metrics()
+        metrics.reset()
+        client = NetworkClient(ScraperConfig(request_delay=0.5))
+        client.cloudscraper.get = Mock(side_effect=[
+            Mock(status_code=503, content=b''),
+            Mock(status_code=200, content=b'<html></html>', headers={}, text='<html></html>'),
+        ])
+
+        with patch('hameln_scraper.core.metrics.time.sleep'):
+            client.get_page("https://syosetu.org/novel/1/")
+
+        data = metrics.snapshot()
+        statuses = {h['labels']['status']: h['count'] for h in data['histograms']
+                    if h['name'] == 'http_request_seconds'}
+        self.assertEqual(statuses, {'503': 1, '200': 1})
+        sleeps = [c for c in data['counters'] if c['name'] == 'sleep_seconds_total']
+        self.assertEqual(sleeps[0]['labels'], {'reason': 'retry_backoff'})
+        self.assertEqual(sleeps[0]['value'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
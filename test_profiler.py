@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+段階別プロファイリングのテストケース
+保存済みアーカイブの再処理でネットワークなしにレポートを出力できることを確認
+"""
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.profiler import StageProfiler
+from hameln_scraper.core.scraper import HamelnScraper
+
+NOVEL_TEXT = "　彼はそう言った。だが、それは違うという事を彼女は知っていた。そして、しかし、ところが、物語は続いていく。"
+
+
+def saved_page(url, title, body):
+    return f"""<!DOCTYPE html>
+<html lang="ja"><!-- saved from url=({len(url):04d}){url} -->
+<head><title>{title}</title></head>
+<body>{body}</body>
+</html>"""
+
+
+def busy_parse():
+    return sorted(str(i) for i in range(20000))
+
+
+class TestStageProfiler(unittest.TestCase):
+    """StageProfilerのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_reports_per_stage(self):
+        """段階ごとの統計・collapsed stack・メモリ上位が出力される"""
+        profiler = StageProfiler(self.temp_dir, sample_interval=0.001)
+        for _ in range(5):
+            with profiler.stage('parse'):
+                busy_parse()
+            with profiler.stage('fetch'):
+                with profiler.stage('save'):
+                    pass
+        profiler.write_reports()
+
+        files = set(os.listdir(self.temp_dir))
+        self.assertTrue({'parse.prof', 'parse.txt', 'fetch.prof', 'profile.collapsed', 'memory_parse.txt'} <= files)
+        # 入れ子の段階は外側に計上される
+        self.assertNotIn('save.prof', files)
+
+        with open(os.path.join(self.temp_dir, 'parse.txt'), encoding='utf-8') as f:
+            self.assertIn('busy_parse', f.read())
+        with open(os.path.join(self.temp_dir, 'profile.collapsed'), encoding='utf-8') as f:
+            for line in f:
+                stack, count = line.rsplit(' ', 1)
+                self.assertIn(stack.split(';')[0], ('parse', 'fetch'))
+                self.assertGreater(int(count), 0)
+
+
+class TestProfileSavedNovel(unittest.TestCase):
+    """保存済みアーカイブの再処理のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.novel_dir = os.path.join(self.temp_dir, "テスト小説")
+        os.makedirs(self.novel_dir)
+        index_body = '<div class="ss"><a href="テスト小説 - 第一話 - ハーメルン.html">第一話</a></div>'
+        pages = {
+            "テスト小説 - 目次.html": saved_page("https://syosetu.org/novel/123456/", "テスト小説 - ハーメルン", index_body),
+            "テスト小説 - 第一話 - ハーメルン.html": saved_page(
+                "https://syosetu.org/novel/123456/1.html", "テスト小説 - 第一話 - ハーメルン",
+                f'<div id="honbun"><p id="0">{NOVEL_TEXT}</p></div>'),
+        }
+        for name, content in pages.items():
+            with open(os.path.join(self.novel_dir, name), 'w', encoding='utf-8-sig') as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_replay_writes_profile(self):
+        """アーカイブを再処理し、close() で解析・保存段階のレポートが出力される"""
+        profile_dir = os.path.join(self.temp_dir, "profile")
+        scraper = HamelnScraper(ScraperConfig(debug_mode=False))
+        scraper.enable_profiling(profile_dir)
+        count = scraper.profile_saved_novel(self.novel_dir, os.path.join(profile_dir, "replay"))
+        scraper.close()
+
+        self.assertEqual(count, 1)
+        files = set(os.listdir(profile_dir))
+        self.assertTrue({'read.prof', 'parse.prof', 'save.prof', 'memory_parse.txt', 'memory_save.txt'} <= files)
+        self.assertTrue(os.path.exists(os.path.join(profile_dir, "replay", "0001.html")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+共有リソースライブラリのテストケース
+"""
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+import errno
+import json
+import sys
+import os
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.network.client import NetworkClient
+from hameln_scraper.resources.library import ResourceLibrary
+from hameln_scraper.resources.processor import ResourceProcessor
+
+
+class TestResourceLibrary(unittest.TestCase):
+    """ResourceLibraryのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.library = ResourceLibrary(os.path.join(self.temp_dir, "library"))
+        os.makedirs(self.library.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_same_content_stored_once(self):
+        """同じ内容は1つのオブジェクトになり、URLキーの索引は再読み込み後も残る"""
+        first = self.library.put(b"body{}", "https://syosetu.org/css/a.css")
+        second = self.library.put(b"body{}", "https://syosetu.org/css/b.css")
+        self.assertEqual(first, second)
+        self.library.flush()
+
+        reloaded = ResourceLibrary(self.library.root)
+        self.assertEqual(reloaded.read("https://syosetu.org/css/b.css"), b"body{}")
+        self.assertIsNone(reloaded.path_for("https://syosetu.org/css/c.css"))
+
+    def test_relink_never_writes_through_existing_dest(self):
+        """別のオブジェクトへのリンクがある場所に配置しても、そのオブジェクトは変わらない"""
+        first = self.library.put(b"first")
+        second = self.library.put(b"second")
+        dest = os.path.join(self.temp_dir, "novel", "resources", "icon.png")
+        self.library.link(first, dest)
+
+        with patch('hameln_scraper.resources.library.os.link', side_effect=OSError(errno.EXDEV, "cross-device")):
+            self.assertEqual(self.library.link(second, dest), 'copy')
+        with open(first, 'rb') as f:
+            self.assertEqual(f.read(), b"first")
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), b"second")
+
+        self.assertEqual(self.library.link(first, dest), 'link')
+        self.assertTrue(os.path.samefile(first, dest))
+        self.assertEqual(os.listdir(os.path.dirname(dest)), ["icon.png"])
+
+    def test_unexpected_link_error_not_copied(self):
+        """リンクできない理由がファイルシステム以外のエラーはコピーで代替しない"""
+        source = self.library.put(b"PNG")
+        dest = os.path.join(self.temp_dir, "novel", "resources", "icon.png")
+        with patch('hameln_scraper.resources.library.os.link', side_effect=FileExistsError(errno.EEXIST, "exists")):
+            with self.assertRaises(FileExistsError):
+                self.library.link(source, dest)
+        self.assertFalse(os.path.exists(dest))
+
+    def test_index_written_only_on_flush(self):
+        """索引は登録のたびではなく flush() でまとめて1回書き込む"""
+        with patch('hameln_scraper.resources.library.json.dump', wraps=json.dump) as dump:
+            for name in ("a", "b", "c"):
+                self.library.put(name.encode(), f"https://syosetu.org/img/{name}.png")
+            self.assertFalse(os.path.exists(self.library.index_path))
+            self.library.flush()
+            self.library.flush()
+        self.assertEqual(dump.call_count, 1)
+        self.assertEqual(ResourceLibrary(self.library.root).read("https://syosetu.org/img/c.png"), b"c")
+
+    def test_lookup_expires(self):
+        """期限を過ぎた登録は fresh=False になり、検証子を返す"""
+        key = "https://syosetu.org/css/a.css"
+        self.library.put(b"body{}", key, etag='"v1"')
+        self.assertTrue(self.library.lookup(key, 3600).fresh)
+        entry = self.library.lookup(key, 0)
+        self.assertFalse(entry.fresh)
+        self.assertEqual(entry.etag, '"v1"')
+
+    def test_legacy_index_loaded_as_expired(self):
+        """旧形式の索引（URLキー -> ハッシュ）は読み込めて、次の参照時に確認する"""
+        path = self.library.put(b"PNG")
+        with open(self.library.index_path, 'w', encoding='utf-8') as f:
+            json.dump({"https://syosetu.org/img/a.png": os.path.basename(path)}, f)
+        entry = ResourceLibrary(self.library.root).lookup("https://syosetu.org/img/a.png", 3600)
+        self.assertEqual(entry.path, path)
+        self.assertFalse(entry.fresh)
+
+    def test_link_falls_back_to_copy(self):
+        """ハードリンクできない場合はコピーする"""
+        source = self.library.put(b"PNG")
+        dest = os.path.join(self.temp_dir, "novel", "resources", "icon.png")
+        self.assertEqual(self.library.link(source, dest), 'link')
+        self.assertTrue(os.path.samefile(source, dest))
+
+        os.remove(dest)
+        with patch('hameln_scraper.resources.library.os.link', side_effect=OSError(errno.EXDEV, "cross-device")):
+            self.assertEqual(self.library.link(source, dest), 'copy')
+        self.assertFalse(os.path.samefile(source, dest))
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), b"PNG")
+
+
+class TestResourceProcessorLibrary(unittest.TestCase):
+    """ResourceProcessorとライブラリの連携のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = ScraperConfig(output_root=self.temp_dir)
+        self.client = NetworkClient(self.config)
+        self.client.cloudscraper.get = Mock(
+            return_value=Mock(status_code=200, content=b"PNG", headers={}, raise_for_status=Mock())
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_resources_shared_across_novels(self):
+        """別の小説・別の実行でも同じリソースはダウンロードせずハードリンクで配置する"""
+        url = "https://syosetu.org/img/icon.png"
+        for novel in ("小説A", "小説B"):
+            processor = ResourceProcessor(self.config, NetworkClient(self.config))
+            processor.network_client.cloudscraper = self.client.cloudscraper
+            resources_dir = os.path.join(self.temp_dir, novel, "resources")
+            self.assertEqual(processor.download_resource(url, resources_dir), "icon.png")
+
+        self.assertEqual(self.client.cloudscraper.get.call_count, 1)
+        a = os.path.join(self.temp_dir, "小説A", "resources", "icon.png")
+        b = os.path.join(self.temp_dir, "小説B", "resources", "icon.png")
+        self.assertTrue(os.path.samefile(a, b))
+
+    def _download_twice(self, responses):
+        """期限切れ扱い（ttl=0）で別の小説に同じリソースを2回保存し、(小説A, 小説B) のパスを返す"""
+        self.config.resource_library_ttl = 0
+        self.client.cloudscraper.get = Mock(side_effect=responses)
+        paths = []
+        for novel in ("小説A", "小説B"):
+            processor = ResourceProcessor(self.config, self.client)
+            resources_dir = os.path.join(self.temp_dir, novel, "resources")
+            processor.download_resource("https://syosetu.org/img/icon.png", resources_dir)
+            paths.append(os.path.join(resources_dir, "icon.png"))
+        return paths
+
+    def test_expired_resource_revalidated(self):
+        """期限切れのリソースは条件付きリクエストで確認し、304なら保存済みの内容を使う"""
+        a, b = self._download_twice([
+            Mock(status_code=200, content=b"PNG", headers={'ETag': '"v1"'}, raise_for_status=Mock()),
+            Mock(status_code=304, content=b"", headers={}, raise_for_status=Mock()),
+        ])
+        second = self.client.cloudscraper.get.call_args_list[1]
+        self.assertEqual(second.kwargs['headers'], {'If-None-Match': '"v1"'})
+        self.assertTrue(os.path.samefile(a, b))
+
+    def test_changed_resource_fetched_again(self):
+        """確認で変更があれば新しい内容を保存し、以降はそれを使う"""
+        a, b = self._download_twice([
+            Mock(status_code=200, content=b"PNG1", headers={'ETag': '"v1"'}, raise_for_status=Mock()),
+            Mock(status_code=200, content=b"PNG2", headers={'ETag': '"v2"'}, raise_for_status=Mock()),
+        ])
+        with open(a, 'rb') as f:
+            self.assertEqual(f.read(), b"PNG1")
+        with open(b, 'rb') as f:
+            self.assertEqual(f.read(), b"PNG2")
+        library = ResourceProcessor(self.config, self.client).library
+        self.assertEqual(library.lookup("https://syosetu.org/img/icon.png", 0).etag, '"v2"')
+
+    def test_index_written_once_per_page(self):
+        """ページ内の複数のリソースを登録しても索引の書き込みは1回"""
+        soup = BeautifulSoup(
+            ''.join(f'<img src="https://syosetu.org/img/{n}.png">' for n in range(5)), 'html.parser'
+        )
+        processor = ResourceProcessor(self.config, self.client)
+        with patch('hameln_scraper.resources.library.json.dump', wraps=json.dump) as dump:
+            processor.process_html_resources(soup, os.path.join(self.temp_dir, "小説A"))
+        self.assertEqual(dump.call_count, 1)
+        self.assertEqual(self.client.cloudscraper.get.call_count, 5)
+
+    def test_library_can_be_disabled(self):
+        """無効時は従来通り各小説のフォルダに直接保存する"""
+        self.config.enable_resource_library = False
+        processor = ResourceProcessor(self.config, self.client)
+        processor.download_resource("https://syosetu.org/img/icon.png", os.path.join(self.temp_dir, "resources"))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, self.config.resource_library_dir)))
+
+
+if __name__ == '__main__':
+    unittest.main()
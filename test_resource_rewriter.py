@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+リソースURL書き換えのテストケース
+"""
+import unittest
+from unittest.mock import Mock
+import tempfile
+import shutil
+import sys
+import os
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.resources.processor import ResourceProcessor
+from hameln_scraper.resources.rewriter import find_css_references, rewrite_css
+
+
+class TestCssRewriter(unittest.TestCase):
+    """CSSトークナイザのテストクラス"""
+
+    def test_finds_references_outside_comments_and_strings(self):
+        """コメント・文字列内の url() は参照として扱わない"""
+        css = (
+            '@import "base.css";\n'
+            '@import url(print.css) print;\n'
+            '/* url(commented.png) */\n'
+            'body { background: URL( "bg.png" ) }\n'
+            'h1::before { content: "url(not-a-ref.png)"; background: url(icon.png?v=2) }\n'
+        )
+        refs = find_css_references(css)
+        self.assertEqual(
+            [(ref.url, ref.kind) for ref in refs],
+            [('base.css', 'import'), ('print.css', 'import'), ('bg.png', 'url'), ('icon.png?v=2', 'url')]
+        )
+
+    def test_rewrite_replaces_only_reference_tokens(self):
+        """参照の部分だけを置換し、部分一致する別の文字列は変えない"""
+        css = 'a { background: url(a.png) } b { background: url("aa.png") } /* a.png */'
+        refs = find_css_references(css)
+        self.assertEqual(
+            rewrite_css(css, refs, {'a.png': './x.png'}),
+            'a { background: url(./x.png) } b { background: url("aa.png") } /* a.png */'
+        )
+
+
+class TestHtmlRewriter(unittest.TestCase):
+    """process_html_resourcesのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.processor = ResourceProcessor(ScraperConfig(output_root=self.temp_dir), Mock())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_references_resolved_in_one_batch(self):
+        """HTMLの各種参照をまとめて解決し、同じURLは1回だけ解決する"""
+        html = """
+        <html><head>
+            <link rel="stylesheet" href="/css/main.css">
+            <link rel="shortcut icon" href="/favicon.ico">
+            <style>@import "/css/extra.css"; .x { background: url(/img/bg.png) }</style>
+            <script src="/js/app.js"></script>
+        </head><body>
+            <img src="/img/bg.png"><img src="data:image/png;base64,AAAA">
+            <div style="background: url('/img/bg.png')">本文</div>
+            <img data-src="/img/lazy.png">
+        </body></html>
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        self.processor.download_and_process_css = Mock(side_effect=lambda url, d: os.path.basename(url))
+        self.processor.download_resource = Mock(side_effect=lambda url, d: os.path.basename(url))
+
+        self.processor.process_html_resources(soup, self.temp_dir)
+
+        css_urls = sorted(call.args[0] for call in self.processor.download_and_process_css.call_args_list)
+        resource_urls = sorted(call.args[0] for call in self.processor.download_resource.call_args_list)
+        self.assertEqual(css_urls, ['/css/extra.css', '/css/main.css'])
+        self.assertEqual(resource_urls, ['/favicon.ico', '/img/bg.png', '/img/lazy.png', '/js/app.js'])
+
+        self.assertEqual(soup.find('link', rel='stylesheet')['href'], './resources/main.css')
+        self.assertEqual(soup.find('script')['src'], './resources/app.js')
+        self.assertEqual(soup.find('div')['style'], "background: url('./resources/bg.png')")
+        self.assertIn('@import "./resources/extra.css"', soup.find('style').string)
+        self.assertEqual(soup.find_all('img')[1]['src'], 'data:image/png;base64,AAAA')
+        self.assertEqual(soup.find_all('img')[2]['data-src'], './resources/lazy.png')
+
+
+if __name__ == '__main__':
+    unittest.main()
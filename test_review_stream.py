@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+感想ページの逐次抽出のテストケース
+"""
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.scraper import HamelnScraper
+from hameln_scraper.comments.stream import ReviewStreamParser, iter_reviews
+
+
+PAGE1 = """
+<html><body>
+<div id="reviews">
+  <div class="review-item" id="review1">とても&amp;面白い<br>作品でした</div>
+  <div class="review-item"><div class="name">読者</div>続きが気になります</div>
+</div>
+<div class="pagination">
+  <a href="?mode=review&page=1">1</a>
+  <a href="?mode=review&page=2">2</a>
+</div>
+</body></html>
+"""
+PAGE2 = """
+<html><body>
+<div class="review-item" id="review3">感想3</div>
+</body></html>
+"""
+
+
+class TestReviewStreamParser(unittest.TestCase):
+    """ReviewStreamParserのテストクラス"""
+
+    def test_records_do_not_depend_on_chunk_size(self):
+        """チャンクの区切り方によらず、最も内側の感想要素を元のマークアップのまま取り出す"""
+        expected = None
+        for chunk_size in (1, 7, 64, 100000):
+            parser = ReviewStreamParser()
+            records = list(iter_reviews(PAGE1, chunk_size=chunk_size, parser=parser))
+            if expected is None:
+                expected = records
+            self.assertEqual(records, expected)
+        self.assertEqual(len(expected), 2)
+        self.assertEqual(expected[0].review_id, "review1")
+        self.assertEqual(expected[0].html, '<div class="review-item" id="review1">とても&amp;面白い<br>作品でした</div>')
+        self.assertEqual(expected[0].text, "とても&面白い作品でした")
+        self.assertEqual(expected[1].text, "読者続きが気になります")
+        self.assertEqual(parser.pagination_hrefs, ["?mode=review&page=1", "?mode=review&page=2"])
+
+    def test_records_are_emitted_when_closed(self):
+        """閉じタグが届いた時点で記録を取り出せる"""
+        parser = ReviewStreamParser()
+        parser.feed('<div class="review-item">一件目</div><div class="review-item">二件')
+        self.assertEqual([record.text for record in parser.pop_records()], ["一件目"])
+        parser.feed('目</div>')
+        self.assertEqual([record.text for record in parser.pop_records()], ["二件目"])
+
+    def test_table_row_fallback(self):
+        """感想要素がないページでは、感想らしい語を含む表の行だけを取り出す"""
+        html = ('<table><tr><td>この作品はとても面白いです。続きが楽しみで毎日読んでいます。</td></tr>'
+                '<tr><td>短い行</td></tr></table>')
+        records = list(iter_reviews(html))
+        self.assertEqual(len(records), 1)
+        self.assertTrue(records[0].html.startswith('<tr><td>この作品'))
+
+
+class TestCommentsHandlerStream(unittest.TestCase):
+    """CommentsHandlerの逐次抽出のテストクラス"""
+
+    @patch('hameln_scraper.core.metrics.time.sleep')
+    @patch('hameln_scraper.network.client.NetworkClient.get_page')
+    def test_iter_reviews_follows_pagination(self, mock_get_page, mock_sleep):
+        """1ページ目のページネーションに従って全ページの感想を順に取り出す"""
+        mock_get_page.side_effect = [PAGE1, PAGE2]
+        scraper = HamelnScraper()
+
+        records = list(scraper.iter_reviews("https://syosetu.org/novel/123456/?mode=review"))
+
+        self.assertEqual([record.page for record in records], [1, 1, 2])
+        self.assertEqual(records[-1].review_id, "review3")
+        self.assertEqual(mock_get_page.call_args_list[1][0][0], "https://syosetu.org/novel/123456/?mode=review&page=2")
+
+
+if __name__ == '__main__':
+    unittest.main()
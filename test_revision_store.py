@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+章リビジョン管理のテストケース
+"""
+import unittest
+import tempfile
+import shutil
+import time
+import sys
+import os
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.output.file_manager import FileManager
+from hameln_scraper.output.revision_store import RevisionStore, make_delta, apply_delta
+
+CHAPTER_URL = "https://syosetu.org/novel/123456/1.html"
+
+
+def chapter_page(body):
+    return BeautifulSoup(
+        f'<html><head><title>第一話</title></head><body><div id="honbun">{body}</div></body></html>',
+        'html.parser'
+    )
+
+
+class TestRevisionStore(unittest.TestCase):
+    """リビジョンストアのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = RevisionStore(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_delta_roundtrip(self):
+        """差分から旧版を復元できる"""
+        old = '<p id="0">一行目</p><p id="1">二行目</p><p id="2">三行目</p>'
+        new = '<p id="0">一行目</p><p id="1">二行目（修正）</p><p id="2">三行目</p><p id="3">追記</p>'
+        self.assertEqual(apply_delta(new, make_delta(new, old)), old)
+
+    def test_record_status(self):
+        """初回・同一・変更を判定する"""
+        self.assertEqual(self.store.record(CHAPTER_URL, "<p>初版</p>"), RevisionStore.NEW)
+        self.assertEqual(self.store.record(CHAPTER_URL, "<p>初版</p>"), RevisionStore.UNCHANGED)
+        self.assertEqual(self.store.record(CHAPTER_URL, "<p>改稿</p>"), RevisionStore.CHANGED)
+
+    def test_history_is_recoverable(self):
+        """全ての版を復元できる"""
+        versions = [f"<p>共通の段落</p><p>版{i}</p>" for i in range(3)]
+        for body in versions:
+            self.store.record(CHAPTER_URL, body)
+
+        self.assertEqual(len(self.store.history(CHAPTER_URL)), 3)
+        for index, body in enumerate(reversed(versions)):
+            self.assertEqual(self.store.get_revision(CHAPTER_URL, index), body)
+
+
+class TestFileManagerRevisions(unittest.TestCase):
+    """FileManagerの書き込み省略のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_manager = FileManager(ScraperConfig())
+
+    def tearDown(self):
+        self.file_manager.close()
+        shutil.rmtree(self.temp_dir)
+
+    def save(self, body):
+        path = self.file_manager.save_complete_page(
+            chapter_page(body), CHAPTER_URL, "第一話", self.temp_dir, CHAPTER_URL
+        )
+        self.file_manager.flush()
+        return path
+
+    def test_identical_body_skips_write(self):
+        """同一本文の再保存ではファイルを書き換えない"""
+        path = self.save("<p>本文</p>")
+        first_mtime = os.stat(path).st_mtime_ns
+        time.sleep(0.01)
+
+        self.save("<p>本文</p>")
+        self.assertEqual(os.stat(path).st_mtime_ns, first_mtime)
+
+    def test_changed_body_is_written_with_history(self):
+        """本文が変わった場合は書き込み、旧版を履歴に残す"""
+        self.save("<p>初版</p>")
+        path = self.save("<p>改稿</p>")
+
+        with open(path, encoding='utf-8-sig') as f:
+            self.assertIn("改稿", f.read())
+        store = self.file_manager.get_revision_store(self.temp_dir)
+        self.assertEqual(len(store.history(CHAPTER_URL)), 2)
+        self.assertIn("初版", store.get_revision(CHAPTER_URL, 1))
+
+    def test_disabled_tracking_always_writes(self):
+        """リビジョン管理を無効にすると従来通り毎回書き込む"""
+        self.file_manager = FileManager(ScraperConfig(enable_revision_tracking=False))
+        self.save("<p>本文</p>")
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, '.revisions')))
+
+
+if __name__ == '__main__':
+    unittest.main()
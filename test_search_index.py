@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+全文検索インデックスのテストケース
+"""
+import unittest
+import tempfile
+import shutil
+import threading
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.search.index import SearchIndex, bigrams, strip_text_markup, html_to_text
+
+
+class TestSearchIndex(unittest.TestCase):
+    """バイグラム索引のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = SearchIndex(os.path.join(self.temp_dir, "index.db"))
+        self.index.add_document("https://syosetu.org/novel/1/1.html", "女神アクアは神界において奇妙な立ち位置にいる。",
+                                novel="作品A", title="第一話", url="https://syosetu.org/novel/1/1.html")
+        self.index.add_document("https://syosetu.org/novel/1/2.html", "水の女神。女神の力は万物の源を司る。",
+                                novel="作品A", title="第二話", url="https://syosetu.org/novel/1/2.html")
+        self.index.add_document("https://syosetu.org/novel/2/1.html", "勇者は魔王を倒した。",
+                                novel="作品B", title="第一話", url="https://syosetu.org/novel/2/1.html")
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_bigrams_skip_whitespace(self):
+        """空白をまたぐバイグラムは生成しない"""
+        self.assertEqual(list(bigrams("女神 アクア")), ["女神", "アク", "クア"])
+
+    def test_phrase_search(self):
+        """フレーズに一致する章だけが返り、スニペットで強調される"""
+        hits = self.index.search("女神アクア")
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0]["title"], "第一話")
+        self.assertIn("【女神アクア】", hits[0]["snippet"])
+
+    def test_ranking_by_term_frequency(self):
+        """出現回数の多い章が上位になる"""
+        hits = self.index.search("女神")
+        self.assertEqual([hit["url"] for hit in hits], [
+            "https://syosetu.org/novel/1/2.html",
+            "https://syosetu.org/novel/1/1.html",
+        ])
+
+    def test_bigram_match_without_phrase_is_rejected(self):
+        """バイグラムが揃っていても連続していなければ一致しない"""
+        self.assertEqual(self.index.search("神の女"), [])
+
+    def test_single_character_query(self):
+        """1文字の検索語にも対応"""
+        hits = self.index.search("勇")
+        self.assertEqual([hit["novel"] for hit in hits], ["作品B"])
+
+    def test_incremental_update(self):
+        """同一本文は再索引化せず、変更された本文は旧版を置き換える"""
+        url = "https://syosetu.org/novel/2/1.html"
+        self.assertFalse(self.index.add_document(url, "勇者は魔王を倒した。"))
+        self.assertTrue(self.index.add_document(url, "勇者は魔王と和解した。", novel="作品B", title="第一話", url=url))
+
+        self.assertEqual(self.index.search("倒した"), [])
+        self.assertEqual(len(self.index.search("和解")), 1)
+
+    def test_replaced_versions_not_counted_in_scores(self):
+        """差し替え前の版は文書頻度に数えず、同じ文書だけの索引と同じスコアになる"""
+        url = "https://syosetu.org/novel/2/1.html"
+        for text in ("女神は倒れた。", "女神は逃げた。", "勇者は旅立った。"):
+            self.index.add_document(url, text, novel="作品B", title="第一話", url=url)
+
+        fresh = SearchIndex(os.path.join(self.temp_dir, "fresh.db"))
+        self.addCleanup(fresh.close)
+        fresh.add_document("https://syosetu.org/novel/1/1.html", "女神アクアは神界において奇妙な立ち位置にいる。")
+        fresh.add_document("https://syosetu.org/novel/1/2.html", "水の女神。女神の力は万物の源を司る。")
+        fresh.add_document(url, "勇者は旅立った。")
+        self.assertEqual(self.index.search("倒れた"), [])
+        self.assertEqual([hit["score"] for hit in self.index.search("女神")],
+                         [hit["score"] for hit in fresh.search("女神")])
+
+    def test_remove_and_compact(self):
+        """削除・差し替えた文書は compact() でポスティングごと消去される"""
+        self.index.add_document("https://syosetu.org/novel/1/2.html", "水の女神は去った。")
+        self.assertTrue(self.index.remove_document("https://syosetu.org/novel/2/1.html"))
+        self.assertFalse(self.index.remove_document("https://syosetu.org/novel/2/1.html"))
+        self.assertEqual(self.index.search("魔王"), [])
+
+        self.assertEqual(self.index.compact(), 2)
+        live = {doc_id for (doc_id,) in self.index.conn.execute("SELECT id FROM docs")}
+        self.assertEqual(len(live), 2)
+        for term in ("魔王", "万物", "女神"):
+            self.assertLessEqual(set(self.index._postings(term)), live)
+        self.assertEqual(self.index._postings("魔王"), {})
+        self.assertEqual(len(self.index.search("女神")), 2)
+        self.assertEqual(self.index.compact(), 0)
+
+    def test_compacted_on_close(self):
+        """削除扱いの文書が多ければ閉じる時に詰め直す"""
+        self.index.remove_document("https://syosetu.org/novel/2/1.html")
+        self.index.close()
+        self.index = SearchIndex(os.path.join(self.temp_dir, "index.db"))
+        self.assertEqual(self.index.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0], 2)
+
+    def test_used_from_other_threads(self):
+        """作成したスレッド以外からも追加・検索できる"""
+        errors = []
+
+        def add(n):
+            try:
+                self.index.add_document(f"https://syosetu.org/novel/3/{n}.html", f"第{n}章、賢者は旅に出た。")
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=add, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(errors, [])
+        hits = []
+        searcher = threading.Thread(target=lambda: hits.extend(self.index.search("賢者", limit=100)))
+        searcher.start()
+        searcher.join(5)
+        self.assertEqual(len(hits), 8)
+
+    def test_persistence(self):
+        """閉じて開き直しても検索できる"""
+        self.index.close()
+        self.index = SearchIndex(os.path.join(self.temp_dir, "index.db"))
+        self.assertEqual(len(self.index.search("魔王")), 1)
+
+
+class TestTextNormalization(unittest.TestCase):
+    """索引用テキスト変換のテストクラス"""
+
+    def test_html_ruby_keeps_base_text(self):
+        """ルビは親文字のみ残す"""
+        html = '<div id="honbun"><p><ruby><rb>伊邪那美</rb><rp>(</rp><rt>イザナミ</rt><rp>)</rp></ruby>様</p><p>次</p></div>'
+        self.assertEqual(html_to_text(html), "伊邪那美様\n次")
+
+    def test_html_text_outside_paragraphs(self):
+        """段落があっても段落外のテキストを含め、本文全体を索引化する"""
+        html = '<div id="honbun">前書き<br>二行目<p>本文</p><p><br></p><div>後書き</div>　末尾</div>'
+        self.assertEqual(html_to_text(html), "前書き\n二行目\n本文\n後書き\n　末尾")
+
+    def test_strip_text_markup(self):
+        """テキストモード出力のルビ・強調記法を除去"""
+        self.assertEqual(strip_text_markup("｜漢字《かんじ》と**強調**\\*  \n"), "漢字と強調*\n")
+        self.assertEqual(strip_text_markup("<ruby>漢字<rt>かんじ</rt></ruby>"), "漢字")
+
+
+if __name__ == '__main__':
+    unittest.main()
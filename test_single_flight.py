@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+リクエスト重複排除のテストケース
+"""
+import unittest
+from unittest.mock import Mock
+import threading
+import contextvars
+import tempfile
+import shutil
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.network.client import NetworkClient
+from hameln_scraper.network.single_flight import SingleFlight, request_key, run_scope
+from hameln_scraper.core.scraper import HamelnScraper
+from hameln_scraper.resources.processor import ResourceProcessor
+
+
+def response(content):
+    return Mock(status_code=200, content=content, headers={}, raise_for_status=Mock())
+
+
+class TestSingleFlight(unittest.TestCase):
+    """SingleFlightのテストクラス"""
+
+    def test_concurrent_callers_share_one_call(self):
+        """同時に呼ばれた同じキーは1回だけ実行され、結果が共有される"""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "html"
+
+        results = []
+        with run_scope():
+            threads = [
+                threading.Thread(target=contextvars.copy_context().run,
+                                 args=(lambda: results.append(flight.do("k", fetch)),))
+                for _ in range(4)
+            ]
+            threads[0].start()
+            self.assertTrue(started.wait(5))
+            for thread in threads[1:]:
+                thread.start()
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(sorted(results), [("html", False)] + [("html", True)] * 3)
+            self.assertEqual(flight.do("k", fetch), ("html", True))
+        self.assertEqual(flight.do("k", fetch), ("html", False))
+
+    def test_failures_are_not_memoized(self):
+        """失敗（例外・None）はメモ化しない"""
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("k", Mock(side_effect=ValueError("boom")))
+        self.assertEqual(flight.do("k", lambda: None), (None, False))
+        self.assertEqual(flight.do("k", lambda: "ok"), ("ok", False))
+
+    def test_memo_is_bounded(self):
+        """メモ化は max_entries 件まで（古いものから破棄）"""
+        flight = SingleFlight(max_entries=2)
+        with run_scope():
+            for key in ("a", "b", "c"):
+                flight.do(key, lambda: key)
+            self.assertEqual(flight.do("c", lambda: "again"), ("c", True))
+            self.assertEqual(flight.do("a", lambda: "again"), ("again", False))
+
+    def test_request_key(self):
+        """表記揺れのあるURLは同じキーになる"""
+        self.assertEqual(request_key("HTTPS://Syosetu.org:443/novel/1/#top"), "https://syosetu.org/novel/1/")
+        self.assertEqual(request_key("https://syosetu.org"), "https://syosetu.org/")
+        self.assertNotEqual(request_key("https://syosetu.org/?p=1"), request_key("https://syosetu.org/?p=2"))
+
+
+class TestDeduplicatedFetches(unittest.TestCase):
+    """NetworkClient・ResourceProcessorの重複排除のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.client = NetworkClient(ScraperConfig(request_delay=0))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_page_fetched_once_per_run(self):
+        """同じページの再取得はメモ化された結果を返す"""
+        self.client.cloudscraper.get = Mock(return_value=response(b'<html><body>index</body></html>'))
+        self.client.decompressor.decompress = lambda r: r.content.decode()
+        with run_scope():
+            first = self.client.get_page("https://syosetu.org/novel/1/")
+            second = self.client.get_page("https://syosetu.org/novel/1/#main")
+            self.assertEqual(first, second)
+            self.assertEqual(self.client.cloudscraper.get.call_count, 1)
+
+            self.client.forget("https://syosetu.org/novel/1/")
+            self.client.get_page("https://syosetu.org/novel/1/")
+            self.assertEqual(self.client.cloudscraper.get.call_count, 2)
+
+    def test_memo_not_reused_across_runs(self):
+        """同じクライアントでも、次の実行では前回メモ化したページを使わずに取得し直す"""
+        pages = iter([b'<html><body>v1</body></html>', b'<html><body>v2</body></html>'])
+        self.client.cloudscraper.get = Mock(side_effect=lambda url, **kwargs: response(next(pages)))
+        self.client.decompressor.decompress = lambda r: r.content.decode()
+        with run_scope():
+            self.assertIn('v1', self.client.get_page("https://syosetu.org/novel/1/"))
+        with run_scope():
+            self.assertIn('v2', self.client.get_page("https://syosetu.org/novel/1/"))
+        self.assertEqual(self.client.cloudscraper.get.call_count, 2)
+
+    def test_shared_client_refetches_on_next_scrape(self):
+        """共有クライアント（DownloadManager）で同じ小説を再取得すると、更新された目次を取得する"""
+        index = '<html><head><title>テスト - ハーメルン</title></head><body><div class="ss">テスト{n}</div>' \
+                '<a href="https://syosetu.org/user/1/">作者</a>' + '<p>あらすじ</p>' * 40 + '</body></html>'
+        pages = iter([index.format(n=1), index.format(n=2)])
+        self.client.cloudscraper.get = Mock(
+            side_effect=lambda url, **kwargs: response(next(pages).encode('utf-8'))
+        )
+        self.client.decompressor.decompress = lambda r: r.content.decode()
+        config = ScraperConfig(request_delay=0, output_root=self.temp_dir)
+        for n in (1, 2):
+            scraper = HamelnScraper(config, network_client=self.client)
+            result = scraper.scrape_novel("https://syosetu.org/novel/1/")
+            scraper.close()
+            self.assertIn(f"テスト{n}", result["html_content"])
+        self.assertEqual(self.client.cloudscraper.get.call_count, 2)
+
+    def test_css_import_cycle_and_shared_images(self):
+        """@import の循環で無限に再帰せず、共通の画像は1回だけ取得する"""
+        files = {
+            "https://syosetu.org/css/a.css": b'@import "b.css"; body { background: url(bg.png) }',
+            "https://syosetu.org/css/b.css": b'@import "a.css"; h1 { background: url(bg.png) }',
+            "https://syosetu.org/css/bg.png": b'PNG',
+        }
+        self.client.cloudscraper.get = Mock(side_effect=lambda url, **kwargs: response(files[url]))
+        processor = ResourceProcessor(ScraperConfig(output_root=self.temp_dir), self.client)
+        resources_dir = os.path.join(self.temp_dir, "resources")
+
+        self.assertEqual(processor.download_and_process_css("https://syosetu.org/css/a.css", resources_dir), "a.css")
+        requested = [call.args[0] for call in self.client.cloudscraper.get.call_args_list]
+        self.assertEqual(sorted(requested), sorted(files))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+テキストモード（本文のみ保存）のテストケース
+"""
+import unittest
+import asyncio
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.scraper import HamelnScraper
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.output.text_exporter import TextConverter, TextExporter
+from hameln_scraper.output.revision_store import RevisionStore
+
+NOVEL_TEXT = "彼はそう言った。だが、それは違うという事を彼女は知っていた。そして、しかし、ところが、物語は続いていく。"
+
+INDEX_HTML = """
+<html><head><title>テスト小説 - ハーメルン</title></head>
+<body>
+    <div class="ss"><span style="font-size:120%">テスト小説</span></div>
+    <a href="https://syosetu.org/user/1/">作者名</a>
+    <a href="./1.html">第一話</a>
+    <a href="./2.html">第二話</a>
+    <a href="https://syosetu.org/?mode=review&nid=123456">感想</a>
+</body></html>
+"""
+
+CHAPTER_HTML = """
+<html><head><title>テスト小説 - {title} - ハーメルン</title>
+<link rel="stylesheet" href="/style.css"></head>
+<body><div id="honbun"><p id="0">　<ruby><rb>伊邪那美</rb><rp>(</rp><rt>イザナミ</rt><rp>)</rp></ruby>。{text}</p></div></body></html>
+"""
+
+
+class TestTextConverter(unittest.TestCase):
+    """本文HTML変換のテストクラス"""
+
+    BODY = ('<div id="honbun"><p>　<ruby><rb>漢字</rb><rp>(</rp><rt>かんじ</rt><rp>)</rp></ruby>と<b>強調</b>*記号*'
+            '<br>改行</p><p>　</p><p>　次の段落。</p></div>')
+
+    def test_markdown(self):
+        """Markdown: ルビは<ruby>タグ、強調は**、行末は強制改行"""
+        text = TextConverter('markdown').convert(self.BODY)
+        self.assertEqual(
+            text,
+            "　<ruby>漢字<rt>かんじ</rt></ruby>と**強調**\\*記号\\*  \n改行  \n\n　次の段落。  \n"
+        )
+
+    def test_plain(self):
+        """プレーンテキスト: ルビは｜親文字《ルビ》形式"""
+        text = TextConverter('plain').convert(self.BODY)
+        self.assertEqual(text, "　｜漢字《かんじ》と強調*記号*\n改行\n　\n　次の段落。\n")
+
+    def test_unknown_format(self):
+        """未対応の形式はエラー"""
+        with self.assertRaises(ValueError):
+            TextConverter('html')
+
+
+class TestTextExporter(unittest.TestCase):
+    """章の保存のテストクラス"""
+
+    URL = "https://syosetu.org/novel/123456/1.html"
+    BODY = '<div id="honbun"><p>　本文。</p></div>'
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        store = RevisionStore(os.path.join(self.temp_dir, '.revisions'))
+        self.exporter = TextExporter(os.path.join(self.temp_dir, 'text'), 'markdown', store)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _overwrite(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("目印")
+
+    def _read(self, path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_unchanged_chapter_skipped_by_revision_hash(self):
+        """リビジョンストアで未変更と判定した章は既存ファイルを読まずに書き込みを省略する"""
+        path = self.exporter.save_chapter(1, "第一話", self.URL, self.BODY)
+        self._overwrite(path)
+
+        self.exporter.save_chapter(1, "第一話", self.URL, self.BODY)
+        self.assertEqual(self._read(path), "目印")
+
+    def test_changed_body_or_title_rewritten(self):
+        """本文・見出しが変わった章は書き込む"""
+        path = self.exporter.save_chapter(1, "第一話", self.URL, self.BODY)
+        self._overwrite(path)
+        self.exporter.save_chapter(1, "第一話 改", self.URL, self.BODY)
+        self.assertTrue(self._read(path).startswith("# 第一話 改"))
+
+        self.exporter.save_chapter(1, "第一話 改", self.URL, self.BODY.replace("本文", "改稿"))
+        self.assertIn("改稿", self._read(path))
+
+    def test_interrupted_write_keeps_previous_file(self):
+        """書き込みが中断しても既存の章ファイル・マニフェストは壊れず、一時ファイルも残らない"""
+        path = self.exporter.save_chapter(1, "第一話", self.URL, self.BODY)
+        manifest_path = self.exporter.write_manifest({'title': "テスト小説"}, "https://syosetu.org/novel/123456/")
+        before = self._read(manifest_path)
+
+        with patch('hameln_scraper.output.atomic_writer.os.replace', side_effect=OSError("中断")):
+            with self.assertRaises(OSError):
+                self.exporter.save_chapter(1, "第一話", self.URL, self.BODY.replace("本文", "改稿"))
+            with self.assertRaises(OSError):
+                self.exporter.write_manifest({'title': "別題"}, "https://syosetu.org/novel/123456/")
+
+        self.assertIn("本文", self._read(path))
+        self.assertEqual(self._read(manifest_path), before)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(path))), ["0001.md", "manifest.json"])
+
+    def test_missing_file_rewritten(self):
+        """未変更でもファイルが消えていれば書き込む"""
+        path = self.exporter.save_chapter(1, "第一話", self.URL, self.BODY)
+        os.remove(path)
+        self.exporter.save_chapter(1, "第一話", self.URL, self.BODY)
+        self.assertTrue(os.path.exists(path))
+
+
+class TestScrapeNovelText(unittest.TestCase):
+    """テキストモード取得のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        config = ScraperConfig(output_root=self.temp_dir, request_delay=0)
+        self.scraper = HamelnScraper(config)
+
+        pages = {
+            "https://syosetu.org/novel/123456/": INDEX_HTML,
+            "https://syosetu.org/novel/123456/1.html": CHAPTER_HTML.format(title="第一話", text=NOVEL_TEXT),
+            "https://syosetu.org/novel/123456/2.html": CHAPTER_HTML.format(title="第二話", text=NOVEL_TEXT),
+        }
+        self.pages = pages
+        self.scraper.network_client.get_page = Mock(side_effect=lambda url, **kwargs: pages.get(url))
+        self.scraper.resource_processor.process_html_resources = Mock()
+
+    def tearDown(self):
+        self.scraper.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_text_mode_fetches_only_index_and_chapters(self):
+        """目次と各話のみ取得し、リソース処理・感想取得を行わない"""
+        result = self.scraper.scrape_novel_text("https://syosetu.org/novel/123456/2.html")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["chapters"], 2)
+        requested = [call.args[0] for call in self.scraper.network_client.get_page.call_args_list]
+        self.assertEqual(requested, [
+            "https://syosetu.org/novel/123456/",
+            "https://syosetu.org/novel/123456/1.html",
+            "https://syosetu.org/novel/123456/2.html",
+        ])
+        self.scraper.resource_processor.process_html_resources.assert_not_called()
+
+    def test_manifest_and_files(self):
+        """章ファイルとマニフェストが出力される"""
+        result = self.scraper.scrape_novel_text("https://syosetu.org/novel/123456/", text_format='plain')
+
+        with open(result["manifest"], encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["format"], 'plain')
+        self.assertEqual([c["title"] for c in manifest["chapters"]], ["第一話", "第二話"])
+
+        with open(os.path.join(result["output_dir"], manifest["chapters"][0]["file"]), encoding='utf-8') as f:
+            content = f.read()
+        self.assertTrue(content.startswith("第一話\n\n"))
+        self.assertIn("｜伊邪那美《イザナミ》", content)
+        self.assertNotIn("<", content)
+
+    def test_progress_events(self):
+        """章ごとに進捗（処理済み章数・全章数・バイト数）が通知される"""
+        events = []
+        self.scraper.progress_callback = events.append
+        self.scraper.scrape_novel_text("https://syosetu.org/novel/123456/")
+
+        self.assertEqual([(e["done"], e["total"]) for e in events], [(0, 2), (1, 2), (2, 2)])
+        self.assertGreater(events[-1]["bytes"], 0)
+        self.assertEqual(events[-1]["title"], events[0]["title"])
+
+    def test_iter_chapters_is_lazy_and_does_not_write(self):
+        """次の話は要求された時点で取得し、save=False ならファイルを書かない"""
+        chapters = self.scraper.iter_chapters("https://syosetu.org/novel/123456/")
+        first = next(chapters)
+        self.assertEqual(self.scraper.network_client.get_page.call_count, 2)
+        self.assertEqual((first.ordinal, first.total, first.title), (1, 2, "第一話"))
+        self.assertEqual(first.url, "https://syosetu.org/novel/123456/1.html")
+        self.assertIn("伊邪那美", first.text)
+        self.assertIsNone(first.path)
+
+        rest = list(chapters)
+        self.assertEqual([record.ordinal for record in rest], [2])
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_iter_chapters_save_and_early_stop(self):
+        """save=True で途中で止めると、保存済みの章までのマニフェストを中断として残す"""
+        for record in self.scraper.iter_chapters("https://syosetu.org/novel/123456/", save=True, text_format='plain'):
+            self.assertTrue(os.path.exists(record.path))
+            break
+
+        with open(os.path.join(os.path.dirname(record.path), 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.assertFalse(manifest["complete"])
+        self.assertEqual([c["title"] for c in manifest["chapters"]], ["第一話"])
+
+    def test_aiter_chapters(self):
+        """非同期版でも同じ順に全話を取得する"""
+        async def collect():
+            return [record.title async for record in self.scraper.aiter_chapters("https://syosetu.org/novel/123456/")]
+
+        self.assertEqual(asyncio.run(collect()), ["第一話", "第二話"])
+
+    def test_aiter_chapters_updates_search_index(self):
+        """非同期版で保存した章も（別スレッドから）検索インデックスに追加される"""
+        self.scraper.close()
+        config = ScraperConfig(output_root=self.temp_dir, request_delay=0, enable_search_index=True)
+        self.scraper = HamelnScraper(config)
+        self.scraper.network_client.get_page = Mock(side_effect=lambda url, **kwargs: self.pages.get(url))
+
+        async def collect():
+            return [record async for record in self.scraper.aiter_chapters("https://syosetu.org/novel/123456/", save=True)]
+
+        self.assertEqual(len(asyncio.run(collect())), 2)
+        self.assertEqual(len(self.scraper.search_index.search("伊邪那美")), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+URL正規化キーのテストケース
+"""
+import unittest
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.url_key import url_key
+from hameln_scraper.network.single_flight import SingleFlight, run_scope
+
+
+class TestUrlKey(unittest.TestCase):
+    """url_keyのテストクラス"""
+
+    def test_spellings_share_one_interned_key(self):
+        """表記の揺れは同じキー（同一オブジェクト）になり、文字列として比較・JSON化できる"""
+        spellings = [
+            "https://syosetu.org/novel/123456/2.html",
+            "HTTP://Syosetu.org:443/novel/123456/2.html#honbun",
+            "//syosetu.org/novel/123456/2.html",
+        ]
+        keys = [url_key(url) for url in spellings]
+        keys.append(url_key("./2.html", "https://syosetu.org/novel/123456/1.html"))
+        self.assertTrue(all(key is keys[0] for key in keys))
+        self.assertEqual(keys[0], "https://syosetu.org/novel/123456/2.html")
+        self.assertEqual(json.loads(json.dumps({keys[0]: 1})), {"https://syosetu.org/novel/123456/2.html": 1})
+
+    def test_page_attributes(self):
+        """小説ID・話番号・mode・ページを解析する"""
+        chapter = url_key("https://syosetu.org/novel/123456/10.html")
+        self.assertEqual((chapter.kind, chapter.novel_id, chapter.chapter), ('chapter', '123456', 10))
+        self.assertEqual(chapter.index_url, "https://syosetu.org/novel/123456/")
+        self.assertEqual(url_key("https://syosetu.org/novel/123456").kind, 'index')
+
+        review = url_key("https://syosetu.org/?page=3&nid=123456&mode=review")
+        self.assertEqual(review, "https://syosetu.org/?mode=review&nid=123456&page=3")
+        self.assertEqual(review.page_key(), ('mode', 'review', '123456', 3))
+        self.assertEqual(review.with_page(1), "https://syosetu.org/?mode=review&nid=123456")
+        self.assertIs(url_key("https://syosetu.org/?mode=review&nid=123456&page=1"), review.with_page(1))
+
+        image = url_key("//img.syosetu.org/images/a.png?v=2")
+        self.assertEqual((image.kind, image.asset_path), ('asset', '/images/a.png'))
+        self.assertEqual(url_key(" javascript:void(0); ").kind, 'other')
+
+    def test_single_flight_dedups_spellings(self):
+        """表記が違っても同じページの取得は1回にまとまる"""
+        flight = SingleFlight()
+        calls = []
+        with run_scope():
+            for url in ("https://syosetu.org/novel/1/", "https://SYOSETU.org/novel/1#top"):
+                flight.do(url_key(url), lambda: calls.append(url) or "html")
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+更新監視（NovelWatcher）と条件付きリクエスト・増分取得のテストケース
+"""
+import unittest
+import threading
+import tempfile
+import shutil
+import json
+from unittest.mock import Mock
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from hameln_scraper.core.config import ScraperConfig
+from hameln_scraper.core.watcher import NovelWatcher, WatchEntry
+
+NOVEL_TEXT = "彼はそう言った。だが、それは違うという事を彼女は知っていた。そして、しかし、ところが、物語は続いていく。"
+INDEX_URL = "https://syosetu.org/novel/123456/"
+
+CHAPTER_HTML = """
+<html><head><title>テスト小説 - 第{n}話 - ハーメルン</title></head>
+<body><div id="honbun"><p>第{n}話。{text}</p></div></body></html>
+"""
+
+
+def index_html(chapters):
+    links = "\n".join(f'<a href="./{n}.html">第{n}話</a>' for n in range(1, chapters + 1))
+    return f"""
+<html><head><title>テスト小説 - ハーメルン</title></head>
+<body>
+    <div class="ss"><span style="font-size:120%">テスト小説</span></div>
+    <a href="https://syosetu.org/user/1/">作者名</a>
+    {links}
+</body></html>
+"""
+
+
+class FakeSite:
+    """ETag に対応した目次と各話を返す擬似サイト（cloudscraper.get の代わり）"""
+
+    def __init__(self, chapters):
+        self.chapters = chapters
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append((url, headers))
+        etag = f'"v{self.chapters}"'
+        if url == INDEX_URL:
+            if headers.get('If-None-Match') == etag:
+                return Mock(status_code=304, content=b'', headers={})
+            body = index_html(self.chapters)
+            return Mock(status_code=200, content=body.encode('utf-8'), text=body, headers={'ETag': etag})
+        n = int(url.rsplit('/', 1)[-1].split('.')[0])
+        body = CHAPTER_HTML.format(n=n, text=NOVEL_TEXT)
+        return Mock(status_code=200, content=body.encode('utf-8'), text=body, headers={})
+
+    def fetched_chapters(self):
+        return [url for url, headers in self.requests if url != INDEX_URL]
+
+
+class TestNovelWatcher(unittest.TestCase):
+    """更新監視のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = ScraperConfig(output_root=self.temp_dir, request_delay=0, min_request_interval=0)
+        self.site = FakeSite(2)
+        self.watcher = self._watcher()
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _watcher(self):
+        watcher = NovelWatcher(self.config)
+        watcher.scraper.network_client.cloudscraper.get = self.site.get
+        return watcher
+
+    def _manifest(self):
+        with open(os.path.join(self.temp_dir, 'テスト小説', 'text', 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_follow_normalizes_to_index(self):
+        entry = self.watcher.follow("http://syosetu.org/novel/123456/3.html")
+        self.assertEqual(entry.url, INDEX_URL)
+        self.assertIs(self.watcher.follow(INDEX_URL), entry)
+        with self.assertRaises(ValueError):
+            self.watcher.follow("https://syosetu.org/")
+
+    def test_first_check_fetches_archive(self):
+        """初回確認で目次の話数を記録し、全話を保存する"""
+        entry = self.watcher.follow(INDEX_URL)
+        self.assertEqual(self.watcher.run_once(), 1)
+
+        self.assertEqual(entry.chapters, 2)
+        self.assertEqual(entry.etag, '"v2"')
+        self.assertEqual(entry.title, "テスト小説")
+        self.assertEqual(len(self._manifest()['chapters']), 2)
+        # 目次は確認時の取得を使い回し、取得し直さない
+        self.assertEqual([url for url, headers in self.site.requests].count(INDEX_URL), 1)
+
+    def test_unchanged_novel_costs_one_conditional_request(self):
+        """更新がなければ304で終わり、確認間隔を延ばす"""
+        entry = self.watcher.follow(INDEX_URL)
+        self.watcher.check(entry)
+        self.site.requests.clear()
+        interval = entry.interval
+
+        self.assertFalse(self.watcher.check(entry))
+        self.assertEqual(self.site.requests, [(INDEX_URL, {'If-None-Match': '"v2"'})])
+        self.assertEqual(entry.interval, interval * self.config.watch_backoff)
+
+    def test_new_chapter_fetched_incrementally(self):
+        """新しい話だけを取得し、マニフェストには保存済みの話も残る"""
+        updates = []
+        self.watcher.on_update = lambda entry, result: updates.append(result)
+        entry = self.watcher.follow(INDEX_URL)
+        self.watcher.check(entry)
+        self.site.requests.clear()
+        self.site.chapters = 3
+
+        self.assertTrue(self.watcher.check(entry))
+        self.assertEqual(self.site.fetched_chapters(), ["https://syosetu.org/novel/123456/3.html"])
+        self.assertEqual(entry.chapters, 3)
+        self.assertEqual(entry.changes, 2)
+        self.assertEqual(updates[-1]['new_chapters'], 1)
+        self.assertEqual([c['ordinal'] for c in self._manifest()['chapters']], [1, 2, 3])
+
+    def test_state_persisted(self):
+        entry = self.watcher.follow(INDEX_URL)
+        self.watcher.run_once()
+        self.watcher.close()
+
+        self.watcher = self._watcher()
+        loaded = self.watcher.entries[INDEX_URL]
+        self.assertEqual(loaded.to_dict(), entry.to_dict())
+
+    def test_run_stops_while_waiting(self):
+        """stop() で待機中の run() が即座に終了する"""
+        thread = threading.Thread(target=self.watcher.run)
+        thread.start()
+        self.watcher.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+
+class TestAdaptiveSchedule(unittest.TestCase):
+    """確認間隔の調整のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = ScraperConfig(output_root=self.temp_dir)
+        self.watcher = NovelWatcher(self.config)
+        self.entry = WatchEntry(INDEX_URL, self.config.watch_initial_interval, chapters=1, last_change=0.0)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_frequent_updates_poll_more_often(self):
+        """毎日更新される連載は推定間隔の半分ごとに確認する"""
+        day = 24 * 3600
+        for n in range(1, 6):
+            self.watcher._learn_cadence(self.entry, n * day)
+        self.watcher._schedule(self.entry, 5 * day, True)
+
+        self.assertAlmostEqual(self.entry.cadence, day)
+        self.assertAlmostEqual(self.entry.interval, day * self.config.watch_cadence_fraction)
+        self.assertAlmostEqual(self.entry.next_check, 5 * day + self.entry.interval)
+
+    def test_interval_held_within_cadence(self):
+        """推定した更新間隔の範囲内は、更新がなくても間隔を延ばさない"""
+        day = 24 * 3600
+        self.watcher._learn_cadence(self.entry, day)
+        self.watcher._schedule(self.entry, day, True)
+        self.watcher._schedule(self.entry, day + 3600, False)
+        self.assertAlmostEqual(self.entry.interval, day * self.config.watch_cadence_fraction)
+
+    def test_dormant_novel_backs_off_to_max(self):
+        """休止中の小説は確認間隔を延ばし、上限で止める"""
+        now = 0.0
+        for _ in range(50):
+            now += self.entry.interval
+            self.watcher._schedule(self.entry, now, False)
+        self.assertEqual(self.entry.interval, self.config.watch_max_interval)
+
+
+if __name__ == '__main__':
+    unittest.main()